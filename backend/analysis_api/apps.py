@@ -14,4 +14,15 @@ class AnalysisApiConfig(AppConfig):
         if os.environ.get('RUN_MAIN', None) != 'true':
             return
         print("检测到服务器主进程启动，准备加载ML资源...")
-        ml_loader.load_all_resources()
\ No newline at end of file
+        ml_loader.load_all_resources()
+
+        from .services import spatial_rollup, grid_payload
+        try:
+            grid_payload.get_grid_payload()
+        except Exception as e:
+            print(f"网格 GeoJSON 预序列化失败，将在首次请求时重试: {e}")
+
+        try:
+            spatial_rollup.get_grid_district_weights()
+        except Exception as e:
+            print(f"区县权重矩阵预计算失败，将在首次请求时重试: {e}")
\ No newline at end of file
@@ -0,0 +1,42 @@
+# analysis_api/management/commands/import_district_boundaries.py
+import os
+import geopandas as gpd
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = ("把区县边界数据(Shapefile、GeoJSON、GDB 等)转换为分析模块使用的 GeoJSON 文件 "
+            "(settings.DISTRICT_BOUNDARY_PATH)，供区县汇总和空气质量插值面裁剪使用。")
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help="区县边界数据源路径")
+        parser.add_argument('--layer', default=None, help="数据源中的图层名")
+        parser.add_argument('--name-field', default=None,
+                            help="区县名称字段，默认与 settings.DISTRICT_NAME_FIELD 相同")
+        parser.add_argument('--output', default=None, help="输出路径，默认为 settings.DISTRICT_BOUNDARY_PATH")
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options['source']):
+            raise CommandError(f"找不到区县边界数据源: {options['source']}")
+        name_field = settings.DISTRICT_NAME_FIELD
+        source_field = options['name_field'] or name_field
+        output = options['output'] or settings.DISTRICT_BOUNDARY_PATH
+
+        districts = gpd.read_file(options['source'], layer=options['layer'])
+        if source_field not in districts.columns:
+            raise CommandError(f"数据源缺少区县名称字段 {source_field}，可用字段: {', '.join(districts.columns)}")
+        if districts.crs is None:
+            raise CommandError("数据源没有坐标系信息，请先在 GIS 软件中定义坐标系。")
+
+        # 同名的多个面合并为一个区县，统一输出为 WGS84 经纬度
+        districts = districts[[source_field, 'geometry']].rename(columns={source_field: name_field})
+        districts = districts[districts.geometry.notna()].dissolve(by=name_field, as_index=False)
+        districts = districts.to_crs('EPSG:4326')
+
+        directory = os.path.dirname(output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        districts.to_file(output, driver='GeoJSON')
+        self.stdout.write(self.style.SUCCESS(
+            f"已写出 {len(districts)} 个区县边界: {output}，重启服务后生效。"))
@@ -0,0 +1,57 @@
+# analysis_api/management/commands/train_models.py
+import os
+import time
+from django.core.management.base import BaseCommand, CommandError
+
+from analysis_api.services import ml_loader, model_training
+
+
+class Command(BaseCommand):
+    help = "基于处理后的历史特征数据重新训练存在性分类器和三个回归模型，并写出带版本号的模型文件。"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model-version', dest='model_version', default=None,
+                            help="模型版本名，默认使用当前时间 (YYYYmmdd_HHMMSS)")
+        parser.add_argument('--folds', type=int, default=4, help="滚动原点交叉验证折数")
+        parser.add_argument('--horizon', type=int, default=3, help="每折验证的月份数")
+        parser.add_argument('--min-train-months', type=int, default=24, help="每折最少训练月份数")
+        parser.add_argument('--workers', type=int, default=None, help="并行训练的折数，默认按CPU数量")
+        parser.add_argument('--activate', action='store_true',
+                            help="训练完成后写入 CURRENT 文件，下次启动时加载新版本")
+
+    def handle(self, *args, **options):
+        model_version = options['model_version'] or time.strftime('%Y%m%d_%H%M%S')
+        output_dir = os.path.join(ml_loader.get_model_base_path(), 'versions', model_version)
+        if os.path.exists(output_dir):
+            raise CommandError(f"模型版本 {model_version} 已存在: {output_dir}")
+
+        # 沿用当前模型的特征列和超参数
+        ml_loader.load_ml_models()
+        ml_loader.load_and_process_historical_data()
+        if ml_loader.GLOBAL_DF_HISTORY_PROCESSED is None:
+            raise CommandError("历史数据加载失败，无法训练。")
+
+        try:
+            report = model_training.train_all_models(
+                ml_loader.GLOBAL_DF_HISTORY_PROCESSED,
+                output_dir,
+                n_folds=options['folds'],
+                horizon=options['horizon'],
+                min_train_months=options['min_train_months'],
+                workers=options['workers'],
+                log=self.stdout.write,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f"数据范围: {report['data_range'][0]} ~ {report['data_range'][1]}")
+        for model_name, model_report in report['models'].items():
+            self.stdout.write(f"{model_name}: 训练耗时 {model_report['train_seconds']} 秒")
+        self.stdout.write(self.style.SUCCESS(
+            f"模型版本 {model_version} 训练完成，总耗时 {report['total_seconds']} 秒，输出目录: {output_dir}"
+        ))
+
+        if options['activate']:
+            with open(os.path.join(ml_loader.get_model_base_path(), 'CURRENT'), 'w', encoding='utf-8') as f:
+                f.write(model_version)
+            self.stdout.write(self.style.SUCCESS(f"已激活模型版本 {model_version}，重启服务后生效。"))
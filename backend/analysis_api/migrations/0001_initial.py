@@ -0,0 +1,73 @@
+# Generated by Django 4.2 on 2026-10-19 10:12
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="GridForecast",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("grid_id", models.IntegerField(verbose_name="网格ID")),
+                ("month", models.DateField(verbose_name="预测月份")),
+                (
+                    "model_version",
+                    models.CharField(max_length=64, verbose_name="模型版本"),
+                ),
+                ("richness", models.FloatField(verbose_name="物种丰富度")),
+                ("abundance", models.FloatField(verbose_name="个体数量")),
+                ("shannon", models.FloatField(verbose_name="香农指数")),
+                ("composite_index", models.FloatField(verbose_name="综合指标")),
+                (
+                    "presence_prob",
+                    models.FloatField(blank=True, null=True, verbose_name="出现概率"),
+                ),
+                (
+                    "centroid",
+                    django.contrib.gis.db.models.fields.PointField(
+                        blank=True, null=True, srid=4326, verbose_name="网格中心点"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="创建时间"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="更新时间"),
+                ),
+            ],
+            options={
+                "verbose_name": "网格预测结果",
+                "verbose_name_plural": "网格预测结果",
+                "unique_together": {("grid_id", "month", "model_version")},
+            },
+        ),
+        migrations.AddIndex(
+            model_name="gridforecast",
+            index=models.Index(
+                fields=["model_version", "month"], name="analysis_ap_model_v_26f02b_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="gridforecast",
+            index=models.Index(
+                fields=["grid_id", "month"], name="analysis_ap_grid_id_7e0848_idx"
+            ),
+        ),
+    ]
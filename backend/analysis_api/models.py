@@ -1,3 +1,35 @@
 from django.db import models
+from django.contrib.gis.db import models as gis_models
 
-# Create your models here.
+
+class GridForecast(models.Model):
+    """
+    网格月度预测结果事实表，每次基线预测后批量写入。
+    """
+    grid_id = models.IntegerField(verbose_name="网格ID")
+    month = models.DateField(verbose_name="预测月份")  # 统一存为当月1日
+    model_version = models.CharField(max_length=64, verbose_name="模型版本")
+
+    richness = models.FloatField(verbose_name="物种丰富度")
+    abundance = models.FloatField(verbose_name="个体数量")
+    shannon = models.FloatField(verbose_name="香农指数")
+    composite_index = models.FloatField(verbose_name="综合指标")
+    presence_prob = models.FloatField(null=True, blank=True, verbose_name="出现概率")
+
+    # 网格中心点(WGS84)，用于按范围(bbox)查询
+    centroid = gis_models.PointField(srid=4326, null=True, blank=True, verbose_name="网格中心点")
+
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+
+    class Meta:
+        verbose_name = "网格预测结果"
+        verbose_name_plural = verbose_name
+        unique_together = [['grid_id', 'month', 'model_version']]
+        indexes = [
+            models.Index(fields=['model_version', 'month']),
+            models.Index(fields=['grid_id', 'month']),
+        ]
+
+    def __str__(self):
+        return f"Grid {self.grid_id} - {self.month:%Y-%m} ({self.model_version})"
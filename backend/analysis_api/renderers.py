@@ -0,0 +1,53 @@
+# analysis_api/renderers.py
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+
+from .services import columnar
+
+
+class ColumnarRenderer(BaseRenderer):
+    """
+    列式二进制渲染器的基类。视图通过 get_columnar_records(data) 返回 (扁平记录列表, 元数据)，
+    渲染器把它转换为 grid_id、date 与各指标的类型化数组；错误响应仍以 JSON 返回。
+    """
+    charset = None
+    render_style = 'binary'
+
+    def encode(self, columns, metadata):
+        raise NotImplementedError
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        renderer_context = renderer_context or {}
+        view = renderer_context.get('view')
+        response = renderer_context.get('response')
+        if (response is not None and response.status_code >= 400) or not hasattr(view, 'get_columnar_records'):
+            if response is not None:
+                response['Content-Type'] = 'application/json'
+            return JSONRenderer().render(data, 'application/json', renderer_context)
+
+        records, metadata = view.get_columnar_records(data)
+        return self.encode(columnar.records_to_columns(records), metadata)
+
+
+class TypedArrayRenderer(ColumnarRenderer):
+    """紧凑类型化数组格式，格式说明见 columnar.encode_typed_arrays。"""
+    media_type = 'application/x-typed-columns'
+    format = 'typed'
+
+    def encode(self, columns, metadata):
+        return columnar.encode_typed_arrays(columns, metadata)
+
+
+class ArrowStreamRenderer(ColumnarRenderer):
+    """Apache Arrow IPC 流格式。"""
+    media_type = 'application/vnd.apache.arrow.stream'
+    format = 'arrow'
+
+    def encode(self, columns, metadata):
+        return columnar.encode_arrow_stream(columns, metadata)
+
+
+# JSON 仍为默认格式；只有安装了 pyarrow 才提供 Arrow 输出
+COLUMNAR_RENDERER_CLASSES = list(api_settings.DEFAULT_RENDERER_CLASSES) + [TypedArrayRenderer]
+if columnar.pa is not None:
+    COLUMNAR_RENDERER_CLASSES.append(ArrowStreamRenderer)
@@ -2,6 +2,13 @@
 import pandas as pd
 from rest_framework import serializers
 
+from .services import ml_loader, feature_store
+
+# 近似模式 bootstrap 的计算量上限(样本行数 × 重抽样次数)，请求是同步计算的
+MAX_BOOTSTRAP_ROWS = 10000000
+# 置换检验的计算量上限(行数 × 字段数 × 置换次数)，请求是同步计算的
+MAX_PERMUTATION_WORK = 2000000000
+
 
 class SpearmanAnalysisSerializer(serializers.Serializer):
     """
@@ -25,12 +32,42 @@ class SpearmanAnalysisSerializer(serializers.Serializer):
         help_text="需要分析的字段，用分号(;)分隔。"
     )
 
+    mode = serializers.ChoiceField(
+        choices=['exact', 'approximate'],
+        default='exact',
+        help_text="exact 读取全部要素；approximate 在流式读取时抽样，并给出 bootstrap 置信区间。"
+    )
+
+    sample_size = serializers.IntegerField(
+        required=False, default=50000, min_value=100, max_value=200000,
+        help_text="近似模式下的样本行数上限，决定内存占用。"
+    )
+
+    bootstrap = serializers.IntegerField(
+        required=False, default=100, min_value=0, max_value=500,
+        help_text="近似模式下的 bootstrap 重抽样次数，0 表示不计算置信区间。"
+    )
+
+    confidence = serializers.FloatField(
+        required=False, default=0.95, min_value=0.5, max_value=0.999,
+        help_text="置信区间的置信水平。"
+    )
+
+    seed = serializers.IntegerField(required=False, min_value=0,
+                                    help_text="随机种子，便于复现抽样结果；只有给出种子时近似结果才会被缓存。")
+
     def validate_fields(self, value):
         field_list = value.split(';')
         if len(field_list) < 2:
             raise serializers.ValidationError("分析字段至少需要两个。")
         return value  # 验证通过后必须返回原始值
 
+    def validate(self, attrs):
+        if attrs['mode'] == 'approximate' and attrs['sample_size'] * attrs['bootstrap'] > MAX_BOOTSTRAP_ROWS:
+            raise serializers.ValidationError(
+                f"sample_size × bootstrap 不能超过 {MAX_BOOTSTRAP_ROWS}，请减少样本行数或重抽样次数。")
+        return attrs
+
 class PredictionInputSerializer(serializers.Serializer):
     start_month_str = serializers.CharField(max_length=7, help_text="预测开始月份，格式 YYYY-MM")
     num_months = serializers.ChoiceField(choices=[1, 3, 6], help_text="预测月数，可选 1, 3, 6")
@@ -41,4 +78,159 @@ class PredictionInputSerializer(serializers.Serializer):
             pd.to_datetime(value, format='%Y-%m')
         except ValueError:
             raise serializers.ValidationError("start_month_str 格式不正确，应为 YYYY-MM。")
-        return value
\ No newline at end of file
+        return value
+
+class ForecastQuerySerializer(serializers.Serializer):
+    """
+    用于验证预测结果查询参数的序列化器。
+    """
+    grid_ids = serializers.CharField(required=False, help_text="网格ID，多个用逗号(,)分隔")
+    start_month = serializers.CharField(required=False, max_length=7, help_text="起始月份，格式 YYYY-MM")
+    end_month = serializers.CharField(required=False, max_length=7, help_text="结束月份，格式 YYYY-MM")
+    bbox = serializers.CharField(required=False, help_text="范围 min_lon,min_lat,max_lon,max_lat (WGS84)")
+    model_version = serializers.CharField(required=False, max_length=64, help_text="模型版本，默认当前版本")
+
+    def validate_grid_ids(self, value):
+        try:
+            return [int(v) for v in value.split(',') if v.strip()]
+        except ValueError:
+            raise serializers.ValidationError("grid_ids 必须是逗号分隔的整数。")
+
+    def _validate_month(self, value, field_name):
+        try:
+            return pd.to_datetime(value, format='%Y-%m').date()
+        except ValueError:
+            raise serializers.ValidationError(f"{field_name} 格式不正确，应为 YYYY-MM。")
+
+    def validate_start_month(self, value):
+        return self._validate_month(value, 'start_month')
+
+    def validate_end_month(self, value):
+        return self._validate_month(value, 'end_month')
+
+    def validate_bbox(self, value):
+        try:
+            bbox = tuple(float(v) for v in value.split(','))
+        except ValueError:
+            raise serializers.ValidationError("bbox 必须是4个数字。")
+        if len(bbox) != 4 or bbox[0] >= bbox[2] or bbox[1] >= bbox[3]:
+            raise serializers.ValidationError("bbox 格式应为 min_lon,min_lat,max_lon,max_lat。")
+        return bbox
+
+
+class RollupQuerySerializer(serializers.Serializer):
+    """
+    用于验证区县/全市汇总查询参数的序列化器。
+    """
+    month = serializers.CharField(max_length=7, help_text="汇总月份，格式 YYYY-MM")
+    source = serializers.ChoiceField(choices=['forecast', 'history'], default='forecast',
+                                     help_text="数据来源: forecast(预测表) 或 history(历史数据)")
+    metrics = serializers.CharField(required=False, help_text="汇总指标，用逗号(,)分隔，默认全部")
+    model_version = serializers.CharField(required=False, max_length=64, help_text="模型版本，默认当前版本")
+
+    def validate_month(self, value):
+        try:
+            return pd.to_datetime(value, format='%Y-%m')
+        except ValueError:
+            raise serializers.ValidationError("month 格式不正确，应为 YYYY-MM。")
+
+
+class ExplanationInputSerializer(PredictionInputSerializer):
+    """
+    用于验证预测解释请求参数的序列化器，预测月份参数与基线预测一致。
+    """
+    grid_ids = serializers.ListField(child=serializers.IntegerField(), min_length=1, help_text="需要解释的网格ID列表")
+    target = serializers.ChoiceField(choices=['presence', 'richness', 'abundance', 'shannon'], default='richness',
+                                     help_text="解释的预测目标")
+    top_k = serializers.IntegerField(default=5, min_value=1, max_value=50, help_text="每个网格返回的驱动特征数量")
+
+
+class CorrelationInputSerializer(serializers.Serializer):
+    """
+    用于验证基于内存特征表的相关性分析请求参数的序列化器。
+    """
+    fields = serializers.ListField(child=serializers.CharField(), min_length=2, help_text="需要分析的字段列表")
+    method = serializers.ChoiceField(choices=['spearman', 'pearson', 'kendall'], default='spearman',
+                                     help_text="相关分析方法")
+    start_month = serializers.CharField(required=False, max_length=7, help_text="起始月份，格式 YYYY-MM")
+    end_month = serializers.CharField(required=False, max_length=7, help_text="结束月份，格式 YYYY-MM")
+    grid_ids = serializers.ListField(child=serializers.IntegerField(), required=False, help_text="只分析这些网格")
+
+    def _validate_month(self, value, field_name):
+        try:
+            return pd.to_datetime(value, format='%Y-%m')
+        except ValueError:
+            raise serializers.ValidationError(f"{field_name} 格式不正确，应为 YYYY-MM。")
+
+    def validate_start_month(self, value):
+        return self._validate_month(value, 'start_month')
+
+    def validate_end_month(self, value):
+        return self._validate_month(value, 'end_month')
+
+    def validate(self, attrs):
+        start_month, end_month = attrs.get('start_month'), attrs.get('end_month')
+        if start_month is not None and end_month is not None and start_month > end_month:
+            raise serializers.ValidationError("start_month 不能晚于 end_month。")
+        return attrs
+
+
+class FeatureCorrelationSerializer(CorrelationInputSerializer):
+    """
+    内存特征表相关性分析的参数，额外支持置换检验 p 值。
+    """
+    p_value_method = serializers.ChoiceField(choices=['asymptotic', 'permutation'], default='asymptotic',
+                                             help_text="asymptotic 为 t 分布近似，permutation 为置换检验")
+    n_permutations = serializers.IntegerField(required=False, default=999, min_value=99, max_value=9999,
+                                              help_text="置换次数")
+    seed = serializers.IntegerField(required=False, min_value=0, help_text="随机种子，便于复现置换结果")
+    block_size = serializers.FloatField(required=False, min_value=0, help_text="空间分块边长(网格坐标系单位，米)，"
+                                                                              "给出时按空间块整体置换")
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        if attrs['p_value_method'] == 'permutation' and attrs['method'] == 'kendall':
+            raise serializers.ValidationError("置换检验只支持 spearman 和 pearson。")
+        if attrs.get('block_size') == 0:
+            raise serializers.ValidationError("block_size 必须大于 0。")
+        if attrs['p_value_method'] == 'permutation' and ml_loader.GLOBAL_DF_HISTORY_PROCESSED is not None:
+            rows = len(feature_store.select_rows(attrs.get('start_month'), attrs.get('end_month'), attrs.get('grid_ids')))
+            if rows * len(attrs['fields']) * attrs['n_permutations'] > MAX_PERMUTATION_WORK:
+                raise serializers.ValidationError(
+                    f"行数 × 字段数 × 置换次数不能超过 {MAX_PERMUTATION_WORK}(当前筛选出 {rows} 行)，"
+                    f"请缩小月份或网格范围、减少字段或置换次数。")
+        return attrs
+
+
+class CorrelationTimeseriesSerializer(CorrelationInputSerializer):
+    """
+    用于验证逐月相关性时间序列请求参数的序列化器。
+    """
+    pairs = serializers.ListField(
+        child=serializers.ListField(child=serializers.CharField(), min_length=2, max_length=2),
+        required=False,
+        help_text="只返回这些字段对，例如 [[\"richness\", \"avg_pm25\"]]"
+    )
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        unknown = {f for pair in attrs.get('pairs', []) for f in pair} - set(attrs['fields'])
+        if unknown:
+            raise serializers.ValidationError(f"pairs 中的字段必须包含在 fields 中: {sorted(unknown)}")
+        return attrs
+
+
+class TileQuerySerializer(serializers.Serializer):
+    """
+    用于验证矢量瓦片查询参数的序列化器。
+    """
+    layer = serializers.ChoiceField(choices=['history', 'forecast'], default='history',
+                                    help_text="history 为历史观测与土地利用，forecast 为入库预测")
+    month = serializers.CharField(required=False, max_length=7, help_text="月份，格式 YYYY-MM，默认最新月份")
+    model_version = serializers.CharField(required=False, max_length=64, help_text="模型版本，默认当前版本")
+
+    def validate_month(self, value):
+        try:
+            return pd.to_datetime(value, format='%Y-%m').date()
+        except ValueError:
+            raise serializers.ValidationError("month 格式不正确，应为 YYYY-MM。")
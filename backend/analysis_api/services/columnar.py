@@ -0,0 +1,113 @@
+# analysis_api/services/columnar.py
+import json
+import struct
+from collections import OrderedDict
+import numpy as np
+
+try:
+    import pyarrow as pa
+except ImportError:  # 没有 pyarrow 时不提供 Arrow 输出
+    pa = None
+
+TYPED_ARRAY_MAGIC = b'TCOL'
+TYPED_ARRAY_ALIGNMENT = 8
+
+
+def prediction_results_to_records(results):
+    """把 perform_prediction 的嵌套输出展开为 (grid_id, date, 各指标) 的扁平记录。"""
+    return [
+        dict({'grid_id': item['grid_id'], 'date': pred['date'][:7]}, **pred['predictions'])
+        for item in results
+        for pred in item['predictions']
+    ]
+
+
+def timeseries_to_records(timeseries):
+    """把单网格时间序列展开为扁平记录，source 列区分历史观测与预测。"""
+    records = []
+    for row in timeseries['history']:
+        record = {'grid_id': timeseries['grid_id'], 'date': row['date'], 'source': 'history'}
+        record.update({k: v for k, v in row.items() if k not in ('date', 'environment')})
+        record.update(row.get('environment', {}))
+        records.append(record)
+    for row in timeseries['forecast']:
+        record = {'grid_id': timeseries['grid_id'], 'date': row['month'], 'source': 'forecast'}
+        record.update({k: v for k, v in row.items() if k != 'month'})
+        records.append(record)
+    return records
+
+
+def _typed_column(values):
+    """
+    推断列类型：全为整数且无空值时为 int64，数值列为 float64(空值为 NaN)，其余按字符串字典编码。
+    返回 (dtype 名, 数组, 字典编码的类别列表或 None)。
+    """
+    non_null = [v for v in values if v is not None]
+    if all(isinstance(v, (bool, int, np.integer)) for v in non_null) and len(non_null) == len(values):
+        return 'int64', np.asarray(values, dtype=np.int64), None
+    if all(isinstance(v, (int, float, np.integer, np.floating)) for v in non_null):
+        return 'float64', np.array([np.nan if v is None else v for v in values], dtype=np.float64), None
+    categories, codes = np.unique(np.array(['' if v is None else str(v) for v in values], dtype=object),
+                                  return_inverse=True)
+    return 'dictionary', codes.astype(np.int32), categories.tolist()
+
+
+def records_to_columns(records):
+    """把扁平记录列表转换为 {列名: (dtype, 数组, 类别)}，列顺序沿用第一次出现的顺序。"""
+    names = list(OrderedDict.fromkeys(key for record in records for key in record))
+    return OrderedDict(
+        (name, _typed_column([record.get(name) for record in records]))
+        for name in names
+    )
+
+
+def encode_typed_arrays(columns, metadata=None):
+    """
+    紧凑列式二进制格式 (application/x-typed-columns):
+      4 字节魔数 b'TCOL' | uint32 小端头部长度 | UTF-8 JSON 头部 | 各列数据
+    头部为 {"length": 行数, "metadata": {...}, "columns": [{"name", "dtype", "offset", "byte_length",
+    "categories"(仅 dictionary)}]}，offset 相对于数据区起点且按 8 字节对齐。
+    int64/float64 为小端原始数组，可直接映射为 JS 的 BigInt64Array/Float64Array；
+    dictionary 列为 int32 编码，取值为 categories 中的下标。
+    """
+    column_headers, buffers, offset = [], [], 0
+    length = 0
+    for name, (dtype, array, categories) in columns.items():
+        data = array.astype(array.dtype.newbyteorder('<'), copy=False).tobytes()
+        header = {'name': name, 'dtype': dtype, 'offset': offset, 'byte_length': len(data)}
+        if categories is not None:
+            header['categories'] = categories
+        column_headers.append(header)
+        padding = -len(data) % TYPED_ARRAY_ALIGNMENT
+        buffers.append(data + b'\0' * padding)
+        offset += len(data) + padding
+        length = len(array)
+
+    header_bytes = json.dumps({'length': length, 'metadata': metadata or {}, 'columns': column_headers},
+                              separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    # 头部补齐，使数据区起点同样 8 字节对齐
+    header_bytes += b' ' * (-(len(header_bytes) + 8) % TYPED_ARRAY_ALIGNMENT)
+    return TYPED_ARRAY_MAGIC + struct.pack('<I', len(header_bytes)) + header_bytes + b''.join(buffers)
+
+
+def encode_arrow_stream(columns, metadata=None):
+    """把列编码为 Arrow IPC 流，字符串列使用字典类型，metadata 写入 schema 元数据。"""
+    if pa is None:
+        raise NotImplementedError("服务器未安装 pyarrow，无法输出 Arrow 格式。")
+    arrays, names = [], []
+    for name, (dtype, array, categories) in columns.items():
+        if dtype == 'dictionary':
+            arrays.append(pa.DictionaryArray.from_arrays(pa.array(array, pa.int32()), pa.array(categories, pa.string())))
+        elif dtype == 'float64':
+            arrays.append(pa.array(array, pa.float64(), from_pandas=True))
+        else:
+            arrays.append(pa.array(array, pa.int64()))
+        names.append(name)
+
+    schema_metadata = {k: json.dumps(v, ensure_ascii=False) for k, v in (metadata or {}).items()}
+    batch = pa.RecordBatch.from_arrays(arrays, names=names)
+    schema = batch.schema.with_metadata(schema_metadata)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        writer.write_batch(batch.replace_schema_metadata(schema_metadata))
+    return sink.getvalue().to_pybytes()
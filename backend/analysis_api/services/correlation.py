@@ -0,0 +1,311 @@
+# analysis_api/services/correlation.py
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+from scipy import stats
+
+MIN_PAIR_OBSERVATIONS = 3
+CORRELATION_METHODS = ('spearman', 'pearson', 'kendall')
+
+# 置换检验: 每个任务负责的置换次数，以及单批矩阵运算允许的元素数上限(控制内存)
+PERMUTATION_CHUNK_SIZE = 100
+PERMUTATION_BATCH_ELEMENTS = 20_000_000
+# 置换检验共用的进程池，只占一半 CPU，给 Web 请求留出余量
+PERMUTATION_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+
+_PERMUTATION_POOL = None
+_pool_lock = threading.Lock()
+
+
+def _group_columns_by_mask(valid):
+    """
+    按非空掩码对列分组。缺失模式相同的列共享同一组成对完整观测，
+    因此只需排序一次、做一次矩阵乘法即可得到组内全部相关系数。
+    """
+    groups = {}
+    for j in range(valid.shape[1]):
+        groups.setdefault(valid[:, j].tobytes(), []).append(j)
+    return [(valid[:, cols[0]], np.array(cols)) for cols in groups.values()]
+
+
+def _standardize(block):
+    """列中心化并缩放为单位范数，常数列返回 NaN。"""
+    centered = block - block.mean(axis=0)
+    norms = np.sqrt((centered * centered).sum(axis=0))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return centered / np.where(norms > 0, norms, np.nan)
+
+
+def _pvalues_from_r(r, n):
+    """与 scipy.stats.spearmanr/pearsonr 相同的 t 分布双侧检验。"""
+    dof = n - 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t = r * np.sqrt(dof / ((1.0 - r) * (1.0 + r)))
+        p = 2 * stats.t.sf(np.abs(t), dof)
+    p = np.where(np.abs(r) >= 1.0, 0.0, p)
+    return np.where(np.isnan(r) | (n < MIN_PAIR_OBSERVATIONS), np.nan, p)
+
+
+def _fill_kendall(ranks, cols_i, cols_j, same_group, corr, p_values):
+    """在已排序的数据块上逐对计算 Kendall tau-b，结果写入 corr/p_values。"""
+    n_i = len(cols_i)
+    for a in range(n_i):
+        b_positions = range(a + 1, n_i) if same_group else range(n_i, ranks.shape[1])
+        for b in b_positions:
+            tau, p = stats.kendalltau(ranks[:, a], ranks[:, b])
+            col_a = cols_i[a]
+            col_b = cols_i[b] if same_group else cols_j[b - n_i]
+            corr[col_a, col_b] = corr[col_b, col_a] = tau
+            p_values[col_a, col_b] = p_values[col_b, col_a] = p
+
+
+def correlation_matrix(data, method='spearman'):
+    """
+    计算 data (n 行 × k 列，缺失值为 NaN) 各列之间的成对完整相关系数矩阵与 p 值矩阵。
+    每种缺失模式组合只排序一次，Spearman/Pearson 通过矩阵乘法得到整块相关系数，
+    Kendall 在同一份排序结果上逐对计算；每个分组对只计算一次再镜像。
+    返回 (相关系数矩阵, p值矩阵, 成对观测数矩阵)。
+    """
+    if method not in CORRELATION_METHODS:
+        raise ValueError(f"不支持的相关分析方法: {method}")
+
+    data = np.asarray(data, dtype=float)
+    valid = ~np.isnan(data)
+    k = data.shape[1]
+    valid_f = valid.astype(float)
+    n_obs = (valid_f.T @ valid_f).astype(int)
+    corr = np.full((k, k), np.nan)
+    p_values = np.full((k, k), np.nan)
+
+    groups = _group_columns_by_mask(valid)
+    for gi, (mask_i, cols_i) in enumerate(groups):
+        for gj in range(gi, len(groups)):
+            mask_j, cols_j = groups[gj]
+            rows = mask_i & mask_j
+            if rows.sum() < MIN_PAIR_OBSERVATIONS:
+                continue
+
+            cols = cols_i if gi == gj else np.concatenate([cols_i, cols_j])
+            block = data[np.ix_(rows, cols)]
+            if method != 'pearson':
+                block = stats.rankdata(block, axis=0)
+            if method == 'kendall':
+                _fill_kendall(block, cols_i, cols_j, gi == gj, corr, p_values)
+                continue
+            z = _standardize(block)
+            block_corr = z.T @ z
+            if gi == gj:
+                corr[np.ix_(cols_i, cols_i)] = block_corr
+            else:
+                cross = block_corr[:len(cols_i), len(cols_i):]
+                corr[np.ix_(cols_i, cols_j)] = cross
+                corr[np.ix_(cols_j, cols_i)] = cross.T
+
+    corr = np.where(n_obs < MIN_PAIR_OBSERVATIONS, np.nan, np.clip(corr, -1.0, 1.0))
+    np.fill_diagonal(corr, 1.0)
+
+    if method != 'kendall':
+        p_values = _pvalues_from_r(corr, n_obs)
+    p_values = np.where(np.isnan(corr), np.nan, p_values)
+    np.fill_diagonal(p_values, 0.0)
+    return corr, p_values, n_obs
+
+
+def matrix_to_results(field_list, corr, p_values, ci_lower=None, ci_upper=None):
+    """
+    把相关矩阵转换为 {字段: {字段: {"correlation", "p_value"}}} 的接口返回格式。
+    给出置信区间时，每一项额外包含 "ci": [下限, 上限]。
+    """
+    def _value(x):
+        return None if np.isnan(x) else float(x)
+
+    results = {field: {} for field in field_list}
+    for i, col1 in enumerate(field_list):
+        for j, col2 in enumerate(field_list):
+            results[col1][col2] = {"correlation": _value(corr[i, j]), "p_value": _value(p_values[i, j])}
+            if ci_lower is not None:
+                results[col1][col2]["ci"] = [_value(ci_lower[i, j]), _value(ci_upper[i, j])]
+    return results
+
+
+def bootstrap_confidence_intervals(data, method='spearman', n_boot=200, confidence=0.95, seed=None):
+    """
+    对样本行做有放回重抽样，每次重算整块相关矩阵，返回百分位法置信区间 (下限矩阵, 上限矩阵)。
+    """
+    data = np.asarray(data, dtype=float)
+    rng = np.random.default_rng(seed)
+    k = data.shape[1]
+    boot = np.empty((n_boot, k, k))
+    for b in range(n_boot):
+        rows = rng.integers(0, len(data), len(data))
+        boot[b] = correlation_matrix(data[rows], method=method)[0]
+    alpha = (1.0 - confidence) / 2
+    with np.errstate(invalid='ignore'):
+        lower, upper = np.nanquantile(boot, [alpha, 1.0 - alpha], axis=0)
+    return lower, upper
+
+
+def correlation_cube(matrices, method='spearman', workers=None):
+    """
+    对多个时间切片(每个为 n 行 × k 列矩阵)并行计算相关矩阵，
+    返回形状为 (切片数, k, k) 的相关系数数组和 p 值数组。
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(lambda data: correlation_matrix(data, method=method), matrices))
+    corr = np.stack([r[0] for r in results])
+    p_values = np.stack([r[1] for r in results])
+    return corr, p_values
+
+
+def nan_to_none(array):
+    """把数组转换为嵌套列表，NaN 转为 None，便于 JSON 输出。"""
+    return np.where(np.isnan(array), None, np.round(array, 6)).tolist()
+
+
+def _permutation_orders(rng, n, k, block_rows):
+    """
+    为 k 列各生成一个独立的行顺序 (k × n)。
+    给出空间分块时整块移动、块内顺序不变，保留块内的空间自相关结构。
+    """
+    if block_rows is None:
+        return rng.permuted(np.tile(np.arange(n), (k, 1)), axis=1)
+    return np.array([np.concatenate([block_rows[b] for b in rng.permutation(len(block_rows))]) for _ in range(k)])
+
+
+def _count_permutation_exceedances(z, observed, n_permutations, seed_sequence, block_rows=None):
+    """
+    在标准化数据块 z 上做 n_permutations 次列独立置换，统计 |置换相关系数| >= |观测相关系数| 的次数。
+    每批置换叠成 (批次, k, n) 数组，一次批量矩阵乘法得到整批的相关矩阵。
+    """
+    rng = np.random.default_rng(seed_sequence)
+    n, k = z.shape
+    cols = np.arange(k)[None, :, None]
+    threshold = np.abs(observed) - 1e-12
+    batch_size = max(1, min(n_permutations, PERMUTATION_BATCH_ELEMENTS // max(n * k, 1)))
+    counts = np.zeros((k, k), dtype=np.int64)
+    done = 0
+    while done < n_permutations:
+        batch = min(batch_size, n_permutations - done)
+        orders = np.stack([_permutation_orders(rng, n, k, block_rows) for _ in range(batch)])
+        permuted = z[orders, cols]
+        null = np.matmul(permuted, permuted.transpose(0, 2, 1))
+        counts += (np.abs(null) >= threshold).sum(axis=0)
+        done += batch
+    return counts
+
+
+def _get_permutation_pool():
+    """惰性创建的模块级进程池，各请求共用，进程池损坏后重建。"""
+    global _PERMUTATION_POOL
+    with _pool_lock:
+        if _PERMUTATION_POOL is None:
+            _PERMUTATION_POOL = ProcessPoolExecutor(max_workers=PERMUTATION_WORKERS)
+        return _PERMUTATION_POOL
+
+
+def _reset_permutation_pool():
+    global _PERMUTATION_POOL
+    with _pool_lock:
+        if _PERMUTATION_POOL is not None:
+            _PERMUTATION_POOL.shutdown(wait=False, cancel_futures=True)
+        _PERMUTATION_POOL = None
+
+
+def _count_from_files(z_path, observed, n_permutations, seed_sequence, block_paths=None):
+    """
+    进程池任务：从内存映射文件读取标准化数据块(所有任务共用操作系统页缓存，不再逐任务序列化 z)，
+    block_paths 为 (按块排列的行号, 各块起止位置) 两个文件。
+    """
+    z = np.load(z_path, mmap_mode='r')
+    block_rows = None
+    if block_paths is not None:
+        order, bounds = np.load(block_paths[0]), np.load(block_paths[1])
+        block_rows = np.split(order, bounds[1:-1])
+    return _count_permutation_exceedances(z, observed, n_permutations, seed_sequence, block_rows)
+
+
+def permutation_pvalues(data, method='spearman', n_permutations=999, seed=None, block_labels=None):
+    """
+    用置换检验计算整块字段矩阵的双侧 p 值，替代对空间自相关数据不可靠的渐近 p 值。
+    每种缺失模式组合的数据块只排序、标准化一次并写入临时文件，置换次数按固定大小切分成任务，
+    在模块级进程池中并行执行，任务通过内存映射读取数据块；
+    各任务的随机数由同一个 SeedSequence 派生，结果只取决于 seed，与进程数无关。
+    block_labels 为每行的空间块编号，给出时按块整体置换(空间分块置换)。
+    仅支持 Spearman 和 Pearson。返回 p 值矩阵，p = (超过次数 + 1) / (置换次数 + 1)。
+    """
+    if method not in ('spearman', 'pearson'):
+        raise ValueError(f"置换检验只支持 spearman 和 pearson，不支持: {method}")
+
+    data = np.asarray(data, dtype=float)
+    valid = ~np.isnan(data)
+    k = data.shape[1]
+    block_labels = None if block_labels is None else np.asarray(block_labels)
+    n_chunks = -(-n_permutations // PERMUTATION_CHUNK_SIZE)
+    workdir = tempfile.mkdtemp(prefix='permutation_')
+    try:
+        # 与 correlation_matrix 相同的分组方式，每个分组对是一个独立的置换任务
+        blocks = []
+        groups = _group_columns_by_mask(valid)
+        for gi, (mask_i, cols_i) in enumerate(groups):
+            for gj in range(gi, len(groups)):
+                mask_j, cols_j = groups[gj]
+                rows = mask_i & mask_j
+                if rows.sum() < MIN_PAIR_OBSERVATIONS:
+                    continue
+                cols = cols_i if gi == gj else np.concatenate([cols_i, cols_j])
+                block = data[np.ix_(rows, cols)]
+                if method == 'spearman':
+                    block = stats.rankdata(block, axis=0)
+                z = np.nan_to_num(_standardize(block))
+                z_path = os.path.join(workdir, f'z_{len(blocks)}.npy')
+                np.save(z_path, z)
+                block_paths = None
+                if block_labels is not None:
+                    _, codes = np.unique(block_labels[rows], return_inverse=True)
+                    codes = codes.ravel()
+                    order = np.argsort(codes, kind='stable')
+                    bounds = np.concatenate([[0], np.cumsum(np.bincount(codes))])
+                    block_paths = (os.path.join(workdir, f'order_{len(blocks)}.npy'),
+                                   os.path.join(workdir, f'bounds_{len(blocks)}.npy'))
+                    np.save(block_paths[0], order)
+                    np.save(block_paths[1], bounds)
+                blocks.append((cols_i, cols_j, gi == gj, z.T @ z, z_path, block_paths))
+
+        children = iter(np.random.SeedSequence(seed).spawn(len(blocks) * n_chunks))
+        executor = _get_permutation_pool()
+        futures = []
+        for cols_i, cols_j, same_group, observed, z_path, block_paths in blocks:
+            block_futures = []
+            for c in range(n_chunks):
+                size = min(PERMUTATION_CHUNK_SIZE, n_permutations - c * PERMUTATION_CHUNK_SIZE)
+                block_futures.append(executor.submit(_count_from_files, z_path, observed, size,
+                                                     next(children), block_paths))
+            futures.append((cols_i, cols_j, same_group, block_futures))
+
+        p_values = np.full((k, k), np.nan)
+        try:
+            for cols_i, cols_j, same_group, block_futures in futures:
+                counts = sum(future.result() for future in block_futures)
+                block_p = (counts + 1) / (n_permutations + 1)
+                if same_group:
+                    p_values[np.ix_(cols_i, cols_i)] = block_p
+                else:
+                    cross = block_p[:len(cols_i), len(cols_i):]
+                    p_values[np.ix_(cols_i, cols_j)] = cross
+                    p_values[np.ix_(cols_j, cols_i)] = cross.T
+        except BrokenProcessPool:
+            _reset_permutation_pool()
+            raise
+        finally:
+            for _, _, _, block_futures in futures:
+                for future in block_futures:
+                    future.cancel()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    np.fill_diagonal(p_values, 0.0)
+    return p_values
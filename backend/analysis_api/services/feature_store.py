@@ -0,0 +1,93 @@
+# analysis_api/services/feature_store.py
+import numpy as np
+import pandas as pd
+
+from . import ml_loader
+
+
+def get_history_frame():
+    history_df = ml_loader.GLOBAL_DF_HISTORY_PROCESSED
+    if history_df is None:
+        raise Exception("历史数据尚未加载。")
+    return history_df
+
+
+def validate_numeric_fields(fields):
+    """检查字段都存在于内存特征表中且为数值型，否则抛出 ValueError。"""
+    history_df = get_history_frame()
+    missing = [f for f in fields if f not in history_df.columns]
+    if missing:
+        raise ValueError(f"特征表中不存在字段: {missing}")
+    non_numeric = [f for f in fields if not pd.api.types.is_numeric_dtype(history_df[f])]
+    if non_numeric:
+        raise ValueError(f"字段不是数值型，无法计算相关性: {non_numeric}")
+
+
+def select_rows(start_month=None, end_month=None, grid_ids=None):
+    """
+    按月份区间和网格筛选内存特征表，返回筛选后的 DataFrame 视图。
+    指定网格时利用预计算的行区间直接切片，不扫描全表。
+    """
+    history_df = get_history_frame()
+    if grid_ids:
+        slices = [ml_loader.GRID_ROW_SLICES[g] for g in grid_ids if g in ml_loader.GRID_ROW_SLICES]
+        if not slices:
+            return history_df.iloc[0:0]
+        positions = np.concatenate([np.arange(start, stop) for start, stop in slices])
+        history_df = history_df.iloc[positions]
+
+    if start_month is not None or end_month is not None:
+        mask = np.ones(len(history_df), dtype=bool)
+        if start_month is not None:
+            mask &= (history_df['timestamp'] >= pd.Timestamp(start_month)).to_numpy()
+        if end_month is not None:
+            mask &= (history_df['timestamp'] < pd.Timestamp(end_month) + pd.offsets.MonthBegin(1)).to_numpy()
+        history_df = history_df[mask]
+    return history_df
+
+
+def select_feature_matrix(fields, start_month=None, end_month=None, grid_ids=None, return_grid_ids=False):
+    """
+    返回筛选后各字段组成的 n 行 × k 列 float64 矩阵，缺失值为 NaN。
+    return_grid_ids 为 True 时同时返回每行对应的 Grid_ID 数组。
+    """
+    validate_numeric_fields(fields)
+    rows = select_rows(start_month, end_month, grid_ids)
+    data = rows[fields].to_numpy(dtype=float)
+    if return_grid_ids:
+        return data, rows['Grid_ID'].to_numpy()
+    return data
+
+
+def spatial_block_labels(grid_ids, block_size):
+    """
+    按网格质心所在的 block_size × block_size 方格(网格坐标系单位，通常为米)给每行分配空间块编号，
+    用于空间分块置换检验。
+    """
+    grids = ml_loader.GLOBAL_GRID_GDF
+    if grids is None:
+        raise Exception("网格几何数据尚未加载。")
+    centroids = grids.geometry.centroid
+    cells = np.floor(np.column_stack([centroids.x, centroids.y]) / block_size).astype(np.int64)
+    _, grid_blocks = np.unique(cells, axis=0, return_inverse=True)
+    block_by_grid = pd.Series(grid_blocks.ravel(), index=grids['Grid_ID'].astype(int).values)
+    labels = block_by_grid.reindex(np.asarray(grid_ids, dtype=int)).to_numpy()
+    # 没有几何的网格各自成为单独的块
+    missing = np.isnan(labels)
+    labels[missing] = block_by_grid.max() + 1 + np.arange(missing.sum())
+    return labels.astype(np.int64)
+
+
+def select_monthly_feature_matrices(fields, start_month=None, end_month=None, grid_ids=None):
+    """
+    按月份拆分筛选后的特征矩阵，返回 (月份列表, 每个月的 n 行 × k 列矩阵列表)。
+    """
+    validate_numeric_fields(fields)
+    rows = select_rows(start_month, end_month, grid_ids)
+    codes, months = pd.factorize(rows['timestamp'], sort=True)
+    keep = codes >= 0
+    codes = codes[keep]
+    order = np.argsort(codes, kind='stable')
+    data = rows[fields].to_numpy(dtype=float)[keep][order]
+    boundaries = np.cumsum(np.bincount(codes, minlength=len(months)))[:-1]
+    return list(months), np.split(data, boundaries)
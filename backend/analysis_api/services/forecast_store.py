@@ -0,0 +1,121 @@
+# analysis_api/services/forecast_store.py
+import pandas as pd
+from django.contrib.gis.geos import Point, Polygon
+from django.db import transaction
+from django.db.models import Min
+
+from ..models import GridForecast
+from . import ml_loader
+
+BULK_BATCH_SIZE = 2000
+FORECAST_VALUE_FIELDS = ['richness', 'abundance', 'shannon', 'composite_index', 'presence_prob']
+
+_CENTROID_CACHE = {}
+_FIRST_MONTH_CACHE = {}
+
+
+def _get_grid_centroids():
+    """
+    返回 {Grid_ID: (lon, lat)}，网格几何不变，只在第一次调用时计算。
+    """
+    if _CENTROID_CACHE:
+        return _CENTROID_CACHE
+
+    grids = ml_loader.GLOBAL_GRID_GDF
+    if grids is None or grids.empty or grids.crs is None:
+        return _CENTROID_CACHE
+
+    centroids = grids.geometry.centroid.to_crs(epsg=4326)
+    for grid_id, point in zip(grids['Grid_ID'], centroids):
+        _CENTROID_CACHE[int(grid_id)] = (point.x, point.y)
+    return _CENTROID_CACHE
+
+
+def resolve_model_version(model_version=None):
+    """未指定版本时，优先使用当前加载的模型版本，否则取表中最新写入的版本。"""
+    if model_version:
+        return model_version
+    if ml_loader.MODEL_VERSION and GridForecast.objects.filter(model_version=ml_loader.MODEL_VERSION).exists():
+        return ml_loader.MODEL_VERSION
+    return GridForecast.objects.order_by('-updated_at').values_list('model_version', flat=True).first()
+
+
+def first_forecast_month(model_version):
+    """某模型版本最早的预测月份(date)，没有预测结果时返回 None；按版本缓存，该版本重新入库时清除。"""
+    month = _FIRST_MONTH_CACHE.get(model_version)
+    if month is None:
+        month = GridForecast.objects.filter(model_version=model_version).aggregate(first=Min('month'))['first']
+        if month is not None:
+            _FIRST_MONTH_CACHE[model_version] = month
+    return month
+
+
+def save_forecast_results(prediction_results, model_version):
+    """
+    将 perform_prediction 的输出批量写入 GridForecast 表。
+    同一 (grid_id, month, model_version) 已存在时覆盖旧值。
+    """
+    centroids = _get_grid_centroids()
+    forecasts = []
+    for item in prediction_results:
+        grid_id = int(item['grid_id'])
+        lon_lat = centroids.get(grid_id)
+        centroid = Point(lon_lat[0], lon_lat[1], srid=4326) if lon_lat else None
+        for pred in item['predictions']:
+            values = pred['predictions']
+            forecasts.append(GridForecast(
+                grid_id=grid_id,
+                month=pd.Timestamp(pred['date']).date().replace(day=1),
+                model_version=model_version,
+                richness=values['richness'],
+                abundance=values['abundance'],
+                shannon=values['shannon'],
+                composite_index=values['composite_index'],
+                presence_prob=pred['context_features'].get('presence_probability'),
+                centroid=centroid,
+            ))
+
+    if not forecasts:
+        return 0
+
+    with transaction.atomic():
+        GridForecast.objects.bulk_create(
+            forecasts,
+            batch_size=BULK_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['grid_id', 'month', 'model_version'],
+            update_fields=FORECAST_VALUE_FIELDS + ['centroid', 'updated_at'],
+        )
+    _FIRST_MONTH_CACHE.pop(model_version, None)
+    print(f"预测结果已入库: {len(forecasts)} 条 (模型版本 {model_version})")
+    return len(forecasts)
+
+
+def query_forecasts(model_version, grid_ids=None, start_month=None, end_month=None, bbox=None):
+    """
+    按网格、月份区间和范围查询预测表，返回按 (grid_id, month) 排序的字典列表。
+    bbox 为 WGS84 下的 (min_lon, min_lat, max_lon, max_lat)。
+    """
+    queryset = GridForecast.objects.filter(model_version=model_version)
+    if grid_ids:
+        queryset = queryset.filter(grid_id__in=grid_ids)
+    if start_month:
+        queryset = queryset.filter(month__gte=start_month)
+    if end_month:
+        queryset = queryset.filter(month__lte=end_month)
+    if bbox:
+        queryset = queryset.filter(centroid__within=Polygon.from_bbox(bbox))
+
+    rows = queryset.order_by('grid_id', 'month').values_list('grid_id', 'month', *FORECAST_VALUE_FIELDS)
+    return [
+        {
+            'grid_id': grid_id,
+            'month': month.strftime('%Y-%m'),
+            'richness': richness,
+            'abundance': abundance,
+            'shannon': shannon,
+            'composite_index': composite_index,
+            'presence_prob': presence_prob,
+        }
+        for grid_id, month, richness, abundance, shannon, composite_index, presence_prob in rows
+    ]
@@ -0,0 +1,135 @@
+# analysis_api/services/grid_descriptor.py
+import json
+import base64
+import hashlib
+import threading
+import numpy as np
+import shapely
+
+from . import ml_loader
+
+# 判断规则渔网时允许的相对误差(相对于网格边长)
+REGULAR_GRID_TOLERANCE = 1e-6
+
+# 预计算的描述: {'source', 'descriptor', 'etag'}
+GRID_DESCRIPTOR = None
+
+_build_lock = threading.Lock()
+
+
+def _crs_info(crs):
+    if crs is None:
+        return None
+    return {'epsg': crs.to_epsg(), 'wkt': crs.to_wkt()}
+
+
+def _detect_fishnet(geometries):
+    """
+    判断网格是否为 CreateFishnet 生成的等大、轴对齐的正方形渔网。
+    是则返回 (原点x, 原点y, 边长, 行号数组, 列号数组)，行号自下而上、列号自左而右；否则返回 None。
+    """
+    if len(geometries) == 0:
+        return None
+    bounds = shapely.bounds(geometries)
+    widths = bounds[:, 2] - bounds[:, 0]
+    heights = bounds[:, 3] - bounds[:, 1]
+    cell_size = float(np.median(widths))
+    if cell_size <= 0:
+        return None
+    tolerance = cell_size * REGULAR_GRID_TOLERANCE
+
+    # 等大的正方形，且面积等于外包矩形面积(即本身就是轴对齐矩形)
+    if np.abs(widths - cell_size).max() > tolerance or np.abs(heights - cell_size).max() > tolerance:
+        return None
+    if np.abs(shapely.area(geometries) - widths * heights).max() > tolerance * cell_size:
+        return None
+
+    origin_x, origin_y = float(bounds[:, 0].min()), float(bounds[:, 1].min())
+    cols_f = (bounds[:, 0] - origin_x) / cell_size
+    rows_f = (bounds[:, 1] - origin_y) / cell_size
+    cols, rows = np.rint(cols_f).astype(int), np.rint(rows_f).astype(int)
+    if max(np.abs(cols_f - cols).max(), np.abs(rows_f - rows).max()) > REGULAR_GRID_TOLERANCE:
+        return None
+    return origin_x, origin_y, cell_size, rows, cols
+
+
+def _encode_mask(rows, cols, n_rows, n_cols):
+    """把存在网格的位置编码为按行优先、自下而上排列的位图(base64)。"""
+    mask = np.zeros(n_rows * n_cols, dtype=bool)
+    mask[rows * n_cols + cols] = True
+    return base64.b64encode(np.packbits(mask).tobytes()).decode('ascii')
+
+
+def _cell_index(grid_ids, rows, cols, n_rows, n_cols):
+    """
+    Grid_ID 与 (行, 列) 的对应关系。Grid_ID 来自渔网的 OID，通常按行连续编号，
+    这时只需给出首个 ID、编号方向和存在掩码；否则退回逐网格的行列数组。
+    """
+    candidates = {
+        'row_major_bottom_up': rows * n_cols + cols,
+        'row_major_top_down': (n_rows - 1 - rows) * n_cols + cols,
+    }
+    for layout, offsets in candidates.items():
+        first_id = grid_ids[0] - offsets[0]
+        if np.array_equal(grid_ids - offsets, np.full(len(grid_ids), first_id)):
+            index = {'layout': layout, 'first_id': int(first_id)}
+            if len(grid_ids) < n_rows * n_cols:
+                index['mask'] = _encode_mask(rows, cols, n_rows, n_cols)
+            return index
+    return {
+        'layout': 'explicit',
+        'grid_id': grid_ids.tolist(),
+        'row': rows.tolist(),
+        'col': cols.tolist(),
+    }
+
+
+def build_grid_descriptor():
+    """
+    为规则渔网生成紧凑描述：坐标系、原点(左下角)、边长、行列数以及 Grid_ID↔(行, 列) 对应关系，
+    客户端可据此自行重建全部网格多边形。网格不规则时返回 {'type': 'polygons'}，客户端退回完整 GeoJSON。
+    """
+    global GRID_DESCRIPTOR
+
+    grids = ml_loader.GLOBAL_GRID_GDF
+    if grids is None:
+        raise Exception("网格几何数据尚未加载。")
+
+    grid_ids = grids['Grid_ID'].astype(np.int64).values
+    fishnet = _detect_fishnet(grids.geometry.values)
+    if fishnet is None:
+        descriptor = {'type': 'polygons', 'crs': _crs_info(grids.crs), 'count': int(len(grids))}
+        print("网格不是规则渔网，网格描述退回多边形模式。")
+    else:
+        origin_x, origin_y, cell_size, rows, cols = fishnet
+        n_rows, n_cols = int(rows.max()) + 1, int(cols.max()) + 1
+        descriptor = {
+            'type': 'fishnet',
+            'crs': _crs_info(grids.crs),
+            'origin': [origin_x, origin_y],
+            'cell_size': cell_size,
+            'n_rows': n_rows,
+            'n_cols': n_cols,
+            'count': int(len(grids)),
+            'index': _cell_index(grid_ids, rows, cols, n_rows, n_cols),
+        }
+        print(f"网格描述生成完成: {n_rows} 行 × {n_cols} 列, 边长 {cell_size}, 编号方式 {descriptor['index']['layout']}。")
+
+    body = json.dumps(descriptor, separators=(',', ':'), sort_keys=True).encode('utf-8')
+    GRID_DESCRIPTOR = {
+        'source': grids,
+        'descriptor': descriptor,
+        'etag': '"%s"' % hashlib.sha1(body).hexdigest(),
+    }
+    return GRID_DESCRIPTOR
+
+
+def get_grid_descriptor():
+    """返回预计算的网格描述；网格表被重新加载后自动重建。"""
+    cached = GRID_DESCRIPTOR
+    if cached is None or cached['source'] is not ml_loader.GLOBAL_GRID_GDF:
+        with _build_lock:
+            cached = GRID_DESCRIPTOR
+            if cached is None or cached['source'] is not ml_loader.GLOBAL_GRID_GDF:
+                cached = build_grid_descriptor()
+    return cached
@@ -0,0 +1,112 @@
+# analysis_api/services/grid_payload.py
+import gzip
+import json
+import time
+import hashlib
+import threading
+import numpy as np
+import shapely
+from shapely.geometry import mapping
+from django.conf import settings
+
+from . import ml_loader
+
+try:
+    import brotli
+except ImportError:  # 没有 brotli 时只提供 gzip
+    brotli = None
+
+# 坐标保留的小数位数，两者都约为 0.1 米
+PROJECTED_GEOJSON_PRECISION = 1  # 投影坐标系(米)
+GEOGRAPHIC_GEOJSON_PRECISION = 6  # 经纬度(度)
+
+# 预序列化的网格 FeatureCollection: {'source', 'body', 'gzip', 'br', 'digest', 'last_modified'}
+GRID_PAYLOAD = None
+
+_build_lock = threading.Lock()
+
+
+def _round_geometries(geometries, precision):
+    """把所有坐标四舍五入到指定小数位，减小 GeoJSON 体积。"""
+    return shapely.transform(geometries, lambda coords: np.round(coords, precision))
+
+
+def default_precision(crs):
+    """按坐标系单位选择小数位数；没有坐标系信息时按 settings.GRID_CRS(投影坐标)处理。"""
+    if crs is not None and crs.is_geographic:
+        return GEOGRAPHIC_GEOJSON_PRECISION
+    return PROJECTED_GEOJSON_PRECISION
+
+
+def build_grid_payload(precision=None):
+    """
+    把唯一网格几何表序列化为 GeoJSON FeatureCollection，并预先压缩为 gzip(及 brotli)，
+    同时计算 ETag 与 Last-Modified，之后每次请求直接返回字节串。
+    """
+    global GRID_PAYLOAD
+
+    grids = ml_loader.GLOBAL_GRID_GDF
+    if grids is None:
+        raise Exception("网格几何数据尚未加载。")
+
+    if precision is None:
+        precision = getattr(settings, 'GRID_GEOJSON_PRECISION', None)
+    if precision is None:
+        precision = default_precision(grids.crs)
+
+    geometries = _round_geometries(grids.geometry.values, precision)
+    features = [
+        {
+            "type": "Feature",
+            "id": str(grid_id),
+            "properties": {"Grid_ID": grid_id},
+            "geometry": mapping(geometry),
+        }
+        for grid_id, geometry in zip(grids['Grid_ID'].astype(int).tolist(), geometries)
+    ]
+    body = json.dumps({"type": "FeatureCollection", "features": features},
+                      separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+    GRID_PAYLOAD = {
+        'source': grids,
+        'body': body,
+        'gzip': gzip.compress(body, compresslevel=9),
+        'br': brotli.compress(body, quality=11) if brotli is not None else None,
+        'digest': hashlib.sha1(body).hexdigest(),
+        # 取网格源数据的修改时间，服务重启后不变；没有记录时退回当前时间
+        'last_modified': int(ml_loader.GRID_SOURCE_MTIME or time.time()),
+    }
+    print(f"网格 GeoJSON 预序列化完成: {len(features)} 个网格, {len(body)} 字节, gzip {len(GRID_PAYLOAD['gzip'])} 字节。")
+    return GRID_PAYLOAD
+
+
+def get_grid_payload():
+    """返回预序列化的网格数据；网格表被重新加载后自动重建。"""
+    payload = GRID_PAYLOAD
+    if payload is None or payload['source'] is not ml_loader.GLOBAL_GRID_GDF:
+        with _build_lock:
+            payload = GRID_PAYLOAD
+            if payload is None or payload['source'] is not ml_loader.GLOBAL_GRID_GDF:
+                payload = build_grid_payload()
+    return payload
+
+
+def etag_for(payload, encoding):
+    """强 ETag 按内容编码区分(RFC 7232)：未压缩为 "<sha1>"，压缩为 "<sha1>-gzip" / "<sha1>-br"。"""
+    if encoding is None:
+        return '"%s"' % payload['digest']
+    return '"%s-%s"' % (payload['digest'], encoding)
+
+
+def choose_encoding(accept_encoding, payload):
+    """根据 Accept-Encoding 选择 br、gzip 或不压缩，返回 (编码名, 字节串)。"""
+    accepted = set()
+    for part in accept_encoding.split(','):
+        name, _, params = part.partition(';')
+        if params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            accepted.add(name.strip().lower())
+    if 'br' in accepted and payload['br'] is not None:
+        return 'br', payload['br']
+    if 'gzip' in accepted:
+        return 'gzip', payload['gzip']
+    return None, payload['body']
@@ -0,0 +1,75 @@
+# analysis_api/services/grid_timeseries.py
+import numpy as np
+
+from . import ml_loader, forecast_store
+from .prediction_service import _calculate_composite_index
+
+HISTORY_METRIC_COLS = ['richness', 'abundance', 'shannon']
+HISTORY_CONTEXT_COLS = {'avg_pm25': 'avg_pm25', 'temp_c': 'avg_temp_c', 'evi': 'evi'}
+
+
+def _to_float(value, digits=4):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    return round(float(value), digits)
+
+
+def get_grid_history(grid_id):
+    """
+    通过预先计算的行区间直接切片，取出单个网格的全部历史月份，复杂度与月份数成正比。
+    网格不存在时返回 None。
+    """
+    row_slice = ml_loader.GRID_ROW_SLICES.get(int(grid_id))
+    if row_slice is None:
+        return None
+
+    start, stop = row_slice
+    history_df = ml_loader.GLOBAL_DF_HISTORY_PROCESSED
+    grid_df = history_df.iloc[start:stop]
+
+    columns = [c for c in HISTORY_METRIC_COLS + list(HISTORY_CONTEXT_COLS) if c in grid_df.columns]
+    records = []
+    for timestamp, row in zip(grid_df['timestamp'], grid_df[columns].itertuples(index=False, name=None)):
+        values = dict(zip(columns, row))
+        richness, abundance, shannon = (values.get(c) for c in HISTORY_METRIC_COLS)
+        composite_index = None
+        if richness is not None and shannon is not None and not np.isnan(richness) and not np.isnan(shannon):
+            composite_index = _calculate_composite_index(richness, abundance, shannon)
+        records.append({
+            'date': timestamp.strftime('%Y-%m'),
+            'richness': _to_float(richness),
+            'abundance': _to_float(abundance),
+            'shannon': _to_float(shannon),
+            'composite_index': _to_float(composite_index),
+            'environment': {
+                out_name: _to_float(values.get(col)) for col, out_name in HISTORY_CONTEXT_COLS.items()
+            },
+        })
+    return records
+
+
+def get_grid_timeseries(grid_id, model_version=None):
+    """
+    返回单个网格的历史观测和已入库预测组成的完整时间序列。
+    预测部分只取最后一个历史月份之后的月份。
+    """
+    history = get_grid_history(grid_id)
+    if history is None:
+        return None
+
+    forecast = []
+    model_version = forecast_store.resolve_model_version(model_version)
+    if model_version is not None:
+        last_history_month = history[-1]['date'] if history else None
+        forecast = [
+            {key: value for key, value in row.items() if key != 'grid_id'}
+            for row in forecast_store.query_forecasts(model_version, grid_ids=[grid_id])
+            if last_history_month is None or row['month'] > last_history_month
+        ]
+
+    return {
+        'grid_id': int(grid_id),
+        'model_version': model_version,
+        'history': history,
+        'forecast': forecast,
+    }
@@ -1,5 +1,6 @@
 # analysis_api/services/ml_loader.py
 import os
+import hashlib
 import joblib
 import pandas as pd
 import geopandas as gpd
@@ -12,30 +13,90 @@ from django.conf import settings
 warnings.filterwarnings('ignore', 'GeoSeries.notna', UserWarning)
 
 MODELS = {}
+MODEL_VERSION = None
 GLOBAL_DF_HISTORY_PROCESSED = None
+GLOBAL_GRID_GDF = None
+GRID_ROW_SLICES = {}
+# 已加载 GDB 中文件的最晚修改时间(时间戳)，作为网格数据的 Last-Modified
+GRID_SOURCE_MTIME = None
+
+
+def _source_mtime(paths):
+    """GDB 是目录，取其中所有文件的最晚修改时间"""
+    mtimes = [os.path.getmtime(path) for path in paths]
+    for path in paths:
+        if os.path.isdir(path):
+            mtimes.extend(entry.stat().st_mtime for entry in os.scandir(path) if entry.is_file())
+    return max(mtimes) if mtimes else None
+
+
+def _compute_model_version(paths):
+    """根据模型文件名、大小和修改时间生成简短的版本号"""
+    digest = hashlib.sha1()
+    for path in sorted(paths):
+        stat = os.stat(path)
+        digest.update(f"{os.path.basename(path)}:{stat.st_size}:{int(stat.st_mtime)}".encode('utf-8'))
+    return digest.hexdigest()[:12]
+
+
+MODEL_FILES = {
+    'presence_classifier': 'lgbm_model_presence_classifier.joblib',
+    'richness_regressor': 'lgbm_model_richness_regressor.joblib',
+    'abundance_regressor': 'lgbm_model_abundance_regressor.joblib',
+    'shannon_regressor': 'lgbm_model_shannon_regressor.joblib',
+}
+
+
+def get_model_base_path():
+    return os.path.join(settings.BASE_DIR, 'analysis_api', 'machine_learning')
+
+
+def get_active_model_version():
+    """
+    返回当前应加载的训练版本名：优先环境变量 ML_MODEL_VERSION，其次 machine_learning/CURRENT 文件。
+    都不存在时返回 None，表示使用 machine_learning 目录下的原始模型文件。
+    """
+    version = os.environ.get('ML_MODEL_VERSION')
+    if version:
+        return version.strip()
+    current_file = os.path.join(get_model_base_path(), 'CURRENT')
+    if os.path.exists(current_file):
+        with open(current_file, 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    return None
 
 
 def load_ml_models():
     """加载所有 .joblib 模型文件到全局 MODELS 字典中"""
-    print("开始加载机器学习模型...")
-    model_path = os.path.join(settings.BASE_DIR, 'analysis_api', 'machine_learning')
+    global MODEL_VERSION
 
-    model_files = {
-        'presence_classifier': 'lgbm_model_presence_classifier.joblib',
-        'richness_regressor': 'lgbm_model_richness_regressor.joblib',
-        'abundance_regressor': 'lgbm_model_abundance_regressor.joblib',
-        'shannon_regressor': 'lgbm_model_shannon_regressor.joblib',
-    }
+    print("开始加载机器学习模型...")
+    model_path = get_model_base_path()
+    active_version = get_active_model_version()
+    if active_version:
+        versioned_path = os.path.join(model_path, 'versions', active_version)
+        if os.path.isdir(versioned_path):
+            model_path = versioned_path
+            print(f"使用训练版本 {active_version} 的模型: {versioned_path}")
+        else:
+            print(f"找不到训练版本目录 {versioned_path}，回退到默认模型。")
+            active_version = None
 
-    for name, filename in model_files.items():
+    loaded_paths = []
+    for name, filename in MODEL_FILES.items():
         path = os.path.join(model_path, filename)
         try:
             MODELS[name] = joblib.load(path)
+            loaded_paths.append(path)
             print(f"成功加载模型: {filename}")
         except Exception as e:
             print(f"加载模型 {filename} 时出错: {e}")
 
-    print(f"模型加载完成。共加载 {len(MODELS)} 个模型。")
+    if active_version:
+        MODEL_VERSION = active_version
+    elif loaded_paths:
+        MODEL_VERSION = _compute_model_version(loaded_paths)
+    print(f"模型加载完成。共加载 {len(MODELS)} 个模型，版本: {MODEL_VERSION}")
 
 
 def load_and_process_historical_data():
@@ -43,19 +104,21 @@ def load_and_process_historical_data():
     加载并处理 2020-2025 年的所有历史数据，构建特征，
     并将最终结果存储在全局变量 GLOBAL_DF_HISTORY_PROCESSED 中。
     """
-    global GLOBAL_DF_HISTORY_PROCESSED
+    global GLOBAL_DF_HISTORY_PROCESSED, GLOBAL_GRID_GDF, GRID_ROW_SLICES, GRID_SOURCE_MTIME
 
     print("开始加载和处理历史数据...")
 
     # 数据加载
     base_path = r"./历史数据"
     all_data_frames = []
+    loaded_gdbs = []
 
     for year in range(2020, 2026):
         year_path = os.path.join(base_path, str(year), f"processed_data_{year}.gdb")
         if not os.path.exists(year_path):
             print(f"GDB 未找到: {year_path}, 跳过年份 {year}.")
             continue
+        loaded_gdbs.append(year_path)
         for month in range(1, 13):
             month_str = str(month).zfill(2)
             feature_class_name = f"timespace_{year}_{month_str}"
@@ -84,6 +147,12 @@ def load_and_process_historical_data():
 
     print("所有GDB数据已合并。开始特征工程...")
 
+    # 唯一网格几何表，按 Grid_ID 排序，供预测入库、空间汇总等复用
+    grid_gdf = full_gdf[['Grid_ID', 'geometry']].drop_duplicates('Grid_ID')
+    grid_gdf = grid_gdf[grid_gdf.geometry.notna() & ~grid_gdf.geometry.is_empty]
+    GLOBAL_GRID_GDF = grid_gdf.sort_values('Grid_ID').reset_index(drop=True)
+    GRID_SOURCE_MTIME = _source_mtime(loaded_gdbs)
+
     #特征工程
     df_for_xarray = full_gdf.copy().drop(columns=[full_gdf.geometry.name])
     df_for_xarray = df_for_xarray.set_index(['Grid_ID', 'timestamp'])
@@ -171,6 +240,13 @@ def load_and_process_historical_data():
     print("正在将地理信息合并回最终数据集...")
     geometry_mapping = full_gdf[['Grid_ID', 'geometry']].drop_duplicates('Grid_ID').set_index('Grid_ID')
     final_df_with_geom = final_df.set_index('Grid_ID').join(geometry_mapping).reset_index()
+    final_df_with_geom = final_df_with_geom.sort_values(['Grid_ID', 'timestamp'], kind='stable').reset_index(drop=True)
+
+    # 数据按 (Grid_ID, timestamp) 连续存放，记录每个网格的行区间，单网格查询时直接切片
+    grid_values = final_df_with_geom['Grid_ID'].to_numpy()
+    unique_grids, starts = np.unique(grid_values, return_index=True)
+    stops = np.append(starts[1:], len(grid_values))
+    GRID_ROW_SLICES = {int(g): (int(a), int(b)) for g, a, b in zip(unique_grids, starts, stops)}
 
     GLOBAL_DF_HISTORY_PROCESSED = final_df_with_geom
     print(f"历史数据处理完成。最终DataFrame维度: {GLOBAL_DF_HISTORY_PROCESSED.shape}")
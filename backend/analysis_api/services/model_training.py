@@ -0,0 +1,174 @@
+# analysis_api/services/model_training.py
+import os
+import json
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from lightgbm import LGBMClassifier, LGBMRegressor
+from sklearn.metrics import roc_auc_score, log_loss, mean_squared_error, mean_absolute_error, r2_score
+
+from . import ml_loader
+
+# 模型名 -> (目标列, 是否分类)
+MODEL_TARGETS = {
+    'presence_classifier': ('has_richness', True),
+    'richness_regressor': ('richness', False),
+    'abundance_regressor': ('abundance', False),
+    'shannon_regressor': ('shannon', False),
+}
+
+DEFAULT_LGBM_PARAMS = {
+    'n_estimators': 500,
+    'learning_rate': 0.05,
+    'num_leaves': 31,
+    'subsample': 0.8,
+    'subsample_freq': 1,
+    'colsample_bytree': 0.8,
+    'random_state': 42,
+    'verbose': -1,
+}
+
+# 不能作为特征的列
+NON_FEATURE_COLS = {'Grid_ID', 'timestamp', 'geometry', 'month_id', 'has_richness', 'richness', 'abundance', 'shannon',
+                    'OBJECTID', 'Shape_Length', 'Shape_Area'}
+
+
+def get_feature_cols(model_name, df):
+    """
+    优先沿用当前已加载模型的特征列，保证与预测流程重新计算的特征一致；
+    没有已加载模型时，使用数据中所有数值型非目标列。
+    已加载模型的特征列在数据中缺失时直接报错，避免悄悄训练出特征不同的模型。
+    """
+    model = ml_loader.MODELS.get(model_name)
+    if model is not None and hasattr(model, 'feature_name_'):
+        missing = [c for c in model.feature_name_ if c not in df.columns]
+        if missing:
+            raise ValueError(f"{model_name} 的特征列在历史数据中缺失: {', '.join(missing)}")
+        return list(model.feature_name_)
+    return [c for c in df.columns if c not in NON_FEATURE_COLS and pd.api.types.is_numeric_dtype(df[c])]
+
+
+def get_model_params(model_name):
+    """沿用已加载模型的超参数，否则使用默认参数。"""
+    model = ml_loader.MODELS.get(model_name)
+    if model is not None and hasattr(model, 'get_params'):
+        return model.get_params()
+    return dict(DEFAULT_LGBM_PARAMS)
+
+
+def build_rolling_origin_folds(months, n_folds, horizon, min_train_months):
+    """
+    滚动原点时间序列交叉验证：每一折用截止月份之前的全部月份训练，
+    验证紧随其后的 horizon 个月，最后一折的验证期为最近的 horizon 个月。
+    """
+    folds = []
+    for k in range(n_folds):
+        cutoff = len(months) - horizon * (n_folds - k)
+        if cutoff < min_train_months:
+            continue
+        folds.append((months[:cutoff], months[cutoff:cutoff + horizon]))
+    return folds
+
+
+def _make_model(params, is_classifier, n_jobs):
+    params = dict(params, n_jobs=n_jobs)
+    return LGBMClassifier(**params) if is_classifier else LGBMRegressor(**params)
+
+
+def _evaluate(model, X, y, is_classifier):
+    if is_classifier:
+        prob = model.predict_proba(X)[:, 1]
+        metrics = {'logloss': float(log_loss(y, prob, labels=[0, 1]))}
+        metrics['auc'] = float(roc_auc_score(y, prob)) if len(np.unique(y)) > 1 else None
+        return metrics
+    pred = np.maximum(0, model.predict(X))
+    return {
+        'rmse': float(np.sqrt(mean_squared_error(y, pred))),
+        'mae': float(mean_absolute_error(y, pred)),
+        'r2': float(r2_score(y, pred)),
+    }
+
+
+def _run_fold(df, model_name, feature_cols, params, train_months, valid_months, n_jobs):
+    target, is_classifier = MODEL_TARGETS[model_name]
+    train_df = df[df['timestamp'].isin(train_months)]
+    valid_df = df[df['timestamp'].isin(valid_months)]
+
+    start = time.time()
+    model = _make_model(params, is_classifier, n_jobs)
+    model.fit(train_df[feature_cols], train_df[target])
+    metrics = _evaluate(model, valid_df[feature_cols], valid_df[target], is_classifier)
+    metrics.update({
+        'train_end': pd.Timestamp(train_months[-1]).strftime('%Y-%m'),
+        'valid_start': pd.Timestamp(valid_months[0]).strftime('%Y-%m'),
+        'valid_end': pd.Timestamp(valid_months[-1]).strftime('%Y-%m'),
+        'train_rows': int(len(train_df)),
+        'valid_rows': int(len(valid_df)),
+        'seconds': round(time.time() - start, 2),
+    })
+    return metrics
+
+
+def train_all_models(history_df, output_dir, n_folds=4, horizon=3, min_train_months=24, workers=None,
+                     log=print):
+    """
+    在处理后的历史特征表上训练存在性分类器与三个回归模型。
+    交叉验证的各折通过线程池并行执行(LightGBM 训练时释放 GIL)，最后用全部月份重新拟合并写出模型文件。
+    返回写入 manifest.json 的训练报告。
+    """
+    df = history_df.drop(columns=['geometry'], errors='ignore')
+    if 'has_richness' not in df.columns and 'richness' in df.columns:
+        df['has_richness'] = (df['richness'] > 0).astype(int)
+
+    months = np.sort(df['timestamp'].dropna().unique())
+    folds = build_rolling_origin_folds(months, n_folds, horizon, min_train_months)
+    if not folds:
+        raise ValueError(f"历史月份数 ({len(months)}) 不足以构建交叉验证折 (至少需要 {min_train_months + horizon} 个月)。")
+
+    workers = workers or min(len(folds), os.cpu_count() or 1)
+    threads_per_fit = max(1, (os.cpu_count() or 1) // workers)
+    os.makedirs(output_dir, exist_ok=True)
+
+    report = {
+        'created_at': pd.Timestamp.now().isoformat(timespec='seconds'),
+        'data_range': [pd.Timestamp(months[0]).strftime('%Y-%m'), pd.Timestamp(months[-1]).strftime('%Y-%m')],
+        'cv': {'n_folds': len(folds), 'horizon_months': horizon, 'min_train_months': min_train_months},
+        'models': {},
+    }
+    total_start = time.time()
+
+    for model_name, (target, is_classifier) in MODEL_TARGETS.items():
+        model_df = df[df[target].notna()]
+        feature_cols = get_feature_cols(model_name, model_df)
+        params = get_model_params(model_name)
+        log(f"--- 训练 {model_name}: {len(model_df)} 行, {len(feature_cols)} 个特征, {len(folds)} 折并行 ---")
+
+        model_start = time.time()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_run_fold, model_df, model_name, feature_cols, params, train_m, valid_m, threads_per_fit)
+                for train_m, valid_m in folds
+            ]
+            fold_metrics = [future.result() for future in futures]
+        for i, metrics in enumerate(fold_metrics, 1):
+            log(f"    折 {i}: {metrics}")
+
+        final_model = _make_model(params, is_classifier, os.cpu_count() or 1)
+        final_model.fit(model_df[feature_cols], model_df[target])
+        joblib.dump(final_model, os.path.join(output_dir, ml_loader.MODEL_FILES[model_name]))
+
+        report['models'][model_name] = {
+            'target': target,
+            'features': feature_cols,
+            'params': {k: v for k, v in params.items() if isinstance(v, (int, float, str, bool, type(None)))},
+            'folds': fold_metrics,
+            'train_seconds': round(time.time() - model_start, 2),
+        }
+        log(f"    {model_name} 完成，耗时 {report['models'][model_name]['train_seconds']} 秒")
+
+    report['total_seconds'] = round(time.time() - total_start, 2)
+    with open(os.path.join(output_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
@@ -0,0 +1,131 @@
+# analysis_api/services/ogr_reader.py
+import os
+import numpy as np
+from osgeo import ogr
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # 没有 pyarrow 时退回逐要素读取
+    pa = None
+
+ARROW_BATCH_SIZE = 65536
+
+
+def get_datasource_signature(path):
+    """
+    返回数据源的 (修改时间, 大小)。文件地理数据库是目录，取目录内文件的最大修改时间和总大小。
+    """
+    if os.path.isdir(path):
+        mtime, size = os.stat(path).st_mtime, 0
+        for entry in os.scandir(path):
+            if entry.is_file():
+                stat = entry.stat()
+                mtime = max(mtime, stat.st_mtime)
+                size += stat.st_size
+        return mtime, size
+    stat = os.stat(path)
+    return stat.st_mtime, stat.st_size
+
+
+def _open_layer(path, layer_name):
+    data_source = ogr.Open(path, 0)
+    if data_source is None:
+        raise FileNotFoundError(f"GDAL/OGR 无法打开数据源: {path}")
+    layer = data_source.GetLayerByName(layer_name)
+    if layer is None:
+        raise FileNotFoundError(f"在数据源 {path} 中找不到名为 '{layer_name}' 的图层。")
+    return data_source, layer
+
+
+def _restrict_layer_fields(layer, field_list):
+    """只读取需要的属性字段，忽略几何和其余字段。"""
+    layer_defn = layer.GetLayerDefn()
+    layer_fields = [layer_defn.GetFieldDefn(i).GetName() for i in range(layer_defn.GetFieldCount())]
+    missing = [field for field in field_list if field not in layer_fields]
+    if missing:
+        raise ValueError(f"图层中不存在字段: {missing}")
+    ignored = [field for field in layer_fields if field not in field_list] + ['OGR_GEOMETRY', 'OGR_STYLE']
+    layer.SetIgnoredFields(ignored)
+
+
+def _iter_arrow_batches(layer, field_list):
+    stream = layer.GetArrowStreamAsPyArrow([f'MAX_FEATURES_IN_BATCH={ARROW_BATCH_SIZE}', 'INCLUDE_FID=NO'])
+    for batch in stream:
+        yield {
+            field: pc.cast(batch.column(field), pa.float64(), safe=False).to_numpy(zero_copy_only=False)
+            for field in field_list
+        }
+
+
+def _iter_feature_batches(layer, field_list):
+    rows = []
+    for feature in layer:
+        rows.append([feature.GetField(field) for field in field_list])
+        if len(rows) >= ARROW_BATCH_SIZE:
+            yield _rows_to_columns(rows, field_list)
+            rows = []
+    if rows:
+        yield _rows_to_columns(rows, field_list)
+
+
+def _rows_to_columns(rows, field_list):
+    values = np.array(rows, dtype=object)
+    columns = {}
+    for i, field in enumerate(field_list):
+        column = values[:, i]
+        column[column == None] = np.nan  # noqa: E711
+        columns[field] = column.astype(float)
+    return columns
+
+
+def iter_layer_batches(path, layer_name, field_list):
+    """
+    以列式批次读取图层中指定的数值属性字段(不读取几何)，每批为 {字段: float64 数组}，空值为 NaN。
+    GDAL 支持 Arrow 流且安装了 pyarrow 时使用批量列式读取，否则退回逐要素读取。
+    """
+    data_source, layer = _open_layer(path, layer_name)
+    try:
+        _restrict_layer_fields(layer, field_list)
+        if pa is not None and hasattr(layer, 'GetArrowStreamAsPyArrow'):
+            yield from _iter_arrow_batches(layer, field_list)
+        else:
+            yield from _iter_feature_batches(layer, field_list)
+    finally:
+        # 解引用数据源对象以关闭文件并释放锁
+        layer = None
+        data_source = None
+
+
+def read_layer_columns(path, layer_name, field_list):
+    """读取整个图层的指定字段，返回 n 行 × k 列的 float64 矩阵。"""
+    batches = [np.column_stack([batch[field] for field in field_list])
+               for batch in iter_layer_batches(path, layer_name, field_list)]
+    batches = [b for b in batches if len(b)]
+    if not batches:
+        raise ValueError("图层为空或未读取到任何要素。")
+    return np.concatenate(batches)
+
+
+def sample_layer_columns(path, layer_name, field_list, sample_size, seed=None):
+    """
+    在流式读取过程中做随机键水塘抽样：每行分配一个均匀随机键，只保留键最小的 sample_size 行。
+    内存占用只与样本量和批次大小有关，与图层行数无关。返回 (样本矩阵, 图层总行数)。
+    """
+    rng = np.random.default_rng(seed)
+    sample = np.empty((0, len(field_list)))
+    keys = np.empty(0)
+    total_rows = 0
+    for batch in iter_layer_batches(path, layer_name, field_list):
+        block = np.column_stack([batch[field] for field in field_list])
+        if not len(block):
+            continue
+        total_rows += len(block)
+        sample = np.concatenate([sample, block])
+        keys = np.concatenate([keys, rng.random(len(block))])
+        if len(keys) > sample_size:
+            keep = np.argpartition(keys, sample_size)[:sample_size]
+            sample, keys = sample[keep], keys[keep]
+    if total_rows == 0:
+        raise ValueError("图层为空或未读取到任何要素。")
+    return sample, total_rows
@@ -2,8 +2,22 @@
 import pandas as pd
 import numpy as np
 import xarray as xr
+from backend.lru_cache import LRUCache
+from . import ml_loader, forecast_store
 from .ml_loader import MODELS, GLOBAL_DF_HISTORY_PROCESSED
 
+# 基线预测结果缓存: (模型版本, 预测月份) -> {结果, 特征矩阵, 特征贡献}
+BASELINE_CACHE_SIZE = 8
+_BASELINE_CACHE = LRUCache(BASELINE_CACHE_SIZE)
+
+# 可解释的预测目标与对应模型
+EXPLAIN_TARGETS = {
+    'presence': 'presence_classifier',
+    'richness': 'richness_regressor',
+    'abundance': 'abundance_regressor',
+    'shannon': 'shannon_regressor',
+}
+
 
 def _recalculate_temporal_features_batch(full_df):
     """
@@ -42,10 +56,44 @@ def _calculate_composite_index(richness, abundance, shannon):
     return 0.8*shannon+0.2*richness
 
 
+def _baseline_cache_key(target_dates):
+    return ml_loader.MODEL_VERSION, tuple(pd.Timestamp(d).strftime('%Y-%m-%d') for d in target_dates)
+
+
+def get_baseline_run(target_dates):
+    """
+    返回基线预测的缓存条目，包含预测结果和每个月份输入模型的特征矩阵。
+    同一模型版本、同一组预测月份只计算一次；每次新计算的结果写入预测表，命中缓存时不重复入库。
+    """
+    key = _baseline_cache_key(target_dates)
+    entry = _BASELINE_CACHE.get(key)
+    if entry is not None:
+        print(f"命中基线预测缓存: {key[1][0]} 起 {len(key[1])} 个月")
+        return entry
+
+    results, feature_frames = _run_baseline_prediction(target_dates)
+    entry = {'results': results, 'features': feature_frames, 'contributions': {}}
+    # 结果入库，入库失败不影响本次返回；没有加载模型版本时不入库
+    if ml_loader.MODEL_VERSION:
+        try:
+            forecast_store.save_forecast_results(results, ml_loader.MODEL_VERSION)
+        except Exception as e:
+            print(f"预测结果入库失败: {e}")
+    _BASELINE_CACHE.put(key, entry)
+    return entry
+
+
 def perform_prediction(target_dates):
     """
     执行完整的预测循环，并返回包含上下文特征的丰富结果。
     """
+    return get_baseline_run(target_dates)['results']
+
+
+def _run_baseline_prediction(target_dates):
+    """
+    基线预测的实际计算，返回 (结果列表, {月份: 特征矩阵})。
+    """
     if GLOBAL_DF_HISTORY_PROCESSED is None:
         raise Exception("历史数据尚未加载，服务无法预测。")
 
@@ -76,7 +124,12 @@ def perform_prediction(target_dates):
     except Exception as e:
         raise Exception(f"加载模型或获取特征名时出错: {e}")
 
+    model_feature_cols = list(dict.fromkeys(
+        list(cls_feature_cols) + list(richness_feature_cols) + list(abundance_feature_cols) + list(shannon_feature_cols)
+    ))
+
     all_results = {grid_id: [] for grid_id in history_df['Grid_ID'].unique()}
+    feature_frames = {}
     current_history = history_df.copy()
 
     for target_date in target_dates:
@@ -105,6 +158,10 @@ def perform_prediction(target_dates):
         pred_abundance = MODELS['abundance_regressor'].predict(final_feature_rows[abundance_feature_cols])
         pred_shannon = MODELS['shannon_regressor'].predict(final_feature_rows[shannon_feature_cols])
 
+        # 保留本月实际输入模型的特征矩阵，供特征贡献解释复用
+        feature_frames[target_date.strftime('%Y-%m-%d')] = \
+            final_feature_rows[['Grid_ID'] + model_feature_cols].reset_index(drop=True)
+
         # 整理结果并更新历史
         final_feature_rows['richness'] = np.maximum(0, pred_richness)
         final_feature_rows['abundance'] = np.maximum(0, pred_abundance)
@@ -161,7 +218,85 @@ def perform_prediction(target_dates):
         {"grid_id": grid_id, "predictions": preds}
         for grid_id, preds in all_results.items() if preds
     ]
-    return final_output
+    return final_output, feature_frames
+
+
+def _get_month_contributions(entry, date_str, model_name):
+    """
+    对某个月份的全部网格批量计算 LightGBM 特征贡献(pred_contrib)，结果缓存在基线预测条目中。
+    """
+    key = (date_str, model_name)
+    cached = entry['contributions'].get(key)
+    if cached is not None:
+        return cached
+
+    features = entry['features'].get(date_str)
+    if features is None:
+        return None
+
+    model = MODELS[model_name]
+    feature_names = list(model.feature_name_)
+    X = features[feature_names]
+    # 输出最后一列为基准值(bias)，其余列与 feature_names 一一对应
+    contrib = np.asarray(model.predict(X, pred_contrib=True))
+    grid_ids = features['Grid_ID'].astype(int).to_numpy()
+    cached = {
+        'feature_names': feature_names,
+        'feature_values': X.to_numpy(dtype=float),
+        'contrib': contrib,
+        'row_of_grid': {grid_id: i for i, grid_id in enumerate(grid_ids)},
+    }
+    entry['contributions'][key] = cached
+    return cached
+
+
+def explain_prediction(grid_ids, target_dates, target='richness', top_k=5):
+    """
+    返回指定网格、指定月份基线预测的前 top_k 个驱动特征。
+    复用缓存的基线预测和特征矩阵，不会重复运行预测。
+    """
+    if target not in EXPLAIN_TARGETS:
+        raise ValueError(f"不支持的解释目标: {target}")
+    model_name = EXPLAIN_TARGETS[target]
+    entry = get_baseline_run(target_dates)
+
+    all_results = {int(grid_id): [] for grid_id in grid_ids}
+    for target_date in target_dates:
+        date_str = pd.Timestamp(target_date).strftime('%Y-%m-%d')
+        month_contrib = _get_month_contributions(entry, date_str, model_name)
+        if month_contrib is None:
+            continue
+
+        found_grids = [g for g in all_results if g in month_contrib['row_of_grid']]
+        if not found_grids:
+            continue
+        rows = np.array([month_contrib['row_of_grid'][g] for g in found_grids])
+        contrib = month_contrib['contrib'][rows]
+        feature_contrib, base_values = contrib[:, :-1], contrib[:, -1]
+        feature_values = month_contrib['feature_values'][rows]
+        k = min(top_k, feature_contrib.shape[1])
+        top_idx = np.argsort(-np.abs(feature_contrib), axis=1)[:, :k]
+
+        for i, grid_id in enumerate(found_grids):
+            drivers = []
+            for j in top_idx[i]:
+                value = feature_values[i, j]
+                drivers.append({
+                    'feature': month_contrib['feature_names'][j],
+                    'value': None if np.isnan(value) else round(float(value), 4),
+                    'contribution': round(float(feature_contrib[i, j]), 4),
+                })
+            all_results[grid_id].append({
+                'date': date_str,
+                'base_value': round(float(base_values[i]), 4),
+                'raw_prediction': round(float(contrib[i].sum()), 4),
+                'top_drivers': drivers,
+            })
+
+    return [
+        {"grid_id": grid_id, "target": target, "explanations": explanations}
+        for grid_id, explanations in all_results.items() if explanations
+    ]
 
 
 def perform_scenario_prediction(grid_ids, target_dates, modifications):
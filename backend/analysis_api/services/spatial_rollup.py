@@ -0,0 +1,126 @@
+# analysis_api/services/spatial_rollup.py
+import os
+import threading
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+from scipy import sparse
+from django.conf import settings
+
+from . import ml_loader
+from .prediction_service import _calculate_composite_index
+
+ROLLUP_METRICS = ['richness', 'abundance', 'shannon', 'composite_index', 'presence_prob']
+
+# 权重矩阵: 行为各区县再加一行全市，列为按 Grid_ID 排序的网格
+GRID_DISTRICT_WEIGHTS = None
+DISTRICT_NAMES = []
+GRID_IDS = None
+
+_build_lock = threading.Lock()
+
+
+def build_grid_district_weights():
+    """
+    根据网格与区县边界的相交面积，计算稀疏的 网格→区县 面积权重矩阵。
+    权重为网格落在该区县内的面积占网格面积的比例；最后一行为全市(所有区县之和)。
+    没有区县边界文件时只有全市一行，包含全部网格。
+    """
+    global GRID_DISTRICT_WEIGHTS, DISTRICT_NAMES, GRID_IDS
+
+    grids = ml_loader.GLOBAL_GRID_GDF
+    if grids is None or grids.empty:
+        raise Exception("网格几何数据尚未加载，无法计算区县权重。")
+
+    boundary_path = settings.DISTRICT_BOUNDARY_PATH
+    n_grids = len(grids)
+    if not os.path.exists(boundary_path):
+        # 没有区县边界时只汇总全市(全部网格)，边界文件可用 import_district_boundaries 命令生成
+        print(f"找不到区县边界文件 {boundary_path}，只计算全市汇总。")
+        DISTRICT_NAMES = []
+        GRID_IDS = grids['Grid_ID'].astype(int).values
+        GRID_DISTRICT_WEIGHTS = sparse.csr_matrix(np.ones((1, n_grids)))
+        return
+
+    print("开始计算网格→区县面积权重矩阵...")
+    name_field = settings.DISTRICT_NAME_FIELD
+    districts = gpd.read_file(boundary_path)[[name_field, 'geometry']]
+    if districts.crs is None:
+        districts = districts.set_crs('EPSG:4326')  # GeoJSON 默认为 WGS84 经纬度
+    districts = districts.to_crs(grids.crs if grids.crs is not None else settings.GRID_CRS)
+    districts = districts.reset_index(drop=True)
+
+    grid_geoms = grids.geometry.values
+    district_geoms = districts.geometry.values
+
+    # 先用空间索引找出相交的 (区县, 网格) 对，再只对这些对求交集面积
+    district_idx, grid_idx = grids.sindex.query(district_geoms, predicate='intersects')
+    inter_area = shapely.area(shapely.intersection(district_geoms[district_idx], grid_geoms[grid_idx]))
+    grid_area = shapely.area(grid_geoms)
+    weights = np.divide(inter_area, grid_area[grid_idx], out=np.zeros_like(inter_area), where=grid_area[grid_idx] > 0)
+
+    n_districts = len(districts)
+    district_matrix = sparse.csr_matrix((weights, (district_idx, grid_idx)), shape=(n_districts, n_grids))
+    city_row = sparse.csr_matrix(np.minimum(np.asarray(district_matrix.sum(axis=0)), 1.0))
+
+    GRID_DISTRICT_WEIGHTS = sparse.vstack([district_matrix, city_row]).tocsr()
+    DISTRICT_NAMES = [str(name) for name in districts[name_field]]
+    GRID_IDS = grids['Grid_ID'].astype(int).values
+    print(f"区县权重矩阵计算完成: {n_districts} 个区县, {n_grids} 个网格, {GRID_DISTRICT_WEIGHTS.nnz} 个非零权重。")
+
+
+def get_grid_district_weights():
+    """惰性构建并返回 (权重矩阵, 区县名列表, 网格ID数组)，只计算一次。"""
+    if GRID_DISTRICT_WEIGHTS is None:
+        with _build_lock:
+            if GRID_DISTRICT_WEIGHTS is None:
+                build_grid_district_weights()
+    return GRID_DISTRICT_WEIGHTS, DISTRICT_NAMES, GRID_IDS
+
+
+def rollup_grid_values(values_df, metrics):
+    """
+    values_df: 以 Grid_ID 为索引、各指标为列的 DataFrame。
+    对所有指标一次稀疏矩阵乘法，返回区县和全市的面积加权均值与加权总和。
+    缺失值不参与计算，对应网格的权重在均值分母中被剔除。
+    """
+    weights, district_names, grid_ids = get_grid_district_weights()
+
+    aligned = values_df.reindex(grid_ids)[metrics].to_numpy(dtype=float)
+    valid = ~np.isnan(aligned)
+    weighted_sum = weights @ np.where(valid, aligned, 0.0)
+    weight_total = weights @ valid.astype(float)
+    weighted_mean = np.divide(weighted_sum, weight_total, out=np.full_like(weighted_sum, np.nan),
+                              where=weight_total > 0)
+
+    def _row(i):
+        row = {}
+        for j, metric in enumerate(metrics):
+            mean = weighted_mean[i, j]
+            row[metric] = {
+                'mean': None if np.isnan(mean) else round(float(mean), 4),
+                'sum': round(float(weighted_sum[i, j]), 4),
+            }
+        return row
+
+    districts = [dict(district=name, **_row(i)) for i, name in enumerate(district_names)]
+    return districts, _row(len(district_names))
+
+
+def get_history_month_values(month_start, metrics):
+    """从历史特征表中取出某个月所有网格的指标值，索引为 Grid_ID。"""
+    history_df = ml_loader.GLOBAL_DF_HISTORY_PROCESSED
+    month_end = month_start + pd.offsets.MonthBegin(1)
+    month_df = history_df[(history_df['timestamp'] >= month_start) & (history_df['timestamp'] < month_end)]
+    month_df = month_df.set_index('Grid_ID')
+
+    values = pd.DataFrame(index=month_df.index)
+    for metric in metrics:
+        if metric == 'composite_index' and {'richness', 'shannon'} <= set(month_df.columns):
+            values[metric] = _calculate_composite_index(month_df['richness'], None, month_df['shannon'])
+        elif metric in month_df.columns:
+            values[metric] = month_df[metric]
+        else:
+            values[metric] = np.nan
+    return values
@@ -0,0 +1,193 @@
+# analysis_api/services/vector_tiles.py
+import math
+import threading
+import numpy as np
+import pandas as pd
+import shapely
+from shapely import STRtree
+
+from backend.lru_cache import LRUCache
+
+from . import ml_loader, forecast_store, feature_store
+from .prediction_service import _calculate_composite_index
+
+try:
+    import mapbox_vector_tile
+except ImportError:  # 未安装时矢量瓦片接口返回 501
+    mapbox_vector_tile = None
+
+TILE_EXTENT = 4096
+TILE_BUFFER = 64  # 瓦片外扩的像素数(以 TILE_EXTENT 为单位)，避免边界处的裁剪缝隙
+MAX_ZOOM = 22
+WEB_MERCATOR_HALF = 20037508.342789244
+
+TILE_LAYERS = ('history', 'forecast')
+HISTORY_TILE_FIELDS = ['richness', 'abundance', 'shannon']
+LANDUSE_TILE_FIELDS = ['Water_Pct', 'Tree_Pct', 'BuiltArea_', 'Crop_Pct', 'FloodedVeg']
+
+TILE_CACHE_SIZE = 4096
+ATTRIBUTE_CACHE_SIZE = 16
+_TILE_CACHE = LRUCache(TILE_CACHE_SIZE)
+_ATTRIBUTE_CACHE = LRUCache(ATTRIBUTE_CACHE_SIZE)
+
+# Web 墨卡托下的网格几何及其 STRtree 空间索引
+_TILE_INDEX = None
+_index_lock = threading.Lock()
+
+# (历史表, 最后一个历史月份)，历史表重新加载后重新计算
+_HISTORY_LAST_MONTH = None
+
+
+def _get_tile_index():
+    """把网格几何投影到 EPSG:3857 并构建 STRtree，网格表重新加载后自动重建。"""
+    global _TILE_INDEX
+    index = _TILE_INDEX
+    if index is None or index['source'] is not ml_loader.GLOBAL_GRID_GDF:
+        with _index_lock:
+            index = _TILE_INDEX
+            grids = ml_loader.GLOBAL_GRID_GDF
+            if index is None or index['source'] is not grids:
+                if grids is None or grids.empty:
+                    raise Exception("网格几何数据尚未加载。")
+                geometries = grids.to_crs(epsg=3857).geometry.values if grids.crs is not None else grids.geometry.values
+                index = {
+                    'source': grids,
+                    'grid_ids': grids['Grid_ID'].astype(int).values,
+                    'geometries': geometries,
+                    'tree': STRtree(geometries),
+                }
+                _TILE_INDEX = index
+    return index
+
+
+def tile_bounds(z, x, y):
+    """返回 XYZ 瓦片在 EPSG:3857 下的 (minx, miny, maxx, maxy)。"""
+    size = 2 * WEB_MERCATOR_HALF / (2 ** z)
+    minx = -WEB_MERCATOR_HALF + x * size
+    maxy = WEB_MERCATOR_HALF - y * size
+    return minx, maxy - size, minx + size, maxy
+
+
+def validate_tile(z, x, y):
+    if not 0 <= z <= MAX_ZOOM:
+        raise ValueError(f"缩放级别必须在 0 到 {MAX_ZOOM} 之间。")
+    if not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise ValueError("瓦片行列号超出该缩放级别的范围。")
+
+
+def _to_attribute(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    return round(float(value), 4)
+
+
+def _history_attributes(month):
+    """某个历史月份每个网格的观测指标与土地利用比例: {Grid_ID: {属性: 值}}。"""
+    rows = feature_store.select_rows(start_month=month, end_month=month)
+    fields = [f for f in HISTORY_TILE_FIELDS + LANDUSE_TILE_FIELDS if f in rows.columns]
+    frame = rows[['Grid_ID'] + fields].copy()
+    if all(f in frame.columns for f in HISTORY_TILE_FIELDS):
+        valid = frame['richness'].notna() & frame['shannon'].notna()
+        frame['composite_index'] = np.nan
+        frame.loc[valid, 'composite_index'] = [
+            _calculate_composite_index(r, a, s)
+            for r, a, s in zip(frame.loc[valid, 'richness'], frame.loc[valid, 'abundance'], frame.loc[valid, 'shannon'])
+        ]
+    value_fields = [c for c in frame.columns if c != 'Grid_ID']
+    return {
+        int(grid_id): {field: _to_attribute(value) for field, value in zip(value_fields, values)}
+        for grid_id, *values in frame.itertuples(index=False, name=None)
+    }
+
+
+def _forecast_attributes(month, model_version):
+    """某个预测月份每个网格的入库预测值: {Grid_ID: {属性: 值}}。"""
+    rows = forecast_store.query_forecasts(model_version, start_month=month, end_month=month)
+    return {
+        row['grid_id']: {field: _to_attribute(row[field]) for field in forecast_store.FORECAST_VALUE_FIELDS}
+        for row in rows
+    }
+
+
+def _last_history_month():
+    global _HISTORY_LAST_MONTH
+    history_df = feature_store.get_history_frame()
+    cached = _HISTORY_LAST_MONTH
+    if cached is None or cached[0] is not history_df:
+        cached = (history_df, history_df['timestamp'].max())
+        _HISTORY_LAST_MONTH = cached
+    return cached[1]
+
+
+def resolve_tile_month(layer, month, model_version=None):
+    """未指定月份时，历史图层取最后一个历史月份，预测图层取该版本最早的预测月份。"""
+    if month is not None:
+        return pd.Timestamp(month).replace(day=1)
+    if layer == 'history':
+        return _last_history_month()
+    first_month = forecast_store.first_forecast_month(model_version) if model_version else None
+    return pd.Timestamp(first_month) if first_month is not None else None
+
+
+def get_tile_attributes(layer, month, model_version=None):
+    key = (layer, month, model_version)
+    attributes = _ATTRIBUTE_CACHE.get(key)
+    if attributes is None:
+        if layer == 'history':
+            attributes = _history_attributes(month)
+        else:
+            attributes = _forecast_attributes(month.date(), model_version)
+        _ATTRIBUTE_CACHE.put(key, attributes)
+    return attributes
+
+
+def render_tile(z, x, y, layer='history', month=None, model_version=None):
+    """
+    把与瓦片相交的网格多边形连同所选月份的属性编码为 Mapbox Vector Tile。
+    网格通过 STRtree 检索，结果按 (z, x, y, 图层, 月份, 模型版本) 缓存。
+    返回瓦片字节串，瓦片内没有网格时返回 b''。
+    """
+    if mapbox_vector_tile is None:
+        raise NotImplementedError("服务器未安装 mapbox-vector-tile，无法生成矢量瓦片。")
+    validate_tile(z, x, y)
+    if layer not in TILE_LAYERS:
+        raise ValueError(f"不支持的瓦片图层: {layer}")
+
+    if layer == 'forecast':
+        model_version = forecast_store.resolve_model_version(model_version)
+    else:
+        model_version = None
+    month = resolve_tile_month(layer, month, model_version)
+
+    cache_key = (z, x, y, layer, month, model_version)
+    tile = _TILE_CACHE.get(cache_key)
+    if tile is not None:
+        return tile
+
+    index = _get_tile_index()
+    minx, miny, maxx, maxy = tile_bounds(z, x, y)
+    buffer = (maxx - minx) * TILE_BUFFER / TILE_EXTENT
+    positions = index['tree'].query(shapely.box(minx - buffer, miny - buffer, maxx + buffer, maxy + buffer),
+                                    predicate='intersects')
+
+    tile = b''
+    if len(positions):
+        positions = np.sort(positions)
+        clipped = shapely.clip_by_rect(index['geometries'][positions],
+                                       minx - buffer, miny - buffer, maxx + buffer, maxy + buffer)
+        attributes = get_tile_attributes(layer, month, model_version) if month is not None else {}
+        features = []
+        for grid_id, geometry in zip(index['grid_ids'][positions], clipped):
+            if geometry.is_empty:
+                continue
+            properties = {'Grid_ID': int(grid_id)}
+            properties.update({k: v for k, v in attributes.get(int(grid_id), {}).items() if v is not None})
+            features.append({'geometry': geometry, 'properties': properties})
+        if features:
+            tile = mapbox_vector_tile.encode(
+                [{'name': layer, 'features': features}],
+                default_options={'quantize_bounds': (minx, miny, maxx, maxy), 'extents': TILE_EXTENT},
+            )
+
+    _TILE_CACHE.put(cache_key, tile)
+    return tile
@@ -1,11 +1,23 @@
 # analysis_api/urls.py
 
 from django.urls import path
-from .views import SpearmanAnalysisView, PredictFutureBaselineView, GridGeometriesView, ScenarioPredictionView
+from .views import (SpearmanAnalysisView, PredictFutureBaselineView, GridGeometriesView, ScenarioPredictionView,
+                    ForecastQueryView, GridForecastView, DistrictRollupView, GridTimeseriesView,
+                    PredictionExplanationView, FeatureCorrelationView, CorrelationTimeseriesView,
+                    GridVectorTileView, GridDescriptorView)
 
 urlpatterns = [
     path('spearman/', SpearmanAnalysisView.as_view(), name='spearman-analysis'),
+    path('correlation/', FeatureCorrelationView.as_view(), name='feature-correlation'),
+    path('correlation/timeseries/', CorrelationTimeseriesView.as_view(), name='correlation-timeseries'),
     path('predict_future_baseline/',PredictFutureBaselineView.as_view(), name='predict_future_baseline'),
     path('grid_geometries/', GridGeometriesView.as_view(), name='grid-geometries'),
+    path('grid_descriptor/', GridDescriptorView.as_view(), name='grid-descriptor'),
+    path('tiles/<int:z>/<int:x>/<int:y>.mvt', GridVectorTileView.as_view(), name='grid-vector-tile'),
     path('predict_scenario/', ScenarioPredictionView.as_view(), name='predict_scenario'),
+    path('explain_prediction/', PredictionExplanationView.as_view(), name='explain-prediction'),
+    path('forecast/', ForecastQueryView.as_view(), name='forecast-query'),
+    path('forecast/grid/<int:grid_id>/', GridForecastView.as_view(), name='forecast-grid'),
+    path('grid/<int:grid_id>/timeseries/', GridTimeseriesView.as_view(), name='grid-timeseries'),
+    path('rollup/districts/', DistrictRollupView.as_view(), name='district-rollup'),
 ]
\ No newline at end of file
@@ -1,77 +1,83 @@
 # analysis_api/views.py
-import json
+import os
+from django.http import HttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from rest_framework.permissions import AllowAny
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from .serializers import SpearmanAnalysisSerializer,PredictionInputSerializer
-from .services import prediction_service
+from backend.lru_cache import LRUCache
+from .serializers import (SpearmanAnalysisSerializer, PredictionInputSerializer, ForecastQuerySerializer,
+                          RollupQuerySerializer, ExplanationInputSerializer, FeatureCorrelationSerializer,
+                          CorrelationTimeseriesSerializer, TileQuerySerializer)
+from .services import (prediction_service, forecast_store, ml_loader, spatial_rollup, grid_timeseries,
+                       correlation, ogr_reader, feature_store, grid_payload,
+                       vector_tiles, grid_descriptor, columnar)
 from .services.prediction_service import perform_prediction
-from .services.ml_loader import GLOBAL_DF_HISTORY_PROCESSED
+from .renderers import COLUMNAR_RENDERER_CLASSES
 # 导入必要的第三方库
-from osgeo import ogr
+import numpy as np
 import pandas as pd
-import geopandas as gpd
-from scipy.stats import spearmanr
 
 
-def perform_spearman_analysis_gdal(gdb_path, layer_name, field_list):
+# Spearman 分析结果缓存: (路径, 图层, 数据源修改时间/大小, 字段顺序) -> 结果
+SPEARMAN_CACHE_SIZE = 32
+_SPEARMAN_RESULT_CACHE = LRUCache(SPEARMAN_CACHE_SIZE)
+
+
+def perform_spearman_analysis_gdal(gdb_path, layer_name, field_list, sampling=None):
     """
     使用 GDAL/OGR 读取数据并执行 Spearman 相关性分析的核心函数。
+    sampling 为 None 时读取全部要素做精确计算；否则为 {'sample_size', 'bootstrap', 'confidence', 'seed'}，
+    在流式读取时做水塘抽样，只在样本上计算相关系数并给出 bootstrap 置信区间，内存占用与图层大小无关。
+    近似模式只有给出 seed 时才缓存结果，否则每次请求重新抽样。
     """
     try:
-        # 打开数据源
-        dataSource = ogr.Open(gdb_path, 0)
-        if dataSource is None:
-            return None, (f"GDAL/OGR 无法打开数据源: {gdb_path}", status.HTTP_404_NOT_FOUND)
-        # 按名称获取图层
-        layer = dataSource.GetLayerByName(layer_name)
-        if layer is None:
-            dataSource = None  # 在返回前确保关闭数据源
-            return None, (f"在数据源 {gdb_path} 中找不到名为 '{layer_name}' 的图层。", status.HTTP_404_NOT_FOUND)
-        # 将属性读取到一个字典列表中
-        all_rows = []
-        for feature in layer:
-            row_data = {field: feature.GetField(field) for field in field_list}
-            all_rows.append(row_data)
-        #解引用数据源对象以关闭文件并释放锁
-        dataSource = None
-        if not all_rows:
-            return None, ("图层为空或未读取到任何要素。", status.HTTP_400_BAD_REQUEST)
-        # 5. 将字典列表转换为 Pandas DataFrame
-        df = pd.DataFrame.from_records(all_rows)
+        cache_key = (os.path.abspath(gdb_path), layer_name, ogr_reader.get_datasource_signature(gdb_path),
+                     tuple(field_list), tuple(sorted(sampling.items())) if sampling else None)
+    except OSError:
+        return None, (f"GDAL/OGR 无法打开数据源: {gdb_path}", status.HTTP_404_NOT_FOUND)
+
+    cached = _SPEARMAN_RESULT_CACHE.get(cache_key)
+    if cached is not None:
+        return cached, None
 
+    try:
+        if sampling:
+            data, total_rows = ogr_reader.sample_layer_columns(gdb_path, layer_name, field_list,
+                                                               sampling['sample_size'], seed=sampling.get('seed'))
+        else:
+            # 只按列批量读取需要的属性字段，不读取几何
+            data = ogr_reader.read_layer_columns(gdb_path, layer_name, field_list)
+    except FileNotFoundError as e:
+        return None, (str(e), status.HTTP_404_NOT_FOUND)
+    except ValueError as e:
+        return None, (str(e), status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return None, (f"使用GDAL/OGR读取数据时出错: {e}", status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    # 计算逻辑
-    num_fields = len(field_list)
-    results_dict = {field: {} for field in field_list}
-
-    for i in range(num_fields):
-        for j in range(num_fields):
-            col1 = field_list[i]
-            col2 = field_list[j]
-
-            if i == j:
-                results_dict[col1][col2] = {"correlation": 1.0, "p_value": 0.0}
-                continue
-
-            # 从DataFrame中提取数据并移除空值
-            data1 = df[col1].dropna()
-            data2 = df[col2].dropna()
-
-            # 对齐数据，只使用两个系列中都非空的行进行计算
-            common_index = data1.index.intersection(data2.index)
-
-            if len(common_index) < 3:
-                results_dict[col1][col2] = {"correlation": None, "p_value": None}
-                continue
-
-            # 使用对齐后的数据进行计算
-            corr, p_value = spearmanr(data1.loc[common_index], data2.loc[common_index])
-            results_dict[col1][col2] = {"correlation": corr, "p_value": p_value}
-
+    # 计算逻辑: 各字段只排序一次，整块矩阵运算得到全部相关系数和 p 值
+    corr, p_values, _ = correlation.correlation_matrix(data, method='spearman')
+    if sampling:
+        ci_lower = ci_upper = None
+        if sampling['bootstrap'] > 0:
+            ci_lower, ci_upper = correlation.bootstrap_confidence_intervals(
+                data, method='spearman', n_boot=sampling['bootstrap'], confidence=sampling['confidence'],
+                seed=sampling.get('seed'))
+        results_dict = {
+            "mode": "approximate",
+            "total_rows": total_rows,
+            "sample_rows": len(data),
+            "confidence": sampling['confidence'] if ci_lower is not None else None,
+            "results": correlation.matrix_to_results(field_list, corr, p_values, ci_lower, ci_upper),
+        }
+    else:
+        results_dict = correlation.matrix_to_results(field_list, corr, p_values)
+
+    if not sampling or sampling.get('seed') is not None:
+        _SPEARMAN_RESULT_CACHE.put(cache_key, results_dict)
     return results_dict, None
 
 
@@ -93,10 +99,15 @@ class SpearmanAnalysisView(APIView):
         gdb_path = validated_data['gdb_path']
         layer_name = validated_data['layer_name']
         fields = validated_data['fields'].split(';')
+        sampling = None
+        if validated_data['mode'] == 'approximate':
+            sampling = {key: validated_data[key] for key in ('sample_size', 'bootstrap', 'confidence')}
+            if 'seed' in validated_data:
+                sampling['seed'] = validated_data['seed']
 
         # 调用核心分析函数
         try:
-            results, error = perform_spearman_analysis_gdal(gdb_path, layer_name, fields)
+            results, error = perform_spearman_analysis_gdal(gdb_path, layer_name, fields, sampling)
 
             if error:
                 error_message, error_status = error
@@ -110,11 +121,131 @@ class SpearmanAnalysisView(APIView):
                             status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class FeatureCorrelationView(APIView):
+    """
+    直接在内存特征表上执行 Spearman/Pearson/Kendall 相关性分析，无需读取磁盘上的 GDB。
+    """
+    permission_classes = [AllowAny]
+
+    def post(self, request, *args, **kwargs):
+        serializer = FeatureCorrelationSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        if ml_loader.GLOBAL_DF_HISTORY_PROCESSED is None:
+            return Response({"error": "服务器正在初始化地理数据，请稍后再试。"},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        validated_data = serializer.validated_data
+        fields = validated_data['fields']
+        method = validated_data['method']
+        p_value_method = validated_data['p_value_method']
+        try:
+            data, row_grid_ids = feature_store.select_feature_matrix(
+                fields,
+                start_month=validated_data.get('start_month'),
+                end_month=validated_data.get('end_month'),
+                grid_ids=validated_data.get('grid_ids'),
+                return_grid_ids=True,
+            )
+            if len(data) == 0:
+                return Response({"error": "筛选条件下没有任何数据。"}, status=status.HTTP_400_BAD_REQUEST)
+
+            corr, p_values, _ = correlation.correlation_matrix(data, method=method)
+            response_data = {"method": method, "rows": len(data), "p_value_method": p_value_method}
+            if p_value_method == 'permutation':
+                block_size = validated_data.get('block_size')
+                block_labels = feature_store.spatial_block_labels(row_grid_ids, block_size) if block_size else None
+                p_values = correlation.permutation_pvalues(
+                    data, method=method, n_permutations=validated_data['n_permutations'],
+                    seed=validated_data.get('seed'), block_labels=block_labels,
+                )
+                p_values = np.where(np.isnan(corr), np.nan, p_values)
+                response_data["n_permutations"] = validated_data['n_permutations']
+                if block_labels is not None:
+                    response_data["n_blocks"] = int(len(np.unique(block_labels)))
+
+            response_data["results"] = correlation.matrix_to_results(fields, corr, p_values)
+            return Response(response_data, status=status.HTTP_200_OK)
+
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            print(f"相关性分析时发生错误: {e}")
+            return Response({"error": f"服务器内部发生未知错误: {str(e)}"},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class CorrelationTimeseriesView(APIView):
+    """
+    一次请求内并行计算月份区间内每个月的相关矩阵，返回 (月份 × 字段 × 字段) 数组，
+    或只返回指定字段对的逐月相关系数。
+    """
+    permission_classes = [AllowAny]
+
+    def post(self, request, *args, **kwargs):
+        serializer = CorrelationTimeseriesSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        if ml_loader.GLOBAL_DF_HISTORY_PROCESSED is None:
+            return Response({"error": "服务器正在初始化地理数据，请稍后再试。"},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        validated_data = serializer.validated_data
+        method = validated_data['method']
+        pairs = validated_data.get('pairs')
+        fields = validated_data['fields']
+        if pairs:
+            # 只计算字段对涉及的字段
+            fields = [f for f in fields if any(f in pair for pair in pairs)]
+
+        try:
+            months, matrices = feature_store.select_monthly_feature_matrices(
+                fields,
+                start_month=validated_data.get('start_month'),
+                end_month=validated_data.get('end_month'),
+                grid_ids=validated_data.get('grid_ids'),
+            )
+            if not months:
+                return Response({"error": "筛选条件下没有任何数据。"}, status=status.HTTP_400_BAD_REQUEST)
+
+            corr, p_values = correlation.correlation_cube(matrices, method=method)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            print(f"逐月相关性分析时发生错误: {e}")
+            return Response({"error": f"服务器内部发生未知错误: {str(e)}"},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        response_data = {"method": method, "months": [m.strftime('%Y-%m') for m in months]}
+        if pairs:
+            index = {f: i for i, f in enumerate(fields)}
+            response_data["pairs"] = [
+                {
+                    "x": x,
+                    "y": y,
+                    "correlation": correlation.nan_to_none(corr[:, index[x], index[y]]),
+                    "p_value": correlation.nan_to_none(p_values[:, index[x], index[y]]),
+                }
+                for x, y in pairs
+            ]
+        else:
+            response_data["fields"] = fields
+            response_data["correlation"] = correlation.nan_to_none(corr)
+            response_data["p_value"] = correlation.nan_to_none(p_values)
+        return Response(response_data, status=status.HTTP_200_OK)
+
+
 class PredictFutureBaselineView(APIView):
     """
     根据给定的开始月份和月数，预测未来的生物多样性基线指标。
     """
     permission_classes = [AllowAny]
+    renderer_classes = COLUMNAR_RENDERER_CLASSES
+
+    def get_columnar_records(self, data):
+        return columnar.prediction_results_to_records(data), {}
 
     def get(self, request, *args, **kwargs):
         serializer = PredictionInputSerializer(data=request.query_params)
@@ -129,7 +260,7 @@ class PredictFutureBaselineView(APIView):
             start_date = pd.to_datetime(start_month_str)
             target_dates = pd.date_range(start=start_date, periods=num_months, freq='ME')
 
-            # 调用核心预测服务
+            # 调用核心预测服务，新计算的基线结果在服务内入库
             prediction_results = perform_prediction(target_dates)
 
             # 返回结果
@@ -145,6 +276,170 @@ class PredictFutureBaselineView(APIView):
             )
 
 
+class PredictionExplanationView(APIView):
+    """
+    返回基线预测中各网格的主要驱动特征(LightGBM 特征贡献)，复用已缓存的基线预测结果。
+    """
+    permission_classes = [AllowAny]
+
+    def post(self, request, *args, **kwargs):
+        serializer = ExplanationInputSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        validated_data = serializer.validated_data
+        try:
+            start_date = pd.to_datetime(validated_data['start_month_str'])
+            target_dates = pd.date_range(start=start_date, periods=validated_data['num_months'], freq='ME')
+            results = prediction_service.explain_prediction(
+                grid_ids=validated_data['grid_ids'],
+                target_dates=target_dates,
+                target=validated_data['target'],
+                top_k=validated_data['top_k'],
+            )
+            return Response(results, status=status.HTTP_200_OK)
+
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            print(f"计算特征贡献时发生错误: {e}")
+            return Response({"error": "计算特征贡献时发生内部错误。", "details": str(e)},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ForecastQueryView(APIView):
+    """
+    从预测结果表中按网格、月份和范围查询已入库的预测，无需重新运行模型。
+    """
+    permission_classes = [AllowAny]
+    renderer_classes = COLUMNAR_RENDERER_CLASSES
+
+    def get_columnar_records(self, data):
+        return data['data'], {"model_version": data['model_version']}
+
+    def get(self, request, *args, **kwargs):
+        serializer = ForecastQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        validated_data = serializer.validated_data
+
+        model_version = forecast_store.resolve_model_version(validated_data.get('model_version'))
+        if model_version is None:
+            return Response({"error": "预测结果表为空，请先运行基线预测。"}, status=status.HTTP_404_NOT_FOUND)
+
+        results = forecast_store.query_forecasts(
+            model_version,
+            grid_ids=validated_data.get('grid_ids'),
+            start_month=validated_data.get('start_month'),
+            end_month=validated_data.get('end_month'),
+            bbox=validated_data.get('bbox'),
+        )
+        return Response({"model_version": model_version, "count": len(results), "data": results},
+                        status=status.HTTP_200_OK)
+
+
+class GridForecastView(APIView):
+    """
+    返回单个网格在预测结果表中的全部月份预测。
+    """
+    permission_classes = [AllowAny]
+    renderer_classes = COLUMNAR_RENDERER_CLASSES
+
+    def get_columnar_records(self, data):
+        return data['data'], {"model_version": data['model_version']}
+
+    def get(self, request, grid_id, *args, **kwargs):
+        model_version = forecast_store.resolve_model_version(request.query_params.get('model_version'))
+        if model_version is None:
+            return Response({"error": "预测结果表为空，请先运行基线预测。"}, status=status.HTTP_404_NOT_FOUND)
+
+        results = forecast_store.query_forecasts(model_version, grid_ids=[grid_id])
+        if not results:
+            return Response({"error": f"网格 {grid_id} 没有预测结果。"}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"grid_id": grid_id, "model_version": model_version, "data": results},
+                        status=status.HTTP_200_OK)
+
+
+class GridTimeseriesView(APIView):
+    """
+    返回单个网格的历史观测(2020-2025)与已入库预测拼接而成的时间序列。
+    """
+    permission_classes = [AllowAny]
+    renderer_classes = COLUMNAR_RENDERER_CLASSES
+
+    def get_columnar_records(self, data):
+        return columnar.timeseries_to_records(data), {"model_version": data['model_version']}
+
+    def get(self, request, grid_id, *args, **kwargs):
+        if ml_loader.GLOBAL_DF_HISTORY_PROCESSED is None:
+            return Response({"error": "服务器正在初始化地理数据，请稍后再试。"},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        try:
+            result = grid_timeseries.get_grid_timeseries(grid_id, request.query_params.get('model_version'))
+        except Exception as e:
+            print(f"获取网格时间序列时发生错误: {e}")
+            return Response({"error": "获取网格时间序列时发生内部错误。", "details": str(e)},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        if result is None:
+            return Response({"error": f"网格 {grid_id} 不存在。"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(result, status=status.HTTP_200_OK)
+
+
+class DistrictRollupView(APIView):
+    """
+    返回某个月份预测或历史指标在各区县和全市层面的面积加权汇总。
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, *args, **kwargs):
+        serializer = RollupQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        validated_data = serializer.validated_data
+        month = validated_data['month']
+        source = validated_data['source']
+
+        metrics = spatial_rollup.ROLLUP_METRICS
+        if validated_data.get('metrics'):
+            metrics = [m.strip() for m in validated_data['metrics'].split(',') if m.strip()]
+            unknown = [m for m in metrics if m not in spatial_rollup.ROLLUP_METRICS]
+            if unknown:
+                return Response({"error": f"不支持的汇总指标: {unknown}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if ml_loader.GLOBAL_DF_HISTORY_PROCESSED is None:
+            return Response({"error": "服务器正在初始化地理数据，请稍后再试。"},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        response_data = {"month": month.strftime('%Y-%m'), "source": source}
+        try:
+            if source == 'forecast':
+                model_version = forecast_store.resolve_model_version(validated_data.get('model_version'))
+                if model_version is None:
+                    return Response({"error": "预测结果表为空，请先运行基线预测。"},
+                                    status=status.HTTP_404_NOT_FOUND)
+                rows = forecast_store.query_forecasts(model_version, start_month=month.date(), end_month=month.date())
+                values_df = pd.DataFrame(rows, columns=['grid_id'] + metrics).set_index('grid_id')
+                response_data["model_version"] = model_version
+            else:
+                values_df = spatial_rollup.get_history_month_values(month, metrics)
+
+            if values_df.empty:
+                return Response({"error": f"{response_data['month']} 没有可汇总的数据。"},
+                                status=status.HTTP_404_NOT_FOUND)
+
+            districts, city = spatial_rollup.rollup_grid_values(values_df, metrics)
+        except Exception as e:
+            print(f"区县汇总时发生错误: {e}")
+            return Response({"error": "区县汇总时发生内部错误。", "details": str(e)},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        response_data["districts"] = districts
+        response_data["city"] = city
+        return Response(response_data, status=status.HTTP_200_OK)
+
+
 class GridGeometriesView(APIView):
     """
     提供所有网格单元的地理信息
@@ -152,27 +447,14 @@ class GridGeometriesView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request, *args, **kwargs):
-        if GLOBAL_DF_HISTORY_PROCESSED is None:
+        if ml_loader.GLOBAL_GRID_GDF is None:
             return Response(
                 {"error": "服务器正在初始化地理数据，请稍后再试。"},
                 status=status.HTTP_503_SERVICE_UNAVAILABLE
             )
 
         try:
-            unique_geometries_df = GLOBAL_DF_HISTORY_PROCESSED[['Grid_ID', 'geometry']].drop_duplicates('Grid_ID')
-
-            valid_geometries_df = unique_geometries_df.dropna(subset=['geometry']).copy()
-
-            if valid_geometries_df.empty:
-                print("警告: 清理后没有找到任何有效的地理信息。")
-                return Response({"type": "FeatureCollection", "features": []}, status=status.HTTP_200_OK)
-
-            gdf = gpd.GeoDataFrame(valid_geometries_df, geometry='geometry')
-            geojson_str = gdf.to_json()
-
-            geojson_data = json.loads(geojson_str)
-            return Response(geojson_data, status=status.HTTP_200_OK)
-
+            payload = grid_payload.get_grid_payload()
         except Exception as e:
             print("--- GridGeometriesView 发生错误 ---")
             return Response(
@@ -180,12 +462,105 @@ class GridGeometriesView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+        # 每种内容编码有各自的 ETag，浏览器缓存仍然有效时直接返回 304
+        encoding, body = grid_payload.choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), payload)
+        etag = grid_payload.etag_for(payload, encoding)
+        not_modified = get_conditional_response(request, etag=etag, last_modified=payload['last_modified'])
+        if not_modified is not None:
+            not_modified['Vary'] = 'Accept-Encoding'
+            return not_modified
+
+        response = HttpResponse(body, content_type='application/json; charset=utf-8')
+        if encoding is not None:
+            response['Content-Encoding'] = encoding
+        response['Vary'] = 'Accept-Encoding'
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(payload['last_modified'])
+        response['Cache-Control'] = 'public, max-age=0, must-revalidate'
+        return response
+
+
+class GridDescriptorView(APIView):
+    """
+    返回规则渔网的紧凑描述(坐标系、原点、边长、行列数、Grid_ID 与行列的对应关系)，
+    客户端据此在本地重建网格；网格不规则时返回完整 GeoJSON 的地址。
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, *args, **kwargs):
+        if ml_loader.GLOBAL_GRID_GDF is None:
+            return Response({"error": "服务器正在初始化地理数据，请稍后再试。"},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        try:
+            cached = grid_descriptor.get_grid_descriptor()
+        except Exception as e:
+            print(f"生成网格描述时发生错误: {e}")
+            return Response({"error": f"服务器内部发生未知错误: {str(e)}"},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        not_modified = get_conditional_response(request, etag=cached['etag'])
+        if not_modified is not None:
+            return not_modified
+
+        descriptor = cached['descriptor']
+        if descriptor['type'] == 'polygons':
+            descriptor = dict(descriptor, geometry_url=request.build_absolute_uri(reverse('grid-geometries')))
+        response = Response(descriptor, status=status.HTTP_200_OK)
+        response['ETag'] = cached['etag']
+        response['Cache-Control'] = 'public, max-age=0, must-revalidate'
+        return response
+
+
+class GridVectorTileView(APIView):
+    """
+    以 Mapbox Vector Tile 格式返回瓦片范围内的网格多边形及所选月份的指标属性，
+    地图只需加载可见范围内的网格。
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, z, x, y, *args, **kwargs):
+        serializer = TileQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        if ml_loader.GLOBAL_GRID_GDF is None:
+            return Response({"error": "服务器正在初始化地理数据，请稍后再试。"},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        validated_data = serializer.validated_data
+        try:
+            tile = vector_tiles.render_tile(
+                z, x, y,
+                layer=validated_data['layer'],
+                month=validated_data.get('month'),
+                model_version=validated_data.get('model_version'),
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except NotImplementedError as e:
+            return Response({"error": str(e)}, status=status.HTTP_501_NOT_IMPLEMENTED)
+        except Exception as e:
+            print(f"生成矢量瓦片 {z}/{x}/{y} 时发生错误: {e}")
+            return Response({"error": f"服务器内部发生未知错误: {str(e)}"},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        if not tile:
+            return HttpResponse(status=status.HTTP_204_NO_CONTENT)
+        response = HttpResponse(tile, content_type='application/vnd.mapbox-vector-tile')
+        response['Cache-Control'] = 'public, max-age=3600'
+        return response
+
 
 class ScenarioPredictionView(APIView):
     """
     接收用户定义的情景模拟参数，并返回重新预测的结果。
     """
     permission_classes = [AllowAny]
+    renderer_classes = COLUMNAR_RENDERER_CLASSES
+
+    def get_columnar_records(self, data):
+        return columnar.prediction_results_to_records(data), {}
 
     def post(self, request, *args, **kwargs):
         # 获取并验证输入数据
@@ -0,0 +1,155 @@
+"""
+空气质量历史记录的批量导出(CSV / Parquet)
+通过 QuerySet.iterator(chunk_size) 使用 PostgreSQL 服务器端游标分块读取，每块写出后即交给响应流，
+内存占用只与块大小有关，与导出的时间范围无关。
+"""
+import csv
+import io
+from itertools import islice
+
+from django.utils import timezone
+
+from data_pipeline.models import AQIRecord
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # 没有 pyarrow 时只能导出 CSV
+    pa = None
+    pq = None
+
+EXPORT_FORMATS = ('csv', 'parquet')
+EXPORT_POLLUTANTS = ['aqi', 'co', 'no2', 'o3', 'pm10', 'pm25', 'so2']
+DEFAULT_CHUNK_SIZE = 5000
+MAX_CHUNK_SIZE = 50000
+
+BASE_COLUMNS = ['station_id', 'station_name', 'timestamp']
+
+
+def export_columns(pollutants):
+    """导出的列：站点、时间，以及每个污染物的小时值/24小时均值/等级(O3 另有 8 小时值)"""
+    columns = list(BASE_COLUMNS)
+    for pollutant in pollutants:
+        if pollutant == 'aqi':
+            columns += ['aqi', 'quality']
+            continue
+        columns += [f'{pollutant}_value', f'{pollutant}_24h', f'{pollutant}_level']
+        if pollutant == 'o3':
+            columns += ['o3_8h', 'o3_8h_level']
+    return columns
+
+
+def _query_fields(columns):
+    return ['station__name' if column == 'station_name' else column for column in columns]
+
+
+def export_queryset(station_ids=None, start=None, end=None):
+    """按站点和时间范围筛选记录，按 (站点, 时间) 排序以便分区表按范围裁剪并顺序读取"""
+    queryset = AQIRecord.objects.all()
+    if station_ids:
+        queryset = queryset.filter(station_id__in=station_ids)
+    if start is not None:
+        queryset = queryset.filter(timestamp__gte=start)
+    if end is not None:
+        queryset = queryset.filter(timestamp__lt=end)
+    return queryset.order_by('station_id', 'timestamp')
+
+
+def iter_chunks(queryset, columns, chunk_size):
+    """用服务器端游标逐块读取 values_list 元组"""
+    rows = queryset.values_list(*_query_fields(columns)).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _local_isoformat(value):
+    if value is None:
+        return ''
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    return value.isoformat(sep=' ')
+
+
+def stream_csv(queryset, columns, chunk_size=DEFAULT_CHUNK_SIZE):
+    """逐块生成 CSV 文本，第一块为表头；时间按项目时区输出"""
+    timestamp_index = columns.index('timestamp')
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+
+    for chunk in iter_chunks(queryset, columns, chunk_size):
+        buffer.seek(0)
+        buffer.truncate()
+        for row in chunk:
+            row = list(row)
+            row[timestamp_index] = _local_isoformat(row[timestamp_index])
+            writer.writerow(row)
+        yield buffer.getvalue()
+
+
+class _ChunkSink:
+    """供 ParquetWriter 写入的只追加文件对象，生成器每写完一个行组就取走已写入的字节"""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def parquet_schema(columns):
+    if pa is None:
+        raise NotImplementedError("服务器未安装 pyarrow，无法导出 Parquet 格式。")
+    types = {
+        'station_id': pa.int64(),
+        'station_name': pa.string(),
+        'timestamp': pa.timestamp('us', tz='UTC'),
+        'quality': pa.string(),
+    }
+    return pa.schema([
+        (column, types.get(column, pa.int16() if column.endswith('_level') else pa.float64()))
+        for column in columns
+    ])
+
+
+def stream_parquet(queryset, columns, chunk_size=DEFAULT_CHUNK_SIZE):
+    """每个数据块写成一个 Parquet 行组并立即输出，文件尾(footer)在最后一块之后输出"""
+    schema = parquet_schema(columns)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema, compression='snappy')
+    try:
+        for chunk in iter_chunks(queryset, columns, chunk_size):
+            arrays = [
+                pa.array([row[i] for row in chunk], type=field.type)
+                for i, field in enumerate(schema)
+            ]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema), row_group_size=len(chunk))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
@@ -0,0 +1,191 @@
+# aqi_api/grid_weights.py
+"""
+站点→网格插值权重矩阵
+原流程对每个污染物、每个月先用 IDW 插值出 网格边长/10 的栅格，再做分区统计得到每个网格的均值。
+站点位置和网格不变，因此把这一过程写成固定的稀疏矩阵：
+  子栅格×站点 的 IDW 权重矩阵 S(每个子栅格只保留最近 k 个站点) 与 网格×子栅格 的平均矩阵 A，
+  网格均值 = A·diag(1/S1)·S·v，只需一次稀疏矩阵乘向量。
+有站点缺测时最近 k 个站点会变化，不能简单地在 S 上剔除缺测站点后重新归一化；
+此时只用有数据的站点重新构建 S，并按站点可用情况缓存，结果与只用剩余站点做 IDW 一致。
+只依赖 NumPy/SciPy，ArcGIS Pro 中的 scripts/generate_analysis_grid.py 和管理命令都可直接使用。
+"""
+import os
+import hashlib
+import numpy as np
+from scipy import sparse
+from scipy.spatial import cKDTree
+
+from backend.lru_cache import LRUCache
+
+DEFAULT_SUBDIVISIONS = 10  # 与原流程的 IDW 栅格(网格边长/10)一致
+DEFAULT_NEIGHBORS = 12     # 与 arcpy Idw 默认的可变搜索半径(最近 12 个点)一致
+DEFAULT_POWER = 2.0
+
+# (权重指纹, 可用站点) -> 只用可用站点计算的 网格×站点 权重矩阵
+MASK_CACHE_SIZE = 32
+_MASK_CACHE = LRUCache(MASK_CACHE_SIZE)
+
+
+def subcell_centres(cell_bounds, subdivisions=DEFAULT_SUBDIVISIONS):
+    """每个网格按 subdivisions×subdivisions 均分后的子栅格中心点，按网格顺序排列"""
+    bounds = np.asarray(cell_bounds, dtype=float)
+    offsets = (np.arange(subdivisions) + 0.5) / subdivisions
+    fx, fy = np.meshgrid(offsets, offsets)
+    xs = bounds[:, [0]] + (bounds[:, [2]] - bounds[:, [0]]) * fx.ravel()
+    ys = bounds[:, [1]] + (bounds[:, [3]] - bounds[:, [1]]) * fy.ravel()
+    return np.column_stack([xs.ravel(), ys.ravel()])
+
+
+def weights_signature(grid_ids, cell_bounds, station_ids, station_xy, subdivisions=DEFAULT_SUBDIVISIONS,
+                      neighbors=DEFAULT_NEIGHBORS, power=DEFAULT_POWER):
+    """网格、站点和参数的指纹，用于判断缓存的权重矩阵是否仍然适用"""
+    digest = hashlib.sha1()
+    for array in (grid_ids, cell_bounds, station_ids, station_xy):
+        digest.update(np.ascontiguousarray(np.asarray(array, dtype=float)).round(3).tobytes())
+    digest.update(f"{subdivisions}|{neighbors}|{power}".encode('ascii'))
+    return digest.hexdigest()
+
+
+def _combined_weights(cell_bounds, station_xy, columns, n_stations, subdivisions, neighbors, power):
+    """
+    只用 station_xy 中的站点计算 网格×站点 权重矩阵，columns 为这些站点在完整站点列表中的位置，
+    其余站点对应的列为 0。
+    """
+    points = subcell_centres(cell_bounds, subdivisions)
+    n_cells, n_sub = len(cell_bounds), subdivisions * subdivisions
+    k = min(int(neighbors), len(station_xy))
+    distances, indices = cKDTree(station_xy).query(points, k=k)
+    if k == 1:
+        distances, indices = distances[:, None], indices[:, None]
+
+    # 子栅格中心与站点重合时用极小距离代替，使该站点权重占绝对主导
+    cell_size = float(np.median(cell_bounds[:, 2] - cell_bounds[:, 0]))
+    distances = np.maximum(distances, max(cell_size, 1.0) * 1e-6)
+    weights = 1.0 / distances ** power
+    weights /= weights.sum(axis=1, keepdims=True)
+    subcells = sparse.csr_matrix(
+        (weights.ravel(), (np.repeat(np.arange(len(points)), k), columns[indices].ravel())),
+        shape=(len(points), n_stations),
+    )
+    aggregation = sparse.csr_matrix(
+        (np.full(len(points), 1.0 / n_sub), (np.repeat(np.arange(n_cells), n_sub), np.arange(len(points)))),
+        shape=(n_cells, len(points)),
+    )
+    return (aggregation @ subcells).tocsr()
+
+
+def build_station_grid_weights(grid_ids, cell_bounds, station_ids, station_xy, subdivisions=DEFAULT_SUBDIVISIONS,
+                               neighbors=DEFAULT_NEIGHBORS, power=DEFAULT_POWER):
+    """
+    计算全部站点可用时的权重矩阵。cell_bounds 为各网格的 (xmin, ymin, xmax, ymax)，station_xy 与网格在同一投影坐标系下。
+    返回 {'grid_ids', 'station_ids', 'cell_bounds', 'station_xy', 'combined'(网格×站点 权重),
+          'subdivisions', 'neighbors', 'power', 'signature'}。
+    """
+    grid_ids = np.asarray(grid_ids, dtype=np.int64)
+    station_ids = np.asarray(station_ids, dtype=np.int64)
+    cell_bounds = np.asarray(cell_bounds, dtype=float)
+    station_xy = np.asarray(station_xy, dtype=float)
+    if len(station_ids) == 0:
+        raise ValueError("没有站点，无法计算插值权重。")
+
+    n_stations = len(station_ids)
+    combined = _combined_weights(cell_bounds, station_xy, np.arange(n_stations), n_stations,
+                                 subdivisions, neighbors, power)
+    print(f"站点→网格权重矩阵计算完成: {len(grid_ids)} 个网格 × {n_stations} 个站点, {combined.nnz} 个非零权重。")
+    return {
+        'grid_ids': grid_ids,
+        'station_ids': station_ids,
+        'cell_bounds': cell_bounds,
+        'station_xy': station_xy,
+        'combined': combined,
+        'subdivisions': subdivisions,
+        'neighbors': neighbors,
+        'power': power,
+        'signature': weights_signature(grid_ids, cell_bounds, station_ids, station_xy, subdivisions, neighbors, power),
+    }
+
+
+def masked_weights(weights, available):
+    """只用 available 为 True 的站点做 IDW 的 网格×站点 权重矩阵，按 (权重指纹, 可用站点) 缓存"""
+    if available.all():
+        return weights['combined']
+    key = (weights['signature'], np.packbits(available).tobytes())
+    combined = _MASK_CACHE.get(key)
+    if combined is None:
+        columns = np.flatnonzero(available)
+        combined = _combined_weights(weights['cell_bounds'], weights['station_xy'][columns], columns,
+                                     len(available), weights['subdivisions'], weights['neighbors'], weights['power'])
+        _MASK_CACHE.put(key, combined)
+    return combined
+
+
+def grid_means(weights, station_values):
+    """
+    station_values: 与 weights['station_ids'] 对齐的数组，形状 (站点数,) 或 (站点数, 指标数)，缺测为 NaN。
+    返回各网格的插值均值，形状与输入的指标维度一致；每个指标只用该指标有数据的站点插值，没有任何站点有数据时为 NaN。
+    """
+    values = np.asarray(station_values, dtype=float)
+    columns = values.reshape(len(values), -1)
+    means = np.full((len(weights['grid_ids']), columns.shape[1]), np.nan)
+    for j in range(columns.shape[1]):
+        available = ~np.isnan(columns[:, j])
+        if available.any():
+            means[:, j] = masked_weights(weights, available) @ np.where(available, columns[:, j], 0.0)
+    return means.reshape((len(weights['grid_ids']),) + values.shape[1:])
+
+
+def save_weights(path, weights):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    combined = weights['combined']
+    np.savez_compressed(
+        path,
+        grid_ids=weights['grid_ids'],
+        station_ids=weights['station_ids'],
+        cell_bounds=weights['cell_bounds'],
+        station_xy=weights['station_xy'],
+        params=np.array([weights['subdivisions'], weights['neighbors'], weights['power']], dtype=float),
+        signature=np.array(weights['signature']),
+        combined_data=combined.data,
+        combined_indices=combined.indices,
+        combined_indptr=combined.indptr,
+        combined_shape=np.array(combined.shape),
+    )
+
+
+def load_weights(path):
+    with np.load(path) as stored:
+        subdivisions, neighbors, power = stored['params']
+        return {
+            'grid_ids': stored['grid_ids'],
+            'station_ids': stored['station_ids'],
+            'cell_bounds': stored['cell_bounds'],
+            'station_xy': stored['station_xy'],
+            'combined': sparse.csr_matrix(
+                (stored['combined_data'], stored['combined_indices'], stored['combined_indptr']),
+                shape=tuple(stored['combined_shape']),
+            ),
+            'subdivisions': int(subdivisions),
+            'neighbors': int(neighbors),
+            'power': float(power),
+            'signature': str(stored['signature']),
+        }
+
+
+def get_station_grid_weights(cache_path, grid_ids, cell_bounds, station_ids, station_xy,
+                             subdivisions=DEFAULT_SUBDIVISIONS, neighbors=DEFAULT_NEIGHBORS, power=DEFAULT_POWER):
+    """读取缓存文件中的权重矩阵；文件不存在或网格、站点、参数已变化时重新计算并覆盖该文件"""
+    signature = weights_signature(grid_ids, cell_bounds, station_ids, station_xy, subdivisions, neighbors, power)
+    if cache_path:
+        try:
+            weights = load_weights(cache_path)
+            if weights['signature'] == signature:
+                return weights
+            print("网格或站点已变化，重新计算站点→网格权重矩阵。")
+        except (OSError, KeyError, ValueError):
+            pass
+    weights = build_station_grid_weights(grid_ids, cell_bounds, station_ids, station_xy, subdivisions, neighbors, power)
+    if cache_path:
+        save_weights(cache_path, weights)
+    return weights
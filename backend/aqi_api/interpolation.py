@@ -0,0 +1,269 @@
+# aqi_api/interpolation.py
+"""
+空气质量插值面(替代只能在 ArcGIS Pro 中运行的 scripts/generate_aqi_kriging.py)
+站点快照来自数据库，在投影坐标系(默认 EPSG:4545)下的规则栅格上计算插值面，并用本地边界文件裁剪。
+IDW 通过 KD 树限定每个栅格只使用最近的 k 个站点，全部栅格一次向量化计算；克里金见 kriging.py。
+没有边界文件时以全部监测站的凸包作为插值范围。
+插值面按 (站点快照, 污染物, 方法与参数) 缓存，同一时刻同一污染物只计算一次。
+"""
+import os
+import math
+import threading
+import numpy as np
+import geopandas as gpd
+import shapely
+from pyproj import Transformer
+from scipy.spatial import cKDTree
+from django.conf import settings
+from django.db.models import Max, Count
+
+from backend.lru_cache import LRUCache
+from data_pipeline.models import AQIStation
+from data_pipeline.rollups import ROLLUP_POLLUTANTS
+from aqi_api import snapshot, kriging
+
+DEFAULT_CELL_SIZE = 500.0  # 与原 arcpy 工具相同: 500 米栅格、幂 2、最近 12 个站点
+MIN_CELL_SIZE = 250.0
+MAX_GRID_CELLS = 500000  # 栅格总数上限，JSON 输出为二维数组，过细的栅格响应体积过大
+DEFAULT_POWER = 2.0
+DEFAULT_NEIGHBORS = 12
+NODATA_VALUE = -9999
+
+INTERPOLATION_METHODS = ('idw', 'kriging')
+METHOD_DEFAULTS = {
+    'idw': {'neighbors': DEFAULT_NEIGHBORS, 'power': DEFAULT_POWER},
+    'kriging': {'variogram': kriging.DEFAULT_VARIOGRAM_MODEL, 'n_lags': kriging.DEFAULT_N_LAGS},
+}
+
+GRID_CACHE_SIZE = 4
+SURFACE_CACHE_SIZE = 256
+_GRID_CACHE = LRUCache(GRID_CACHE_SIZE)
+_SURFACE_CACHE = LRUCache(SURFACE_CACHE_SIZE)
+_grid_lock = threading.Lock()
+
+
+def interpolation_crs():
+    return getattr(settings, 'AQI_INTERPOLATION_CRS', 'EPSG:4545')
+
+
+def idw_predict(station_xy, values, target_xy, neighbors=DEFAULT_NEIGHBORS, power=DEFAULT_POWER):
+    """
+    反距离加权插值。每个目标点只使用 KD 树检索出的最近 neighbors 个站点，
+    权重为 1 / d^power；目标点与站点重合时直接取该站点的值。
+    """
+    station_xy = np.asarray(station_xy, dtype=float)
+    values = np.asarray(values, dtype=float)
+    target_xy = np.asarray(target_xy, dtype=float)
+    if len(values) == 0:
+        raise ValueError("没有可用于插值的站点数据。")
+
+    k = min(int(neighbors), len(values))
+    distances, indices = cKDTree(station_xy).query(target_xy, k=k)
+    if k == 1:
+        distances, indices = distances[:, None], indices[:, None]
+
+    with np.errstate(divide='ignore'):
+        weights = 1.0 / distances ** power
+    exact = distances[:, 0] == 0
+    weights[exact] = 0.0
+    estimate = (weights * values[indices]).sum(axis=1) / np.where(exact, 1.0, weights.sum(axis=1))
+    estimate[exact] = values[indices[exact, 0]]
+    return estimate
+
+
+def boundary_path():
+    return getattr(settings, 'AQI_INTERPOLATION_BOUNDARY_PATH', settings.DISTRICT_BOUNDARY_PATH)
+
+
+def _boundary_key():
+    """插值范围的版本：边界文件的修改时间，没有边界文件时为站点表的 (最大更新时间, 站点数)"""
+    path = boundary_path()
+    if os.path.exists(path):
+        return ('file', path, os.path.getmtime(path))
+    stamp = AQIStation.objects.aggregate(updated=Max('updated_at'), count=Count('pk'))
+    return ('stations', stamp['updated'], stamp['count'])
+
+
+def _load_boundary(crs):
+    path = boundary_path()
+    if os.path.exists(path):
+        boundary = gpd.read_file(path)
+        if boundary.crs is None:
+            boundary = boundary.set_crs('EPSG:4326')  # GeoJSON 默认为 WGS84 经纬度
+        return shapely.union_all(boundary.to_crs(crs).geometry.values)
+
+    print(f"找不到插值边界文件 {path}，使用监测站分布的凸包作为插值范围。")
+    locations = list(AQIStation.objects.values_list('location', flat=True))
+    lon = np.array([loc.x for loc in locations], dtype=float)
+    lat = np.array([loc.y for loc in locations], dtype=float)
+    x, y = Transformer.from_crs('EPSG:4326', crs, always_xy=True).transform(lon, lat)
+    hull = shapely.convex_hull(shapely.multipoints(np.column_stack([x, y]))) if len(lon) else None
+    if hull is None or hull.area == 0:
+        raise ValueError("没有插值边界文件，且监测站不足以构成插值范围。")
+    return hull
+
+
+def build_target_grid(crs, cell_size):
+    """
+    覆盖边界外包矩形的规则栅格，原点对齐到 cell_size 的整数倍，行自上而下。
+    返回栅格描述，以及边界内栅格中心点的坐标和在栅格中的位置。
+    """
+    boundary = _load_boundary(crs)
+    xmin, ymin, xmax, ymax = boundary.bounds
+    x0 = math.floor(xmin / cell_size) * cell_size
+    y_top = math.ceil(ymax / cell_size) * cell_size
+    n_cols = int(math.ceil((xmax - x0) / cell_size))
+    n_rows = int(math.ceil((y_top - ymin) / cell_size))
+    if n_rows * n_cols > MAX_GRID_CELLS:
+        raise ValueError(f"栅格边长 {cell_size} 米时共 {n_rows * n_cols} 个栅格，超过上限 {MAX_GRID_CELLS}，请增大 cell_size。")
+
+    cols, rows = np.meshgrid(np.arange(n_cols), np.arange(n_rows))
+    xs = x0 + (cols.ravel() + 0.5) * cell_size
+    ys = y_top - (rows.ravel() + 0.5) * cell_size
+    shapely.prepare(boundary)
+    inside = np.flatnonzero(shapely.contains_xy(boundary, xs, ys))
+    print(f"插值栅格构建完成: {n_rows} 行 × {n_cols} 列, 边界内 {len(inside)} 个栅格, 边长 {cell_size} 米。")
+    return {
+        'crs': crs,
+        'transformer': Transformer.from_crs('EPSG:4326', crs, always_xy=True),
+        'origin': (x0, y_top),  # 左上角
+        'cell_size': cell_size,
+        'n_rows': n_rows,
+        'n_cols': n_cols,
+        'positions': inside,
+        'xy': np.column_stack([xs[inside], ys[inside]]),
+    }
+
+
+def get_target_grid(cell_size=DEFAULT_CELL_SIZE):
+    """按 (坐标系, 栅格边长, 插值范围版本) 缓存的目标栅格，边界和栅格中心点只计算一次。"""
+    key = (interpolation_crs(), float(cell_size), _boundary_key())
+    grid = _GRID_CACHE.get(key)
+    if grid is None:
+        with _grid_lock:
+            grid = _GRID_CACHE.get(key)
+            if grid is None:
+                grid = build_target_grid(key[0], key[1])
+                grid['key'] = key  # 克里金按此缓存站点到栅格的距离矩阵
+                _GRID_CACHE.put(key, grid)
+    return grid
+
+
+def station_snapshot(target_datetime, pollutant, max_staleness=None):
+    """
+    target_datetime 时刻每个站点的最近一条记录中该污染物的数值。
+    返回 (记录ID元组, 经度数组, 纬度数组, 数值数组, 快照中最新的记录时间)，没有数值的站点不参与插值。
+    """
+    column = ROLLUP_POLLUTANTS[pollutant]
+    records = [r for r in snapshot.snapshot_records(target_datetime, max_staleness) if getattr(r, column) is not None]
+    stations = AQIStation.objects.in_bulk([r.station_id for r in records])
+    records = [r for r in records if r.station_id in stations]
+    lon = np.array([stations[r.station_id].location.x for r in records], dtype=float)
+    lat = np.array([stations[r.station_id].location.y for r in records], dtype=float)
+    values = np.array([getattr(r, column) for r in records], dtype=float)
+    latest = max((r.timestamp for r in records), default=None)
+    return tuple(sorted(r.id for r in records)), lon, lat, values, latest
+
+
+def _predict(method, station_xy, values, grid, options):
+    """返回 (估计值, 方差或 None, 模型参数或 None)"""
+    if method == 'idw':
+        return idw_predict(station_xy, values, grid['xy'], options['neighbors'], options['power']), None, None
+    if method == 'kriging':
+        return kriging.ordinary_kriging(station_xy, values, grid['xy'], model=options['variogram'],
+                                        n_lags=options['n_lags'], target_key=grid['key'])
+    raise ValueError(f"不支持的插值方法: {method}")
+
+
+def interpolate_surface(target_datetime, pollutant, method='idw', cell_size=DEFAULT_CELL_SIZE,
+                        max_staleness=None, **options):
+    """
+    计算 target_datetime 时刻某污染物的插值面。快照相同(同一批记录)时直接返回缓存结果。
+    options 为方法参数(IDW: neighbors、power；克里金: variogram、n_lags)，未给出的取默认值。
+    返回 {'grid', 'values'(栅格行优先数组，边界外为 NaN), 'variance'(仅克里金), 'pollutant', 'method',
+          'timestamp', 'station_count', 'options', 'model'(仅克里金，拟合的变异函数)}。
+    """
+    if method not in METHOD_DEFAULTS:
+        raise ValueError(f"不支持的插值方法: {method}")
+    options = {key: options.get(key, default) for key, default in METHOD_DEFAULTS[method].items()}
+    record_ids, lon, lat, values, latest = station_snapshot(target_datetime, pollutant, max_staleness)
+    if len(values) == 0:
+        raise ValueError("该时刻没有可用于插值的站点数据。")
+
+    cache_key = (record_ids, pollutant, method, float(cell_size), tuple(sorted(options.items())))
+    surface = _SURFACE_CACHE.get(cache_key)
+    if surface is not None:
+        return surface
+
+    grid = get_target_grid(cell_size)
+    station_xy = np.column_stack(grid['transformer'].transform(lon, lat))
+    estimate, variance, model = _predict(method, station_xy, values, grid, options)
+
+    surface_values = np.full(grid['n_rows'] * grid['n_cols'], np.nan)
+    surface_values[grid['positions']] = estimate
+    surface_variance = None
+    if variance is not None:
+        surface_variance = np.full(grid['n_rows'] * grid['n_cols'], np.nan)
+        surface_variance[grid['positions']] = variance
+
+    surface = {
+        'grid': grid,
+        'values': surface_values,
+        'variance': surface_variance,
+        'pollutant': pollutant,
+        'method': method,
+        'timestamp': latest,
+        'station_count': len(values),
+        'options': options,
+        'model': model,
+    }
+    _SURFACE_CACHE.put(cache_key, surface)
+    return surface
+
+
+def _rows(values, n_cols, decimals):
+    rounded = np.round(values, decimals)
+    return [
+        [None if np.isnan(v) else float(v) for v in rounded[start:start + n_cols]]
+        for start in range(0, len(rounded), n_cols)
+    ]
+
+
+def surface_to_json(surface, decimals=2):
+    """栅格描述加二维数值数组(行自上而下，边界外为 null)"""
+    grid = surface['grid']
+    data = {
+        'pollutant': surface['pollutant'],
+        'method': surface['method'],
+        'timestamp': surface['timestamp'],
+        'station_count': surface['station_count'],
+        'crs': grid['crs'],
+        'origin': list(grid['origin']),
+        'cell_size': grid['cell_size'],
+        'n_rows': grid['n_rows'],
+        'n_cols': grid['n_cols'],
+        'values': _rows(surface['values'], grid['n_cols'], decimals),
+    }
+    if surface['variance'] is not None:
+        data['variance'] = _rows(surface['variance'], grid['n_cols'], decimals)
+    if surface['model'] is not None:
+        data['variogram'] = surface['model']
+    return data
+
+
+def surface_to_ascii_grid(surface, band='values', decimals=3):
+    """ESRI ASCII Grid 栅格文本，可直接在 GIS 软件中打开(坐标系为 interpolation_crs())；band 可为 values 或 variance"""
+    grid = surface['grid']
+    values = np.where(np.isnan(surface[band]), NODATA_VALUE, np.round(surface[band], decimals))
+    x0, y_top = grid['origin']
+    lines = [
+        f"ncols {grid['n_cols']}",
+        f"nrows {grid['n_rows']}",
+        f"xllcorner {x0}",
+        f"yllcorner {y_top - grid['n_rows'] * grid['cell_size']}",
+        f"cellsize {grid['cell_size']}",
+        f"NODATA_value {NODATA_VALUE}",
+    ]
+    for row in values.reshape(grid['n_rows'], grid['n_cols']):
+        lines.append(' '.join(f"{v:g}" for v in row))
+    return '\n'.join(lines) + '\n'
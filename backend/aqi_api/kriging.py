@@ -0,0 +1,170 @@
+# aqi_api/kriging.py
+"""
+普通克里金插值
+由站点快照计算经验变异函数并拟合理论模型(球状、指数、高斯)，克里金方程组的系数矩阵只做一次 LU 分解，
+所有目标栅格按块组成右端矩阵一次求解，得到估计值和克里金方差。不依赖 Django 和 arcpy。
+"""
+import numpy as np
+from scipy.linalg import lu_factor, lu_solve
+from scipy.optimize import curve_fit
+from scipy.spatial.distance import pdist, cdist
+
+from backend.lru_cache import LRUCache
+
+VARIOGRAM_MODELS = ('spherical', 'exponential', 'gaussian')
+DEFAULT_VARIOGRAM_MODEL = 'spherical'
+DEFAULT_N_LAGS = 12
+MIN_KRIGING_STATIONS = 3
+KRIGING_BLOCK_SIZE = 8192
+
+# 站点配置(站点坐标)对应的 LU 分解与 站点→目标点 距离，站点不变时各污染物、各时刻共用
+SYSTEM_CACHE_SIZE = 64
+DISTANCE_CACHE_SIZE = 4
+_SYSTEM_CACHE = LRUCache(SYSTEM_CACHE_SIZE)
+_DISTANCE_CACHE = LRUCache(DISTANCE_CACHE_SIZE)
+
+
+def spherical(h, nugget, psill, range_):
+    h = np.asarray(h, dtype=float) / range_
+    gamma = nugget + psill * np.where(h < 1, 1.5 * h - 0.5 * h ** 3, 1.0)
+    return np.where(h == 0, 0.0, gamma)
+
+
+def exponential(h, nugget, psill, range_):
+    # 实用变程：在 range_ 处达到基台值的 95%
+    h = np.asarray(h, dtype=float)
+    return np.where(h == 0, 0.0, nugget + psill * (1 - np.exp(-3 * h / range_)))
+
+
+def gaussian(h, nugget, psill, range_):
+    h = np.asarray(h, dtype=float)
+    return np.where(h == 0, 0.0, nugget + psill * (1 - np.exp(-3 * (h / range_) ** 2)))
+
+
+MODEL_FUNCTIONS = {'spherical': spherical, 'exponential': exponential, 'gaussian': gaussian}
+
+
+def empirical_variogram(xy, values, n_lags=DEFAULT_N_LAGS, max_lag=None):
+    """
+    经验变异函数：站点两两之间半方差 0.5 * (z_i - z_j)^2 按距离分组求平均。
+    max_lag 默认为最大站点间距的一半；该范围内没有点对时(如站点很少且彼此相距较远)改用全部点对。
+    返回 (各组平均距离, 半方差, 点对数)，空组已剔除。
+    """
+    distances = pdist(xy)
+    semivariance = 0.5 * pdist(np.asarray(values, dtype=float)[:, None], 'sqeuclidean')
+    if len(distances) == 0:
+        return np.empty(0), np.empty(0), np.empty(0, dtype=int)
+    if max_lag is None:
+        max_lag = distances.max() / 2
+    if not (distances <= max_lag).any():
+        max_lag = distances.max()
+    edges = np.linspace(0, max_lag, n_lags + 1)
+    bins = np.minimum(np.digitize(distances, edges) - 1, n_lags - 1)
+    in_range = distances <= max_lag
+    counts = np.bincount(bins[in_range], minlength=n_lags)
+    lag_sum = np.bincount(bins[in_range], weights=distances[in_range], minlength=n_lags)
+    gamma_sum = np.bincount(bins[in_range], weights=semivariance[in_range], minlength=n_lags)
+    filled = counts > 0
+    return lag_sum[filled] / counts[filled], gamma_sum[filled] / counts[filled], counts[filled]
+
+
+def fit_variogram(lags, gamma, counts, model=DEFAULT_VARIOGRAM_MODEL):
+    """
+    按点对数加权的最小二乘拟合 (块金, 偏基台, 变程)。model='auto' 时拟合全部模型并取加权残差最小者。
+    返回 {'model', 'nugget', 'psill', 'range', 'sse'}。
+    """
+    if model == 'auto':
+        fits = [fit_variogram(lags, gamma, counts, name) for name in VARIOGRAM_MODELS]
+        return min(fits, key=lambda fit: fit['sse'])
+
+    if len(lags) == 0 or float(lags.max()) <= 0:
+        raise ValueError("站点分布不足以拟合变异函数。")
+    function = MODEL_FUNCTIONS[model]
+    max_lag = float(lags.max())
+    initial = [max(float(gamma.min()), 0.0), max(float(gamma.max() - gamma.min()), 1e-6), max_lag / 2]
+    params = initial
+    if len(lags) >= 3:
+        try:
+            params, _ = curve_fit(
+                function, lags, gamma, p0=initial, sigma=1 / np.sqrt(counts),
+                bounds=([0, 0, max_lag * 1e-3], [np.inf, np.inf, max_lag * 10]), maxfev=5000,
+            )
+        except (RuntimeError, ValueError):
+            print(f"变异函数 {model} 模型拟合未收敛，使用初始参数。")
+    nugget, psill, range_ = (float(p) for p in params)
+    residual = function(lags, nugget, psill, range_) - gamma
+    return {'model': model, 'nugget': nugget, 'psill': psill, 'range': range_,
+            'sse': float(np.sum(counts * residual ** 2))}
+
+
+def _merge_duplicates(xy, values):
+    """坐标重合的站点取平均，避免克里金矩阵奇异"""
+    unique_xy, inverse = np.unique(np.round(xy, 6), axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    if len(unique_xy) == len(xy):
+        return xy, values
+    merged = np.bincount(inverse, weights=values) / np.bincount(inverse)
+    return unique_xy, merged
+
+
+def _kriging_system(xy, variogram):
+    """
+    普通克里金系数矩阵 [[Γ, 1], [1ᵀ, 0]] 的 LU 分解，按 (站点坐标, 变异函数参数) 缓存。
+    """
+    key = (xy.tobytes(), variogram['model'], variogram['nugget'], variogram['psill'], variogram['range'])
+    system = _SYSTEM_CACHE.get(key)
+    if system is None:
+        n = len(xy)
+        matrix = np.ones((n + 1, n + 1))
+        matrix[:n, :n] = MODEL_FUNCTIONS[variogram['model']](cdist(xy, xy), variogram['nugget'],
+                                                             variogram['psill'], variogram['range'])
+        matrix[n, n] = 0.0
+        system = lu_factor(matrix)
+        _SYSTEM_CACHE.put(key, system)
+    return system
+
+
+def _target_distances(xy, target_xy, target_key):
+    """站点到全部目标点的距离矩阵 (站点数 × 目标点数)；给出 target_key 时按站点配置缓存"""
+    if target_key is None:
+        return cdist(xy, target_xy)
+    key = (target_key, xy.tobytes())
+    distances = _DISTANCE_CACHE.get(key)
+    if distances is None:
+        distances = cdist(xy, target_xy)
+        _DISTANCE_CACHE.put(key, distances)
+    return distances
+
+
+def ordinary_kriging(station_xy, values, target_xy, model=DEFAULT_VARIOGRAM_MODEL, n_lags=DEFAULT_N_LAGS,
+                     target_key=None, block_size=KRIGING_BLOCK_SIZE):
+    """
+    普通克里金预测。目标点按 block_size 分块，每块的右端项 [γ(d); 1] 组成矩阵后一次 lu_solve，
+    估计值 = λᵀz，克里金方差 = λᵀγ + μ。
+    返回 (估计值数组, 克里金方差数组, 变异函数参数)。
+    """
+    xy, values = _merge_duplicates(np.asarray(station_xy, dtype=float), np.asarray(values, dtype=float))
+    target_xy = np.asarray(target_xy, dtype=float)
+    if len(values) < MIN_KRIGING_STATIONS:
+        raise ValueError(f"克里金插值至少需要 {MIN_KRIGING_STATIONS} 个站点。")
+
+    lags, gamma, counts = empirical_variogram(xy, values, n_lags)
+    variogram = fit_variogram(lags, gamma, counts, model)
+    if np.ptp(values) == 0:
+        # 所有站点取值相同，插值面为常数
+        return np.full(len(target_xy), values[0]), np.zeros(len(target_xy)), variogram
+
+    system = _kriging_system(xy, variogram)
+    distances = _target_distances(xy, target_xy, target_key)
+    function = MODEL_FUNCTIONS[variogram['model']]
+    n = len(xy)
+    estimate = np.empty(len(target_xy))
+    variance = np.empty(len(target_xy))
+    for start in range(0, len(target_xy), block_size):
+        stop = min(start + block_size, len(target_xy))
+        rhs = np.ones((n + 1, stop - start))
+        rhs[:n] = function(distances[:, start:stop], variogram['nugget'], variogram['psill'], variogram['range'])
+        solution = lu_solve(system, rhs)
+        estimate[start:stop] = values @ solution[:n]
+        variance[start:stop] = np.einsum('ij,ij->j', solution[:n], rhs[:n]) + solution[n]
+    return estimate, np.maximum(variance, 0.0), variogram
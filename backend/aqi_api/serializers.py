@@ -1,5 +1,10 @@
 from rest_framework import serializers
 from data_pipeline.models import AQIRecord
+from data_pipeline.rollups import ROLLUP_POLLUTANTS
+from aqi_api.export import EXPORT_FORMATS, EXPORT_POLLUTANTS, DEFAULT_CHUNK_SIZE, MAX_CHUNK_SIZE
+from aqi_api.interpolation import (INTERPOLATION_METHODS, DEFAULT_CELL_SIZE, MIN_CELL_SIZE, DEFAULT_NEIGHBORS,
+                                   DEFAULT_POWER)
+from aqi_api.kriging import VARIOGRAM_MODELS, DEFAULT_VARIOGRAM_MODEL, DEFAULT_N_LAGS
 
 class AQIRecordSerializer(serializers.ModelSerializer):
     class Meta:
@@ -22,3 +27,103 @@ class AQIRecordSerializer(serializers.ModelSerializer):
             'raw_data',
             'created_at'
         ]
+
+
+class AQIRollupQuerySerializer(serializers.Serializer):
+    """空气质量汇总查询参数"""
+    granularity = serializers.ChoiceField(choices=['day', 'month'], default='month')
+    pollutant = serializers.ChoiceField(choices=list(ROLLUP_POLLUTANTS))
+    scope = serializers.ChoiceField(choices=['station', 'city'], default='station')
+    start = serializers.DateField(required=False, input_formats=['%Y-%m-%d', '%Y-%m'])
+    end = serializers.DateField(required=False, input_formats=['%Y-%m-%d', '%Y-%m'])
+    station_id = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        start, end = attrs.get('start'), attrs.get('end')
+        if start and end and start > end:
+            raise serializers.ValidationError("start 不能晚于 end。")
+        return attrs
+
+
+class AQIExportQuerySerializer(serializers.Serializer):
+    """空气质量历史导出参数；不用 format 作参数名，避免与 DRF 的格式后缀冲突"""
+    file_format = serializers.ChoiceField(choices=list(EXPORT_FORMATS), default='csv')
+    station_id = serializers.ListField(child=serializers.IntegerField(), required=False)
+    start = serializers.DateTimeField(required=False, input_formats=['%Y-%m-%d %H:%M:%S', '%Y-%m-%d', 'iso-8601'])
+    end = serializers.DateTimeField(required=False, input_formats=['%Y-%m-%d %H:%M:%S', '%Y-%m-%d', 'iso-8601'])
+    pollutants = serializers.CharField(required=False, help_text="逗号分隔，默认导出全部")
+    chunk_size = serializers.IntegerField(default=DEFAULT_CHUNK_SIZE, min_value=100, max_value=MAX_CHUNK_SIZE)
+
+    def validate_pollutants(self, value):
+        pollutants = [p.strip() for p in value.split(',') if p.strip()]
+        unknown = [p for p in pollutants if p not in EXPORT_POLLUTANTS]
+        if unknown:
+            raise serializers.ValidationError(f"不支持的污染物: {', '.join(unknown)}")
+        # 去重并保持标准顺序
+        return [p for p in EXPORT_POLLUTANTS if p in pollutants]
+
+    def validate(self, attrs):
+        start, end = attrs.get('start'), attrs.get('end')
+        if start and end and start >= end:
+            raise serializers.ValidationError("start 必须早于 end。")
+        attrs.setdefault('pollutants', list(EXPORT_POLLUTANTS))
+        if not attrs['pollutants']:
+            raise serializers.ValidationError("至少需要选择一个污染物。")
+        return attrs
+
+
+class NearestStationQuerySerializer(serializers.Serializer):
+    """最近站点查询参数"""
+    lon = serializers.FloatField(min_value=-180, max_value=180)
+    lat = serializers.FloatField(min_value=-90, max_value=90)
+    k = serializers.IntegerField(default=1, min_value=1, max_value=50)
+
+
+class StationsWithinQuerySerializer(serializers.Serializer):
+    """范围内站点查询参数：bbox=min_lon,min_lat,max_lon,max_lat，或 lon、lat 与 radius(米)"""
+    bbox = serializers.CharField(required=False)
+    lon = serializers.FloatField(required=False, min_value=-180, max_value=180)
+    lat = serializers.FloatField(required=False, min_value=-90, max_value=90)
+    radius = serializers.FloatField(required=False, min_value=0, max_value=500000)
+
+    def validate_bbox(self, value):
+        try:
+            bbox = [float(v) for v in value.split(',')]
+        except ValueError:
+            raise serializers.ValidationError("bbox 必须是 4 个逗号分隔的数字。")
+        if len(bbox) != 4:
+            raise serializers.ValidationError("bbox 必须是 4 个逗号分隔的数字。")
+        min_lon, min_lat, max_lon, max_lat = bbox
+        if min_lon > max_lon or min_lat > max_lat:
+            raise serializers.ValidationError("bbox 的最小值不能大于最大值。")
+        return bbox
+
+    def validate(self, attrs):
+        circle = [attrs.get(key) is not None for key in ('lon', 'lat', 'radius')]
+        if attrs.get('bbox') is not None:
+            if any(circle):
+                raise serializers.ValidationError("bbox 与 lon/lat/radius 只能二选一。")
+        elif not all(circle):
+            raise serializers.ValidationError("需要提供 bbox，或同时提供 lon、lat 和 radius。")
+        return attrs
+
+
+class AQIInterpolationQuerySerializer(serializers.Serializer):
+    """空气质量插值面参数；date 为空时使用当前时刻的站点快照"""
+    date = serializers.DateTimeField(required=False, input_formats=['%Y-%m-%d %H:%M:%S', 'iso-8601'])
+    pollutant = serializers.ChoiceField(choices=list(ROLLUP_POLLUTANTS), default='aqi')
+    method = serializers.ChoiceField(choices=list(INTERPOLATION_METHODS), default='idw')
+    cell_size = serializers.FloatField(default=DEFAULT_CELL_SIZE, min_value=MIN_CELL_SIZE, max_value=5000)
+    neighbors = serializers.IntegerField(default=DEFAULT_NEIGHBORS, min_value=1, max_value=50)
+    power = serializers.FloatField(default=DEFAULT_POWER, min_value=0.5, max_value=5)
+    variogram = serializers.ChoiceField(choices=list(VARIOGRAM_MODELS) + ['auto'], default=DEFAULT_VARIOGRAM_MODEL)
+    n_lags = serializers.IntegerField(default=DEFAULT_N_LAGS, min_value=4, max_value=30)
+    max_staleness_hours = serializers.FloatField(required=False, min_value=0.1)
+    output = serializers.ChoiceField(choices=['json', 'asc'], default='json')
+    band = serializers.ChoiceField(choices=['values', 'variance'], default='values',
+                                   help_text="output=asc 时输出的波段，variance 仅克里金可用")
+
+    def validate(self, attrs):
+        if attrs['band'] == 'variance' and attrs['method'] != 'kriging':
+            raise serializers.ValidationError("只有克里金插值提供方差。")
+        return attrs
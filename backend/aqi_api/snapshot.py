@@ -0,0 +1,43 @@
+# aqi_api/snapshot.py
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+
+from data_pipeline.models import AQIStation, AQIRecord
+
+
+def _snapshot_sql(with_staleness):
+    station_table = AQIStation._meta.db_table
+    record_table = AQIRecord._meta.db_table
+    staleness = "AND r.timestamp >= %s " if with_staleness else ""
+    # 对每个站点用 LATERAL 子查询在 (station_id, timestamp) 索引上倒序取第一条，
+    # 每个站点只读一个索引项，耗时与历史记录量无关
+    return (
+        f"SELECT r.* FROM {station_table} s "
+        f"CROSS JOIN LATERAL ("
+        f"SELECT * FROM {record_table} r "
+        f"WHERE r.station_id = s.id AND r.timestamp <= %s {staleness}"
+        f"ORDER BY r.timestamp DESC LIMIT 1"
+        f") r ORDER BY s.id"
+    )
+
+
+def snapshot_records(target_datetime, max_staleness=None):
+    """
+    返回每个监测站在 target_datetime 时刻(含)之前的最后一条记录。
+    max_staleness 为 timedelta 时，早于 target_datetime - max_staleness 的记录视为过期，对应站点不返回。
+    """
+    if settings.USE_TZ and timezone.is_naive(target_datetime):
+        target_datetime = timezone.make_aware(target_datetime)
+    params = [target_datetime]
+    if max_staleness is not None:
+        params.append(target_datetime - max_staleness)
+    return list(AQIRecord.objects.raw(_snapshot_sql(max_staleness is not None), params))
+
+
+def parse_staleness_hours(value):
+    """把查询参数中的小时数转换为 timedelta，无效或非正数时抛出 ValueError。"""
+    hours = float(value)
+    if hours <= 0:
+        raise ValueError("max_staleness_hours 必须大于 0。")
+    return timedelta(hours=hours)
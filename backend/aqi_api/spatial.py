@@ -0,0 +1,205 @@
+# aqi_api/spatial.py
+"""
+监测站的空间查询：最近的 k 个站点、矩形范围(bbox)内的站点、圆形范围(半径)内的站点，结果附带各站点最新读数。
+PostGIS 下使用 location 上的 GiST 索引(KNN 运算符 <-> 与 && / ST_DWithin)；
+没有 PostGIS 时退回内存中的 KD 树(cKDTree，站点坐标换算为单位球面上的三维坐标)。
+"""
+import math
+import threading
+import numpy as np
+from scipy.spatial import cKDTree
+from django.db import connection
+from django.db.models import Max, Count
+
+from data_pipeline.models import AQIStation, AQIStationLatest
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE = 111320.0
+
+# KNN 先按经纬度平面距离用索引取出 k * 该倍数个候选，再按球面距离精确排序，
+# 抵消经度方向的变形
+KNN_CANDIDATE_FACTOR = 4
+KNN_MIN_CANDIDATES = 16
+
+# 内存 KD 树: {'stamp', 'ids', 'names', 'lonlat', 'tree'}，站点表变化后重建
+_STATION_TREE = None
+_tree_lock = threading.Lock()
+
+
+def postgis_available():
+    return connection.vendor == 'postgresql' and getattr(connection.ops, 'postgis', False)
+
+
+def _haversine(lon, lat, lons, lats):
+    """(lon, lat) 到各点的大圆距离(米)"""
+    lon, lat, lons, lats = map(np.radians, (lon, lat, np.asarray(lons, float), np.asarray(lats, float)))
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def _unit_vectors(lons, lats):
+    lons, lats = np.radians(np.asarray(lons, float)), np.radians(np.asarray(lats, float))
+    return np.column_stack([np.cos(lats) * np.cos(lons), np.cos(lats) * np.sin(lons), np.sin(lats)])
+
+
+def _get_station_tree():
+    """站点 KD 树，以 (站点数, 最大更新时间) 判断是否需要重建"""
+    global _STATION_TREE
+    stamp = AQIStation.objects.aggregate(updated=Max('updated_at'), count=Count('pk'))
+    stamp = (stamp['updated'], stamp['count'])
+    tree = _STATION_TREE
+    if tree is None or tree['stamp'] != stamp:
+        with _tree_lock:
+            tree = _STATION_TREE
+            if tree is None or tree['stamp'] != stamp:
+                rows = list(AQIStation.objects.order_by('id').values_list('id', 'name', 'location'))
+                lonlat = np.array([(loc.x, loc.y) for _, _, loc in rows], dtype=float).reshape(-1, 2)
+                tree = {
+                    'stamp': stamp,
+                    'ids': np.array([row[0] for row in rows], dtype=np.int64),
+                    'names': [row[1] for row in rows],
+                    'lonlat': lonlat,
+                    'tree': cKDTree(_unit_vectors(lonlat[:, 0], lonlat[:, 1])) if len(rows) else None,
+                }
+                _STATION_TREE = tree
+    return tree
+
+
+def _tree_rows(tree, positions, distances=None):
+    return [
+        (int(tree['ids'][i]), tree['names'][i], float(tree['lonlat'][i, 0]), float(tree['lonlat'][i, 1]),
+         None if distances is None else float(distances[n]))
+        for n, i in enumerate(positions)
+    ]
+
+
+def _point_sql():
+    return "ST_SetSRID(ST_MakePoint(%s, %s), 4326)"
+
+
+def _nearest_postgis(lon, lat, k):
+    table = AQIStation._meta.db_table
+    candidates = max(k * KNN_CANDIDATE_FACTOR, KNN_MIN_CANDIDATES)
+    sql = (
+        f"SELECT s.id, s.name, ST_X(s.location), ST_Y(s.location), "
+        f"ST_Distance(s.location::geography, {_point_sql()}::geography) AS distance "
+        f"FROM (SELECT id, name, location FROM {table} "
+        f"ORDER BY location <-> {_point_sql()} LIMIT %s) s "
+        f"ORDER BY distance, s.id LIMIT %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [lon, lat, lon, lat, candidates, k])
+        return cursor.fetchall()
+
+
+def _nearest_tree(lon, lat, k):
+    tree = _get_station_tree()
+    if tree['tree'] is None:
+        return []
+    k = min(k, len(tree['ids']))
+    _, positions = tree['tree'].query(_unit_vectors([lon], [lat])[0], k=k)
+    positions = np.atleast_1d(positions)
+    distances = _haversine(lon, lat, tree['lonlat'][positions, 0], tree['lonlat'][positions, 1])
+    return _tree_rows(tree, positions, distances)
+
+
+def _radius_postgis(lon, lat, radius):
+    table = AQIStation._meta.db_table
+    # 先用经纬度 ST_DWithin 走 GiST 索引粗筛，再按球面距离精确过滤
+    degrees = radius / (METERS_PER_DEGREE * max(math.cos(math.radians(min(abs(lat), 89.0))), 1e-6))
+    sql = (
+        f"SELECT id, name, ST_X(location), ST_Y(location), distance FROM ("
+        f"SELECT id, name, location, ST_Distance(location::geography, {_point_sql()}::geography) AS distance "
+        f"FROM {table} WHERE ST_DWithin(location, {_point_sql()}, %s)"
+        f") s WHERE distance <= %s ORDER BY distance, id"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [lon, lat, lon, lat, degrees, radius])
+        return cursor.fetchall()
+
+
+def _radius_tree(lon, lat, radius):
+    tree = _get_station_tree()
+    if tree['tree'] is None:
+        return []
+    # 大圆距离对应的单位球弦长
+    chord = 2 * math.sin(min(radius / EARTH_RADIUS_M, math.pi) / 2)
+    positions = np.array(tree['tree'].query_ball_point(_unit_vectors([lon], [lat])[0], chord), dtype=np.int64)
+    if not len(positions):
+        return []
+    distances = _haversine(lon, lat, tree['lonlat'][positions, 0], tree['lonlat'][positions, 1])
+    order = np.lexsort((tree['ids'][positions], distances))
+    return _tree_rows(tree, positions[order], distances[order])
+
+
+def _bbox_postgis(min_lon, min_lat, max_lon, max_lat):
+    table = AQIStation._meta.db_table
+    sql = (
+        f"SELECT id, name, ST_X(location), ST_Y(location), NULL FROM {table} "
+        f"WHERE location && ST_MakeEnvelope(%s, %s, %s, %s, 4326) ORDER BY id"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [min_lon, min_lat, max_lon, max_lat])
+        return cursor.fetchall()
+
+
+def _bbox_tree(min_lon, min_lat, max_lon, max_lat):
+    tree = _get_station_tree()
+    lonlat = tree['lonlat']
+    inside = ((lonlat[:, 0] >= min_lon) & (lonlat[:, 0] <= max_lon) &
+              (lonlat[:, 1] >= min_lat) & (lonlat[:, 1] <= max_lat))
+    return _tree_rows(tree, np.flatnonzero(inside))
+
+
+def _with_latest(rows):
+    """把 (id, 名称, 经度, 纬度, 距离) 行转换为响应数据，并附上各站点的最新读数"""
+    latest = AQIStationLatest.objects.in_bulk([row[0] for row in rows])
+    results = []
+    for station_id, name, lon, lat, distance in rows:
+        record = latest.get(station_id)
+        station_data = {
+            'station_id': station_id,
+            'station_name': name,
+            'location': {'latitude': lat, 'longitude': lon},
+            'aqi_data': None,
+        }
+        if distance is not None:
+            station_data['distance_m'] = round(distance, 1)
+        if record is not None:
+            station_data['aqi_data'] = {
+                'aqi': record.aqi,
+                'quality': record.quality,
+                'description': record.description,
+                'measure': record.measure,
+                'timestr': record.timestr,
+                'timestamp': record.timestamp,
+                'co': record.co,
+                'no2': record.no2,
+                'o3': record.o3,
+                'pm10': record.pm10,
+                'pm25': record.pm25,
+                'so2': record.so2,
+            }
+        results.append(station_data)
+    return results
+
+
+def nearest_stations(lon, lat, k=1):
+    """距离 (lon, lat) 最近的 k 个站点，按球面距离升序"""
+    rows = _nearest_postgis(lon, lat, k) if postgis_available() else _nearest_tree(lon, lat, k)
+    return _with_latest(rows)
+
+
+def stations_within_radius(lon, lat, radius):
+    """与 (lon, lat) 球面距离不超过 radius 米的站点，按距离升序"""
+    rows = _radius_postgis(lon, lat, radius) if postgis_available() else _radius_tree(lon, lat, radius)
+    return _with_latest(rows)
+
+
+def stations_within_bbox(min_lon, min_lat, max_lon, max_lat):
+    """经纬度矩形范围内(含边界)的站点，按站点 ID 排序"""
+    if postgis_available():
+        rows = _bbox_postgis(min_lon, min_lat, max_lon, max_lat)
+    else:
+        rows = _bbox_tree(min_lon, min_lat, max_lon, max_lat)
+    return _with_latest(rows)
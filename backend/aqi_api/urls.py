@@ -1,7 +1,13 @@
 from django.urls import path, include
-from aqi_api.views import GetStationListView,StationHourlyDataAPIView,AQIRecordByTimeView
+from aqi_api.views import GetStationListView,StationHourlyDataAPIView,AQIRecordByTimeView,AQIRollupView,AQIExportView,\
+    NearestStationView,StationsWithinView,AQIInterpolationView
 urlpatterns = [
     path('station_lastest_list/',GetStationListView.as_view(),name='station_lastest_list'),
     path('station/<int:station_id>/hourly-records/',StationHourlyDataAPIView.as_view(),name='station_hourly_data'),
     path('station_by_time',AQIRecordByTimeView.as_view(),name='station_by_time'),
+    path('rollup/',AQIRollupView.as_view(),name='aqi_rollup'),
+    path('export/',AQIExportView.as_view(),name='aqi_export'),
+    path('stations/nearest/',NearestStationView.as_view(),name='stations_nearest'),
+    path('stations/within/',StationsWithinView.as_view(),name='stations_within'),
+    path('interpolation/',AQIInterpolationView.as_view(),name='aqi_interpolation'),
 ]
\ No newline at end of file
@@ -1,16 +1,25 @@
 # aqi_api/views.py
 from datetime import timedelta
+from django.utils import timezone
 from rest_framework import status, generics
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from aqi_api.serializers import AQIRecordSerializer
-from data_pipeline.models import AQIStation, AQIRecord
-from django.db.models import Subquery, OuterRef
+from aqi_api.serializers import (AQIRecordSerializer, AQIRollupQuerySerializer, AQIExportQuerySerializer,
+                                 NearestStationQuerySerializer, StationsWithinQuerySerializer,
+                                 AQIInterpolationQuerySerializer)
+from aqi_api import snapshot, export, spatial, interpolation
+from data_pipeline.models import AQIStation, AQIRecord, AQIStationLatest, AQIDailyRollup, AQIMonthlyRollup
+from django.db.models import Max, Min, Sum, Count
+from django.http import StreamingHttpResponse, HttpResponse
 from rest_framework.authentication import TokenAuthentication
 from datetime import datetime
 from rest_framework.permissions import AllowAny
 
 
+# 站点列表缓存: 以最新记录表的 (最大更新时间, 行数) 作为版本，入库进程更新后自动失效
+_STATION_LIST_CACHE = {'stamp': None, 'data': None}
+
+
 class GetStationListView(APIView):
     """
     获取所有监测站最新空气质量数据的API
@@ -19,23 +28,18 @@ class GetStationListView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request, *args, **kwargs):
-        latest_records = AQIRecord.objects.filter(
-            station=OuterRef('pk')
-        ).order_by('-timestamp').values('id')[:1]
+        # 入库在其他进程中进行，用一次很轻的聚合查询判断缓存是否仍然有效
+        stamp = AQIStationLatest.objects.aggregate(updated=Max('updated_at'), count=Count('pk'))
+        stamp = (stamp['updated'], stamp['count'])
+        if _STATION_LIST_CACHE['stamp'] == stamp:
+            return Response({"code": 201, "data": _STATION_LIST_CACHE['data']})
 
-        # 获取所有监测站及其最新记录
-        stations = AQIStation.objects.annotate(
-            latest_record_id=Subquery(latest_records)
-        ).prefetch_related('records')
+        # 一次查询取出所有站点及其最新记录
+        latest_records = AQIStationLatest.objects.select_related('station').order_by('aqi', 'station_id')
 
         response_data = []
-
-        for station in stations:
-            # 获取该站点的最新记录
-            latest_record = station.records.filter(id=station.latest_record_id).first()
-
-            if not latest_record:
-                continue
+        for latest_record in latest_records:
+            station = latest_record.station
             # 构建响应数据
             station_data = {
                 'station_id': station.id,
@@ -59,7 +63,9 @@ class GetStationListView(APIView):
                 }
             }
             response_data.append(station_data)
-        response_data.sort(key=lambda item: item['aqi_data']['aqi'], reverse=False)
+
+        _STATION_LIST_CACHE['stamp'] = stamp
+        _STATION_LIST_CACHE['data'] = response_data
         return Response({"code": 201, "data": response_data})
 
 
@@ -109,13 +115,15 @@ class StationHourlyDataAPIView(APIView):
 
 
 class AQIRecordByTimeView(generics.ListAPIView):
-
+    """
+    返回指定时刻每个监测站的最近一条记录(时间不晚于该时刻)，不分页，始终包含全部站点。
+    可选参数 max_staleness_hours: 距指定时刻超过该小时数的记录视为过期，对应站点不返回。
+    """
     serializer_class = AQIRecordSerializer
     permission_classes = [AllowAny]
+    pagination_class = None
 
     def get_queryset(self):
-        queryset = AQIRecord.objects.all()
-
         time_str = self.request.query_params.get('date', None)
 
         if not time_str:
@@ -125,9 +133,190 @@ class AQIRecordByTimeView(generics.ListAPIView):
             target_datetime = datetime.strptime(time_str, '%Y-%m-%d %H:%M:%S')
         except ValueError:
             return AQIRecord.objects.none()
-        # 去重的逻辑
-        queryset = queryset.filter(timestamp__lte=target_datetime)
-        queryset = queryset.order_by('station_id', '-timestamp')
-        queryset = queryset.distinct('station_id')
 
-        return queryset
+        max_staleness = None
+        staleness_str = self.request.query_params.get('max_staleness_hours', None)
+        if staleness_str:
+            try:
+                max_staleness = snapshot.parse_staleness_hours(staleness_str)
+            except ValueError:
+                return AQIRecord.objects.none()
+
+        return snapshot.snapshot_records(target_datetime, max_staleness)
+
+
+class AQIRollupView(APIView):
+    """
+    从日/月汇总表读取各站点或全市的污染物统计(记录数、总和、最小、最大、平均)，不扫描原始小时记录。
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, *args, **kwargs):
+        serializer = AQIRollupQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response({'code': 400, 'error': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        params = serializer.validated_data
+
+        if params['granularity'] == 'day':
+            model, bucket = AQIDailyRollup, 'day'
+        else:
+            model, bucket = AQIMonthlyRollup, 'month'
+
+        queryset = model.objects.filter(pollutant=params['pollutant'])
+        if params.get('start'):
+            start = params['start'] if bucket == 'day' else params['start'].replace(day=1)
+            queryset = queryset.filter(**{f'{bucket}__gte': start})
+        if params.get('end'):
+            queryset = queryset.filter(**{f'{bucket}__lte': params['end']})
+        if params.get('station_id'):
+            queryset = queryset.filter(station_id=params['station_id'])
+
+        if params['scope'] == 'city':
+            rows = queryset.values(bucket).annotate(
+                stations=Count('station_id'),
+                sample_count=Sum('sample_count'),
+                value_sum=Sum('value_sum'),
+                value_min=Min('value_min'),
+                value_max=Max('value_max'),
+            ).order_by(bucket)
+            data = [
+                {
+                    bucket: row[bucket],
+                    'stations': row['stations'],
+                    'count': row['sample_count'],
+                    'sum': row['value_sum'],
+                    'min': row['value_min'],
+                    'max': row['value_max'],
+                    'mean': row['value_sum'] / row['sample_count'] if row['sample_count'] else None,
+                }
+                for row in rows
+            ]
+        else:
+            rows = queryset.order_by('station_id', bucket).values_list(
+                'station_id', bucket, 'sample_count', 'value_sum', 'value_min', 'value_max', 'value_mean')
+            data = [
+                {'station_id': station_id, bucket: bucket_value, 'count': count, 'sum': total,
+                 'min': low, 'max': high, 'mean': mean}
+                for station_id, bucket_value, count, total, low, high, mean in rows
+            ]
+
+        return Response({'code': 201, 'pollutant': params['pollutant'], 'granularity': params['granularity'],
+                         'scope': params['scope'], 'data': data}, status=status.HTTP_200_OK)
+
+
+class AQIExportView(APIView):
+    """
+    按站点、时间范围和污染物导出空气质量历史记录，以 CSV 或 Parquet 流式返回。
+    数据通过服务器端游标分块读取，Parquet 每块为一个行组，导出范围再大内存占用也保持不变。
+    时间范围为 [start, end)，不指定时导出全部记录。
+    """
+    permission_classes = [AllowAny]
+
+    CONTENT_TYPES = {
+        'csv': 'text/csv; charset=utf-8',
+        'parquet': 'application/vnd.apache.parquet',
+    }
+
+    def get(self, request, *args, **kwargs):
+        serializer = AQIExportQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response({'code': 400, 'error': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        params = serializer.validated_data
+        file_format = params['file_format']
+
+        if file_format == 'parquet' and export.pa is None:
+            return Response({'code': 501, 'error': "服务器未安装 pyarrow，无法导出 Parquet 格式。"},
+                            status=status.HTTP_501_NOT_IMPLEMENTED)
+
+        columns = export.export_columns(params['pollutants'])
+        queryset = export.export_queryset(params.get('station_id'), params.get('start'), params.get('end'))
+        if file_format == 'csv':
+            content = export.stream_csv(queryset, columns, params['chunk_size'])
+        else:
+            content = export.stream_parquet(queryset, columns, params['chunk_size'])
+
+        name_parts = ['aqi_export']
+        for key in ('start', 'end'):
+            if params.get(key):
+                name_parts.append(timezone.localtime(params[key]).strftime('%Y%m%d%H%M'))
+        response = StreamingHttpResponse(content, content_type=self.CONTENT_TYPES[file_format])
+        response['Content-Disposition'] = f'attachment; filename="{"_".join(name_parts)}.{file_format}"'
+        return response
+
+
+class NearestStationView(APIView):
+    """
+    距离指定经纬度最近的 k 个监测站及其最新读数，按球面距离升序。
+    PostGIS 下用 location 的 GiST 索引做 KNN 排序，否则使用内存 KD 树。
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, *args, **kwargs):
+        serializer = NearestStationQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response({'code': 400, 'error': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        params = serializer.validated_data
+        data = spatial.nearest_stations(params['lon'], params['lat'], params['k'])
+        return Response({'code': 201, 'data': data}, status=status.HTTP_200_OK)
+
+
+class StationsWithinView(APIView):
+    """
+    矩形范围(bbox)或圆形范围(lon、lat、radius 米)内的监测站及其最新读数。
+    圆形范围的结果按距离升序并附带 distance_m，矩形范围按站点 ID 排序。
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, *args, **kwargs):
+        serializer = StationsWithinQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response({'code': 400, 'error': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        params = serializer.validated_data
+        if params.get('bbox') is not None:
+            data = spatial.stations_within_bbox(*params['bbox'])
+        else:
+            data = spatial.stations_within_radius(params['lon'], params['lat'], params['radius'])
+        return Response({'code': 201, 'data': data}, status=status.HTTP_200_OK)
+
+
+class AQIInterpolationView(APIView):
+    """
+    指定时刻某污染物的插值面(投影坐标系下的规则栅格，已按本地边界裁剪)，method 为 idw 或 kriging。
+    克里金同时返回克里金方差和拟合的变异函数。output=json 返回栅格描述和二维数值数组，output=asc 返回 ESRI ASCII Grid 栅格文件。
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, *args, **kwargs):
+        serializer = AQIInterpolationQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response({'code': 400, 'error': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        params = serializer.validated_data
+
+        target = params.get('date') or timezone.now()
+        max_staleness = None
+        if params.get('max_staleness_hours'):
+            max_staleness = timedelta(hours=params['max_staleness_hours'])
+
+        try:
+            surface = interpolation.interpolate_surface(
+                target, params['pollutant'], method=params['method'], cell_size=params['cell_size'],
+                max_staleness=max_staleness, neighbors=params['neighbors'], power=params['power'],
+                variogram=params['variogram'], n_lags=params['n_lags'],
+            )
+        except ValueError as e:
+            return Response({'code': 400, 'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            print(f"插值计算失败: {e}")
+            return Response({'code': 500, 'error': f"插值计算失败: {e}"},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        if params['output'] == 'asc':
+            stamp = timezone.localtime(surface['timestamp']).strftime('%Y%m%d%H')
+            response = HttpResponse(interpolation.surface_to_ascii_grid(surface, band=params['band']),
+                                    content_type='text/plain; charset=utf-8')
+            suffix = '_variance' if params['band'] == 'variance' else ''
+            response['Content-Disposition'] = (
+                f'attachment; filename="{params["pollutant"]}_{params["method"]}_{stamp}{suffix}.asc"'
+            )
+            return response
+        return Response({'code': 201, 'data': interpolation.surface_to_json(surface)}, status=status.HTTP_200_OK)
@@ -0,0 +1,36 @@
+# backend/lru_cache.py
+"""
+线程安全的进程内 LRU 缓存，供矢量瓦片、插值面、克里金和站点→网格权重等模块级缓存共用。
+读取和写入都在同一把锁内完成，并发淘汰不会与读取冲突。不依赖 Django，可在 ArcGIS Pro 环境中导入。
+"""
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    def __init__(self, size):
+        self.size = size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """返回缓存值并标记为最近使用，不存在时返回 None"""
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
@@ -100,6 +100,19 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static_collected')
 # GDAL_LIBRARY_PATH = r'E:\anaconda3\envs\backend\Library\bin\gdal.dll'  # 替换为实际路径
 # GEOS_LIBRARY_PATH = r'E:\anaconda3\envs\backend\Library\bin\geos_c.dll'
 
+# 分析模块使用的本地地理数据，区县边界用 manage.py import_district_boundaries 生成
+DISTRICT_BOUNDARY_PATH = os.path.join(BASE_DIR, 'analysis_api', 'geodata', 'beijing_districts.geojson')
+DISTRICT_NAME_FIELD = 'name'
+# 网格数据缺少坐标系信息时使用的坐标系(generate_analysis_grid.py 输出为 WGS84 / UTM 50N)
+GRID_CRS = 'EPSG:32650'
+# 网格 GeoJSON 坐标保留的小数位数；None 时按网格坐标系单位选择(投影坐标 1 位即 0.1 米，经纬度 6 位约 0.1 米)
+GRID_GEOJSON_PRECISION = None
+# 空气质量插值面使用的投影坐标系和裁剪边界(默认为区县边界的并集)
+AQI_INTERPOLATION_CRS = 'EPSG:4545'
+AQI_INTERPOLATION_BOUNDARY_PATH = DISTRICT_BOUNDARY_PATH
+# 站点→网格插值权重矩阵的缓存文件，网格或站点变化时自动重算
+AQI_GRID_WEIGHTS_PATH = os.path.join(BASE_DIR, 'analysis_api', 'geodata', 'aqi_grid_weights.npz')
+
 USE_TZ = True
 TIME_ZONE = 'Asia/Shanghai'
 
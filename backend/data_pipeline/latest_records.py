@@ -0,0 +1,50 @@
+"""
+维护每个监测站的最新记录表 (AQIStationLatest)
+"""
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from data_pipeline.models import AQIStationLatest
+
+# 从 AQIRecord 复制到最新记录表的字段
+LATEST_VALUE_FIELDS = ['timestamp', 'aqi', 'quality', 'description', 'measure', 'timestr',
+                       'co', 'no2', 'o3', 'pm10', 'pm25', 'so2']
+
+
+def _upsert_sql():
+    table = AQIStationLatest._meta.db_table
+    columns = ['station_id', 'record_id'] + LATEST_VALUE_FIELDS + ['updated_at']
+    updates = ', '.join(f'{c} = EXCLUDED.{c}' for c in columns[1:])
+    # 只有时间更新(或相同)的记录才覆盖，乱序到达的旧数据不会回退最新值
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))}) "
+        f"ON CONFLICT (station_id) DO UPDATE SET {updates} "
+        f"WHERE {table}.timestamp <= EXCLUDED.timestamp"
+    )
+
+
+def update_station_latest(records):
+    """
+    用刚批量插入的 AQIRecord(需已有主键)更新各站点的最新记录。
+    应在与 bulk_create 相同的事务中调用。
+    """
+    latest = {}
+    for record in records:
+        current = latest.get(record.station_id)
+        if current is None or record.timestamp > current.timestamp:
+            latest[record.station_id] = record
+    if not latest:
+        return 0
+
+    now = timezone.now()
+    rows = []
+    for record in latest.values():
+        values = [getattr(record, f) for f in LATEST_VALUE_FIELDS]
+        # 原始 SQL 不经过 ORM 的时区转换，无时区的时间按当前时区处理(与 ORM 保存时一致)
+        if settings.USE_TZ and timezone.is_naive(values[0]):
+            values[0] = timezone.make_aware(values[0])
+        rows.append([record.station_id, record.pk] + values + [now])
+    with connection.cursor() as cursor:
+        cursor.executemany(_upsert_sql(), rows)
+    return len(rows)
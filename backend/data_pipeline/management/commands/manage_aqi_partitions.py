@@ -0,0 +1,36 @@
+# data_pipeline/management/commands/manage_aqi_partitions.py
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from data_pipeline import partitions
+
+
+class Command(BaseCommand):
+    help = "维护空气质量记录的月度分区：预先创建未来月份的分区，并分离/删除超过保留期限的整月分区。"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=3, help="预先创建的未来月份数，默认 3")
+        parser.add_argument('--retention-days', type=int, default=5 * 365, help="数据保留天数，默认 5 年")
+        parser.add_argument('--detach-only', action='store_true',
+                            help="只分离过期分区而不删除，便于先归档再手动删除")
+
+    def handle(self, *args, **options):
+        if options['months_ahead'] < 0 or options['retention_days'] <= 0:
+            raise CommandError("--months-ahead 不能为负数，--retention-days 必须为正数。")
+        if not partitions.is_partitioned():
+            raise CommandError("空气质量记录表不是分区表，请先执行 data_pipeline 的迁移(仅支持 PostgreSQL)。")
+
+        now = timezone.now()
+        current_month = partitions.month_start(now)
+        created = partitions.ensure_partitions(current_month,
+                                               partitions.add_months(current_month, options['months_ahead']))
+        self.stdout.write(f"已检查 {created} 个月度分区(至 {options['months_ahead']} 个月后)。")
+
+        cutoff = now - timedelta(days=options['retention_days'])
+        removed = partitions.drop_partitions_before(cutoff, detach_only=options['detach_only'])
+        action = "分离" if options['detach_only'] else "删除"
+        if removed:
+            self.stdout.write(self.style.SUCCESS(f"已{action} {len(removed)} 个过期分区: {', '.join(removed)}"))
+        else:
+            self.stdout.write(f"没有早于 {partitions.month_start(cutoff)} 的整月分区需要{action}。")
@@ -0,0 +1,33 @@
+# data_pipeline/management/commands/rebuild_aqi_rollups.py
+import time
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from data_pipeline.rollups import rebuild_rollups
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f"日期格式不正确，应为 YYYY-MM-DD: {value}")
+
+
+class Command(BaseCommand):
+    help = "从原始空气质量记录重建日/月汇总表。指定区间时按整月重建，不指定时重建全部。"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', default=None, help="起始日期 YYYY-MM-DD，按所在月份 1 日开始")
+        parser.add_argument('--end', default=None, help="结束日期 YYYY-MM-DD，按所在月份月末结束")
+
+    def handle(self, *args, **options):
+        start = _parse_date(options['start']) if options['start'] else None
+        end = _parse_date(options['end']) if options['end'] else None
+        if start and end and start > end:
+            raise CommandError("--start 不能晚于 --end。")
+
+        started = time.time()
+        with transaction.atomic():
+            rebuild_rollups(start, end)
+        self.stdout.write(self.style.SUCCESS(f"空气质量汇总重建完成，耗时 {time.time() - started:.1f} 秒。"))
@@ -0,0 +1,111 @@
+# Generated by Django 4.2 on 2026-10-19 17:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+LATEST_VALUE_FIELDS = ['timestamp', 'aqi', 'quality', 'description', 'measure', 'timestr',
+                       'co', 'no2', 'o3', 'pm10', 'pm25', 'so2']
+
+
+def backfill_station_latest(apps, schema_editor):
+    """用现有记录初始化每个站点的最新记录"""
+    AQIRecord = apps.get_model('data_pipeline', 'AQIRecord')
+    AQIStationLatest = apps.get_model('data_pipeline', 'AQIStationLatest')
+    latest_records = AQIRecord.objects.order_by('station_id', '-timestamp').distinct('station_id')
+    AQIStationLatest.objects.bulk_create([
+        AQIStationLatest(
+            station_id=record.station_id,
+            record_id=record.pk,
+            **{field: getattr(record, field) for field in LATEST_VALUE_FIELDS}
+        )
+        for record in latest_records
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("data_pipeline", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AQIStationLatest",
+            fields=[
+                (
+                    "station",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="latest",
+                        serialize=False,
+                        to="data_pipeline.aqistation",
+                        verbose_name="监测站",
+                    ),
+                ),
+                ("record_id", models.BigIntegerField(verbose_name="记录ID")),
+                ("timestamp", models.DateTimeField(verbose_name="记录时间")),
+                (
+                    "aqi",
+                    models.FloatField(blank=True, null=True, verbose_name="AQI指数"),
+                ),
+                (
+                    "quality",
+                    models.CharField(
+                        blank=True,
+                        max_length=50,
+                        null=True,
+                        verbose_name="空气质量等级",
+                    ),
+                ),
+                (
+                    "description",
+                    models.CharField(max_length=50, null=True, verbose_name="健康指引"),
+                ),
+                (
+                    "measure",
+                    models.CharField(max_length=50, null=True, verbose_name="描述"),
+                ),
+                (
+                    "timestr",
+                    models.CharField(max_length=20, null=True, verbose_name="时间描述"),
+                ),
+                (
+                    "co",
+                    models.CharField(blank=True, null=True, verbose_name="CO(mg/m³)"),
+                ),
+                (
+                    "no2",
+                    models.CharField(blank=True, null=True, verbose_name="NO2(μg/m³)"),
+                ),
+                (
+                    "o3",
+                    models.CharField(blank=True, null=True, verbose_name="O3(μg/m³)"),
+                ),
+                (
+                    "pm10",
+                    models.CharField(blank=True, null=True, verbose_name="PM10(μg/m³)"),
+                ),
+                (
+                    "pm25",
+                    models.CharField(
+                        blank=True, null=True, verbose_name="PM2.5(μg/m³)"
+                    ),
+                ),
+                (
+                    "so2",
+                    models.CharField(blank=True, null=True, verbose_name="SO2(μg/m³)"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="更新时间"),
+                ),
+            ],
+            options={
+                "verbose_name": "监测站最新记录",
+                "verbose_name_plural": "监测站最新记录",
+            },
+        ),
+        migrations.RunPython(backfill_station_latest, migrations.RunPython.noop),
+    ]
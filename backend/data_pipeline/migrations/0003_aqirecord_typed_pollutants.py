@@ -0,0 +1,113 @@
+# Generated by Django 4.2 on 2026-10-19 17:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("data_pipeline", "0002_aqistationlatest"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="aqirecord",
+            name="co_value",
+            field=models.FloatField(blank=True, null=True, verbose_name="CO小时浓度"),
+        ),
+        migrations.AddField(
+            model_name="aqirecord",
+            name="co_24h",
+            field=models.FloatField(blank=True, null=True, verbose_name="CO 24小时均值"),
+        ),
+        migrations.AddField(
+            model_name="aqirecord",
+            name="co_level",
+            field=models.SmallIntegerField(blank=True, null=True, verbose_name="CO等级"),
+        ),
+        migrations.AddField(
+            model_name="aqirecord",
+            name="no2_value",
+            field=models.FloatField(blank=True, null=True, verbose_name="NO2小时浓度"),
+        ),
+        migrations.AddField(
+            model_name="aqirecord",
+            name="no2_24h",
+            field=models.FloatField(blank=True, null=True, verbose_name="NO2 24小时均值"),
+        ),
+        migrations.AddField(
+            model_name="aqirecord",
+            name="no2_level",
+            field=models.SmallIntegerField(blank=True, null=True, verbose_name="NO2等级"),
+        ),
+        migrations.AddField(
+            model_name="aqirecord",
+            name="o3_value",
+            field=models.FloatField(blank=True, null=True, verbose_name="O3小时浓度"),
+        ),
+        migrations.AddField(
+            model_name="aqirecord",
+            name="o3_24h",
+            field=models.FloatField(blank=True, null=True, verbose_name="O3 24小时均值"),
+        ),
+        migrations.AddField(
+            model_name="aqirecord",
+            name="o3_level",
+            field=models.SmallIntegerField(blank=True, null=True, verbose_name="O3等级"),
+        ),
+        migrations.AddField(
+            model_name="aqirecord",
+            name="o3_8h",
+            field=models.FloatField(blank=True, null=True, verbose_name="O3 8小时均值"),
+        ),
+        migrations.AddField(
+            model_name="aqirecord",
+            name="o3_8h_level",
+            field=models.SmallIntegerField(blank=True, null=True, verbose_name="O3 8小时等级"),
+        ),
+        migrations.AddField(
+            model_name="aqirecord",
+            name="pm10_value",
+            field=models.FloatField(blank=True, null=True, verbose_name="PM10小时浓度"),
+        ),
+        migrations.AddField(
+            model_name="aqirecord",
+            name="pm10_24h",
+            field=models.FloatField(blank=True, null=True, verbose_name="PM10 24小时均值"),
+        ),
+        migrations.AddField(
+            model_name="aqirecord",
+            name="pm10_level",
+            field=models.SmallIntegerField(blank=True, null=True, verbose_name="PM10等级"),
+        ),
+        migrations.AddField(
+            model_name="aqirecord",
+            name="pm25_value",
+            field=models.FloatField(blank=True, null=True, verbose_name="PM2.5小时浓度"),
+        ),
+        migrations.AddField(
+            model_name="aqirecord",
+            name="pm25_24h",
+            field=models.FloatField(blank=True, null=True, verbose_name="PM2.5 24小时均值"),
+        ),
+        migrations.AddField(
+            model_name="aqirecord",
+            name="pm25_level",
+            field=models.SmallIntegerField(blank=True, null=True, verbose_name="PM2.5等级"),
+        ),
+        migrations.AddField(
+            model_name="aqirecord",
+            name="so2_value",
+            field=models.FloatField(blank=True, null=True, verbose_name="SO2小时浓度"),
+        ),
+        migrations.AddField(
+            model_name="aqirecord",
+            name="so2_24h",
+            field=models.FloatField(blank=True, null=True, verbose_name="SO2 24小时均值"),
+        ),
+        migrations.AddField(
+            model_name="aqirecord",
+            name="so2_level",
+            field=models.SmallIntegerField(blank=True, null=True, verbose_name="SO2等级"),
+        ),
+    ]
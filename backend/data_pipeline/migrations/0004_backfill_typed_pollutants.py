@@ -0,0 +1,87 @@
+# Generated by Django 4.2 on 2026-10-19 17:46
+
+from django.db import migrations, transaction
+
+BACKFILL_CHUNK_SIZE = 5000
+
+# 以下为本迁移执行时的污染物字段和解析规则的副本，不随 data_pipeline.pollutants 的后续修改而变化
+POLLUTANTS = ['co', 'no2', 'o3', 'pm10', 'pm25', 'so2']
+MISSING_VALUES = {'', '—', '-', '--', 'None', 'none', 'null', 'NULL', 'nan'}
+TYPED_POLLUTANT_FIELDS = [
+    f'{pollutant}_{suffix}' for pollutant in POLLUTANTS for suffix in ('value', '24h', 'level')
+] + ['o3_8h', 'o3_8h_level']
+
+
+def _to_float(value):
+    value = value.strip()
+    if value in MISSING_VALUES:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _to_level(value):
+    number = _to_float(value)
+    return int(number) if number is not None else None
+
+
+def _parse_pollutant(pollutant, raw):
+    """"等级,小时值,24小时均值"、O3 的 "等级,8小时等级,小时值,8小时均值,24小时均值" 或单独的小时值"""
+    result = {f'{pollutant}_value': None, f'{pollutant}_24h': None, f'{pollutant}_level': None}
+    if pollutant == 'o3':
+        result.update({'o3_8h': None, 'o3_8h_level': None})
+    if raw is None:
+        return result
+
+    parts = str(raw).split(',')
+    if pollutant == 'o3' and len(parts) == 5:
+        level, level_8h, value, value_8h, value_24h = parts
+        result.update({'o3_8h': _to_float(value_8h), 'o3_8h_level': _to_level(level_8h)})
+    elif len(parts) == 3:
+        level, value, value_24h = parts
+    elif len(parts) == 1:
+        level, value, value_24h = '', parts[0], ''
+    else:
+        return result
+
+    result[f'{pollutant}_value'] = _to_float(value)
+    result[f'{pollutant}_24h'] = _to_float(value_24h)
+    result[f'{pollutant}_level'] = _to_level(level)
+    return result
+
+
+def backfill_typed_pollutants(apps, schema_editor):
+    """按主键分块解析已有的污染物字符串，每块单独提交，避免长事务锁表"""
+    AQIRecord = apps.get_model('data_pipeline', 'AQIRecord')
+    last_id = 0
+    total = 0
+    while True:
+        chunk = list(
+            AQIRecord.objects.filter(id__gt=last_id).order_by('id').only('id', *POLLUTANTS)[:BACKFILL_CHUNK_SIZE]
+        )
+        if not chunk:
+            break
+        for record in chunk:
+            for pollutant in POLLUTANTS:
+                for field, value in _parse_pollutant(pollutant, getattr(record, pollutant)).items():
+                    setattr(record, field, value)
+        with transaction.atomic():
+            AQIRecord.objects.bulk_update(chunk, TYPED_POLLUTANT_FIELDS)
+        last_id = chunk[-1].id
+        total += len(chunk)
+        print(f"已解析 {total} 条记录的污染物字段")
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("data_pipeline", "0003_aqirecord_typed_pollutants"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_typed_pollutants, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,133 @@
+# Generated by Django 4.2 on 2026-10-19 18:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# 本迁移执行时汇总的污染物 -> AQIRecord 中的数值列，不随 data_pipeline.rollups 的后续修改而变化
+ROLLUP_POLLUTANTS = {
+    'aqi': 'aqi',
+    'co': 'co_value',
+    'no2': 'no2_value',
+    'o3': 'o3_value',
+    'pm10': 'pm10_value',
+    'pm25': 'pm25_value',
+    'so2': 'so2_value',
+}
+
+
+def build_rollups(apps, schema_editor):
+    """用已有记录初始化日/月汇总：日汇总按项目时区由原始记录聚合，月汇总由日汇总聚合"""
+    record_table = apps.get_model('data_pipeline', 'AQIRecord')._meta.db_table
+    daily_table = apps.get_model('data_pipeline', 'AQIDailyRollup')._meta.db_table
+    monthly_table = apps.get_model('data_pipeline', 'AQIMonthlyRollup')._meta.db_table
+
+    with schema_editor.connection.cursor() as cursor:
+        for pollutant, column in ROLLUP_POLLUTANTS.items():
+            cursor.execute(
+                f"INSERT INTO {daily_table} (station_id, day, pollutant, sample_count, value_sum, value_min, "
+                f"value_max, value_mean) "
+                f"SELECT station_id, (timestamp AT TIME ZONE %s)::date, %s, COUNT({column}), SUM({column}), "
+                f"MIN({column}), MAX({column}), AVG({column}) "
+                f"FROM {record_table} WHERE {column} IS NOT NULL GROUP BY 1, 2",
+                [settings.TIME_ZONE, pollutant]
+            )
+
+        cursor.execute(
+            f"INSERT INTO {monthly_table} (station_id, month, pollutant, sample_count, value_sum, value_min, "
+            f"value_max, value_mean) "
+            f"SELECT station_id, date_trunc('month', day)::date, pollutant, SUM(sample_count), SUM(value_sum), "
+            f"MIN(value_min), MAX(value_max), SUM(value_sum) / SUM(sample_count) "
+            f"FROM {daily_table} GROUP BY 1, 2, 3"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("data_pipeline", "0004_backfill_typed_pollutants"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AQIDailyRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField(verbose_name="日期")),
+                ("pollutant", models.CharField(max_length=10, verbose_name="污染物")),
+                ("sample_count", models.IntegerField(verbose_name="记录数")),
+                ("value_sum", models.FloatField(verbose_name="总和")),
+                ("value_min", models.FloatField(verbose_name="最小值")),
+                ("value_max", models.FloatField(verbose_name="最大值")),
+                ("value_mean", models.FloatField(verbose_name="平均值")),
+                (
+                    "station",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_rollups",
+                        to="data_pipeline.aqistation",
+                        verbose_name="监测站",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "空气质量日汇总",
+                "verbose_name_plural": "空气质量日汇总",
+                "indexes": [
+                    models.Index(
+                        fields=["pollutant", "day"], name="data_pipeli_polluta_cee217_idx"
+                    )
+                ],
+                "unique_together": {("station", "day", "pollutant")},
+            },
+        ),
+        migrations.CreateModel(
+            name="AQIMonthlyRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("month", models.DateField(verbose_name="月份")),
+                ("pollutant", models.CharField(max_length=10, verbose_name="污染物")),
+                ("sample_count", models.IntegerField(verbose_name="记录数")),
+                ("value_sum", models.FloatField(verbose_name="总和")),
+                ("value_min", models.FloatField(verbose_name="最小值")),
+                ("value_max", models.FloatField(verbose_name="最大值")),
+                ("value_mean", models.FloatField(verbose_name="平均值")),
+                (
+                    "station",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="monthly_rollups",
+                        to="data_pipeline.aqistation",
+                        verbose_name="监测站",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "空气质量月汇总",
+                "verbose_name_plural": "空气质量月汇总",
+                "indexes": [
+                    models.Index(
+                        fields=["pollutant", "month"], name="data_pipeli_polluta_26366a_idx"
+                    )
+                ],
+                "unique_together": {("station", "month", "pollutant")},
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,105 @@
+# Generated by Django 4.2 on 2026-10-19 18:20
+
+from django.db import migrations
+
+PARTITION_MONTHS_AHEAD = 3
+
+
+def partition_aqirecord(apps, schema_editor):
+    """
+    把 AQIRecord 改为按 timestamp 月度范围分区的表(仅 PostgreSQL)。
+    旧表改名后把数据复制进新的分区表再删除；分区表的主键必须包含分区键，因此主键为 (id, timestamp)。
+    没有其他表以外键引用 AQIRecord(最新记录表只保存 record_id)，可以直接替换。
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    from django.utils import timezone
+    from data_pipeline import partitions
+
+    AQIRecord = apps.get_model('data_pipeline', 'AQIRecord')
+    AQIStation = apps.get_model('data_pipeline', 'AQIStation')
+    table = AQIRecord._meta.db_table
+    legacy = f"{table}_legacy"
+    sequence = f"{table}_id_seq"
+    station_table = AQIStation._meta.db_table
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+        cursor.execute(f"ALTER INDEX {table}_pkey RENAME TO {legacy}_pkey")
+        cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [legacy])
+        legacy_sequence = cursor.fetchone()[0]
+        if legacy_sequence:
+            cursor.execute(f"ALTER SEQUENCE {legacy_sequence} RENAME TO {legacy}_id_seq")
+
+        cursor.execute(f"CREATE SEQUENCE {sequence}")
+        cursor.execute(f'CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY RANGE ("timestamp")')
+        cursor.execute(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT nextval('{sequence}')")
+        cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id")
+
+        # 已有数据所在月份到未来几个月的月度分区，外加一个默认分区
+        cursor.execute(f'SELECT MIN("timestamp") FROM {legacy}')
+        oldest = cursor.fetchone()[0]
+        current_month = partitions.month_start(timezone.now())
+        month = partitions.month_start(oldest) if oldest else current_month
+        while month <= partitions.add_months(current_month, PARTITION_MONTHS_AHEAD):
+            partitions.create_month_partition(cursor, month)
+            month = partitions.add_months(month, 1)
+        cursor.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+        cursor.execute(f"INSERT INTO {table} SELECT * FROM {legacy}")
+        cursor.execute(f"SELECT setval('{sequence}', COALESCE(MAX(id), 1), MAX(id) IS NOT NULL) FROM {table}")
+        cursor.execute(f"DROP TABLE {legacy}")
+
+        # 重建主键、索引和外键，名称与 Django 生成的一致
+        cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, "timestamp")')
+        _create_indexes(cursor, schema_editor, table, station_table)
+
+
+def unpartition_aqirecord(apps, schema_editor):
+    """
+    撤销分区：把全部分区的数据复制回普通表，恢复单列主键 id。
+    已分离但未删除的分区(manage_aqi_partitions --detach-only)不在分区表中，不会被复制。
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    AQIRecord = apps.get_model('data_pipeline', 'AQIRecord')
+    AQIStation = apps.get_model('data_pipeline', 'AQIStation')
+    table = AQIRecord._meta.db_table
+    plain = f"{table}_plain"
+    sequence = f"{table}_id_seq"
+    station_table = AQIStation._meta.db_table
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"CREATE TABLE {plain} (LIKE {table} INCLUDING DEFAULTS)")
+        cursor.execute(f"INSERT INTO {plain} SELECT * FROM {table}")
+        # 序列归属于分区表的 id 列，删除分区表前先解除，否则序列会被一并删除
+        cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY NONE")
+        cursor.execute(f"DROP TABLE {table}")
+        cursor.execute(f"ALTER TABLE {plain} RENAME TO {table}")
+        cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id")
+
+        cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id)")
+        _create_indexes(cursor, schema_editor, table, station_table)
+
+
+def _create_indexes(cursor, schema_editor, table, station_table):
+    cursor.execute(f'CREATE INDEX data_pipeli_station_a64954_idx ON {table} (station_id, "timestamp")')
+    cursor.execute(f'CREATE INDEX data_pipeli_timesta_511d3d_idx ON {table} ("timestamp")')
+    cursor.execute(f"CREATE INDEX {schema_editor._create_index_name(table, ['station_id'])} "
+                   f"ON {table} (station_id)")
+    fk_name = schema_editor._create_index_name(table, ['station_id'], suffix=f"_fk_{station_table}_id")
+    cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {fk_name} FOREIGN KEY (station_id) "
+                   f"REFERENCES {station_table} (id) DEFERRABLE INITIALLY DEFERRED")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("data_pipeline", "0005_aqi_rollups"),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_aqirecord, unpartition_aqirecord),
+    ]
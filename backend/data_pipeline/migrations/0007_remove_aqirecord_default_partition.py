@@ -0,0 +1,56 @@
+# Generated by Django 4.2 on 2026-10-19 18:40
+
+from django.db import migrations
+
+
+def remove_default_partition(apps, schema_editor):
+    """
+    删除 AQIRecord 的默认分区(仅 PostgreSQL)。
+    默认分区中的记录不会随过期分区清理，且其中有某月数据时无法再创建该月的分区；
+    把这些记录移到各自月份的分区后删除默认分区，之后插入前由 ensure_partitions_for 创建所需分区。
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    from datetime import datetime
+    from django.conf import settings
+    from data_pipeline import partitions
+
+    AQIRecord = apps.get_model('data_pipeline', 'AQIRecord')
+    table = AQIRecord._meta.db_table
+    default = f"{table}_default"
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s)", [default])
+        if cursor.fetchone()[0] is None:
+            return
+        cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {default}")
+        cursor.execute(f"SELECT DISTINCT date_trunc('month', \"timestamp\" AT TIME ZONE %s) FROM {default}",
+                       [settings.TIME_ZONE])
+        for (month,) in cursor.fetchall():
+            partitions.create_month_partition(cursor, month.date() if isinstance(month, datetime) else month)
+        cursor.execute(f"INSERT INTO {table} SELECT * FROM {default}")
+        cursor.execute(f"DROP TABLE {default}")
+
+
+def restore_default_partition(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    AQIRecord = apps.get_model('data_pipeline', 'AQIRecord')
+    table = AQIRecord._meta.db_table
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+                       "WHERE c.relname = %s", [table])
+        if cursor.fetchone() is not None:
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("data_pipeline", "0006_partition_aqirecord"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_default_partition, restore_default_partition),
+    ]
@@ -101,6 +101,28 @@ class AQIRecord(models.Model):
     pm25 = models.CharField(null=True, blank=True, verbose_name="PM2.5(μg/m³)")
     so2 = models.CharField(null=True, blank=True, verbose_name="SO2(μg/m³)")
 
+    # 解析后的数值字段，可直接在数据库中聚合
+    co_value = models.FloatField(null=True, blank=True, verbose_name="CO小时浓度")
+    co_24h = models.FloatField(null=True, blank=True, verbose_name="CO 24小时均值")
+    co_level = models.SmallIntegerField(null=True, blank=True, verbose_name="CO等级")
+    no2_value = models.FloatField(null=True, blank=True, verbose_name="NO2小时浓度")
+    no2_24h = models.FloatField(null=True, blank=True, verbose_name="NO2 24小时均值")
+    no2_level = models.SmallIntegerField(null=True, blank=True, verbose_name="NO2等级")
+    o3_value = models.FloatField(null=True, blank=True, verbose_name="O3小时浓度")
+    o3_24h = models.FloatField(null=True, blank=True, verbose_name="O3 24小时均值")
+    o3_level = models.SmallIntegerField(null=True, blank=True, verbose_name="O3等级")
+    o3_8h = models.FloatField(null=True, blank=True, verbose_name="O3 8小时均值")
+    o3_8h_level = models.SmallIntegerField(null=True, blank=True, verbose_name="O3 8小时等级")
+    pm10_value = models.FloatField(null=True, blank=True, verbose_name="PM10小时浓度")
+    pm10_24h = models.FloatField(null=True, blank=True, verbose_name="PM10 24小时均值")
+    pm10_level = models.SmallIntegerField(null=True, blank=True, verbose_name="PM10等级")
+    pm25_value = models.FloatField(null=True, blank=True, verbose_name="PM2.5小时浓度")
+    pm25_24h = models.FloatField(null=True, blank=True, verbose_name="PM2.5 24小时均值")
+    pm25_level = models.SmallIntegerField(null=True, blank=True, verbose_name="PM2.5等级")
+    so2_value = models.FloatField(null=True, blank=True, verbose_name="SO2小时浓度")
+    so2_24h = models.FloatField(null=True, blank=True, verbose_name="SO2 24小时均值")
+    so2_level = models.SmallIntegerField(null=True, blank=True, verbose_name="SO2等级")
+
     # 原始数据备份
     raw_data = models.JSONField(default=dict, verbose_name="原始数据")
 
@@ -118,3 +140,97 @@ class AQIRecord(models.Model):
 
     def __str__(self):
         return f"{self.station.name} - {self.timestamp}"
+
+
+class AQIStationLatest(models.Model):
+    """每个监测站的最新一条空气质量记录，入库时与批量插入在同一事务中更新"""
+    station = models.OneToOneField(
+        AQIStation,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='latest',
+        verbose_name="监测站"
+    )
+    # 不使用外键，避免清理或迁移历史记录时受到约束
+    record_id = models.BigIntegerField(verbose_name="记录ID")
+    timestamp = models.DateTimeField(verbose_name="记录时间")
+    aqi = models.FloatField(null=True, blank=True, verbose_name="AQI指数")
+    quality = models.CharField(max_length=50, null=True, blank=True, verbose_name="空气质量等级")
+    description = models.CharField(max_length=50, null=True, verbose_name="健康指引")
+    measure = models.CharField(max_length=50, null=True, verbose_name="描述")
+    timestr = models.CharField(max_length=20, null=True, verbose_name="时间描述")
+
+    co = models.CharField(null=True, blank=True, verbose_name="CO(mg/m³)")
+    no2 = models.CharField(null=True, blank=True, verbose_name="NO2(μg/m³)")
+    o3 = models.CharField(null=True, blank=True, verbose_name="O3(μg/m³)")
+    pm10 = models.CharField(null=True, blank=True, verbose_name="PM10(μg/m³)")
+    pm25 = models.CharField(null=True, blank=True, verbose_name="PM2.5(μg/m³)")
+    so2 = models.CharField(null=True, blank=True, verbose_name="SO2(μg/m³)")
+
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+
+    class Meta:
+        verbose_name = "监测站最新记录"
+        verbose_name_plural = verbose_name
+        app_label = 'data_pipeline'
+
+    def __str__(self):
+        return f"{self.station_id} - {self.timestamp}"
+
+
+class AQIDailyRollup(models.Model):
+    """监测站 × 日 × 污染物 的汇总统计，入库时增量更新"""
+    station = models.ForeignKey(
+        AQIStation,
+        on_delete=models.CASCADE,
+        related_name='daily_rollups',
+        verbose_name="监测站"
+    )
+    day = models.DateField(verbose_name="日期")
+    pollutant = models.CharField(max_length=10, verbose_name="污染物")
+    sample_count = models.IntegerField(verbose_name="记录数")
+    value_sum = models.FloatField(verbose_name="总和")
+    value_min = models.FloatField(verbose_name="最小值")
+    value_max = models.FloatField(verbose_name="最大值")
+    value_mean = models.FloatField(verbose_name="平均值")
+
+    class Meta:
+        verbose_name = "空气质量日汇总"
+        verbose_name_plural = verbose_name
+        unique_together = [['station', 'day', 'pollutant']]
+        indexes = [
+            models.Index(fields=['pollutant', 'day']),
+        ]
+        app_label = 'data_pipeline'
+
+    def __str__(self):
+        return f"{self.station_id} - {self.day} - {self.pollutant}"
+
+
+class AQIMonthlyRollup(models.Model):
+    """监测站 × 月 × 污染物 的汇总统计，month 为当月 1 日"""
+    station = models.ForeignKey(
+        AQIStation,
+        on_delete=models.CASCADE,
+        related_name='monthly_rollups',
+        verbose_name="监测站"
+    )
+    month = models.DateField(verbose_name="月份")
+    pollutant = models.CharField(max_length=10, verbose_name="污染物")
+    sample_count = models.IntegerField(verbose_name="记录数")
+    value_sum = models.FloatField(verbose_name="总和")
+    value_min = models.FloatField(verbose_name="最小值")
+    value_max = models.FloatField(verbose_name="最大值")
+    value_mean = models.FloatField(verbose_name="平均值")
+
+    class Meta:
+        verbose_name = "空气质量月汇总"
+        verbose_name_plural = verbose_name
+        unique_together = [['station', 'month', 'pollutant']]
+        indexes = [
+            models.Index(fields=['pollutant', 'month']),
+        ]
+        app_label = 'data_pipeline'
+
+    def __str__(self):
+        return f"{self.station_id} - {self.month} - {self.pollutant}"
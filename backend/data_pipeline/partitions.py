@@ -0,0 +1,133 @@
+"""
+AQIRecord 按月范围分区的管理(仅 PostgreSQL)
+分区名为 <表名>_pYYYYMM，月份边界按项目时区计算。没有默认分区：插入前由 ensure_partitions_for
+创建所需月份的分区，没有对应分区的记录插入时直接报错。
+过期数据通过分离并删除整月分区清理，耗时与数据量无关。
+"""
+from datetime import date, datetime, time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from data_pipeline.models import AQIRecord
+
+PARTITION_SUFFIX_FORMAT = '%Y%m'
+
+# 当前进程中已确认存在的分区月份，避免每次插入都查询系统表
+_ENSURED_MONTHS = set()
+
+
+def parent_table():
+    return AQIRecord._meta.db_table
+
+
+def partition_name(month):
+    return f"{parent_table()}_p{month.strftime(PARTITION_SUFFIX_FORMAT)}"
+
+
+def month_start(value):
+    """返回 value 所在月份的 1 日 (date)，value 可以是 date 或 datetime"""
+    if isinstance(value, datetime):
+        if settings.USE_TZ and timezone.is_aware(value):
+            value = timezone.localtime(value)
+        value = value.date()
+    return value.replace(day=1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _bound_literal(month):
+    """月份 1 日零点(项目时区)的 SQL 字面量"""
+    midnight = datetime.combine(month, time.min)
+    if settings.USE_TZ:
+        midnight = timezone.make_aware(midnight)
+    return "'" + midnight.isoformat(sep=' ') + "'"
+
+
+def is_partitioned():
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+            [parent_table()]
+        )
+        return cursor.fetchone() is not None
+
+
+def create_month_partition(cursor, month):
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {parent_table()} "
+        f"FOR VALUES FROM ({_bound_literal(month)}) TO ({_bound_literal(add_months(month, 1))})"
+    )
+
+
+def ensure_partitions(first_month, last_month):
+    """确保 [first_month, last_month] 内每个月的分区都存在，返回新检查的月份数"""
+    month = month_start(first_month)
+    last_month = month_start(last_month)
+    checked = 0
+    with connection.cursor() as cursor:
+        while month <= last_month:
+            if month not in _ENSURED_MONTHS:
+                create_month_partition(cursor, month)
+                # 在事务中创建的分区可能随事务回滚，提交后才记为已存在
+                transaction.on_commit(lambda month=month: _ENSURED_MONTHS.add(month))
+                checked += 1
+            month = add_months(month, 1)
+    return checked
+
+
+def ensure_partitions_for(timestamps):
+    """插入前调用：为这批记录涉及的月份创建分区(表未分区时什么也不做)"""
+    months = {month_start(ts) for ts in timestamps}
+    if not months or months <= _ENSURED_MONTHS or not is_partitioned():
+        return
+    for month in months - _ENSURED_MONTHS:
+        ensure_partitions(month, month)
+
+
+def list_month_partitions():
+    """返回 [(月份, 分区名)]，按月份排序"""
+    prefix = f"{parent_table()}_p"
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s",
+            [parent_table()]
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    partitions = []
+    for name in names:
+        if name.startswith(prefix):
+            try:
+                month = datetime.strptime(name[len(prefix):], PARTITION_SUFFIX_FORMAT).date()
+            except ValueError:
+                continue
+            partitions.append((month, name))
+    return sorted(partitions)
+
+
+def drop_partitions_before(cutoff, detach_only=False):
+    """
+    分离(并默认删除)整月都早于 cutoff 的分区，返回处理的分区名列表。
+    cutoff 所在月份的分区保留，其中早于 cutoff 的记录等整月过期后随分区一起删除。
+    """
+    cutoff_month = month_start(cutoff)
+    removed = []
+    with connection.cursor() as cursor:
+        for month, name in list_month_partitions():
+            if add_months(month, 1) > cutoff_month:
+                continue
+            cursor.execute(f"ALTER TABLE {parent_table()} DETACH PARTITION {name}")
+            if not detach_only:
+                cursor.execute(f"DROP TABLE {name}")
+            _ENSURED_MONTHS.discard(month)
+            removed.append(name)
+    return removed
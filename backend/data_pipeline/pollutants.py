@@ -0,0 +1,67 @@
+"""
+把监测数据中的污染物字符串解析为数值字段
+update_aqi.py 保存的格式为 "等级,小时值,24小时均值"，O3 为 "等级,8小时等级,小时值,8小时均值,24小时均值"；
+fetch_aqi.py 保存的是单独的小时值。
+"""
+
+POLLUTANTS = ['co', 'no2', 'o3', 'pm10', 'pm25', 'so2']
+MISSING_VALUES = {'', '—', '-', '--', 'None', 'none', 'null', 'NULL', 'nan'}
+
+
+def typed_field_names():
+    """所有污染物数值字段名"""
+    names = []
+    for pollutant in POLLUTANTS:
+        names += [f'{pollutant}_value', f'{pollutant}_24h', f'{pollutant}_level']
+    return names + ['o3_8h', 'o3_8h_level']
+
+
+TYPED_POLLUTANT_FIELDS = typed_field_names()
+
+
+def _to_float(value):
+    value = value.strip()
+    if value in MISSING_VALUES:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _to_level(value):
+    number = _to_float(value)
+    return int(number) if number is not None else None
+
+
+def parse_pollutant(pollutant, raw):
+    """解析单个污染物字段，返回 {字段名: 数值或 None}"""
+    result = {f'{pollutant}_value': None, f'{pollutant}_24h': None, f'{pollutant}_level': None}
+    if pollutant == 'o3':
+        result.update({'o3_8h': None, 'o3_8h_level': None})
+    if raw is None:
+        return result
+
+    parts = str(raw).split(',')
+    if pollutant == 'o3' and len(parts) == 5:
+        level, level_8h, value, value_8h, value_24h = parts
+        result.update({'o3_8h': _to_float(value_8h), 'o3_8h_level': _to_level(level_8h)})
+    elif len(parts) == 3:
+        level, value, value_24h = parts
+    elif len(parts) == 1:
+        level, value, value_24h = '', parts[0], ''
+    else:
+        return result
+
+    result[f'{pollutant}_value'] = _to_float(value)
+    result[f'{pollutant}_24h'] = _to_float(value_24h)
+    result[f'{pollutant}_level'] = _to_level(level)
+    return result
+
+
+def parse_pollutant_fields(values):
+    """values 为 {污染物: 原始字符串}，返回全部数值字段"""
+    fields = {}
+    for pollutant in POLLUTANTS:
+        fields.update(parse_pollutant(pollutant, values.get(pollutant)))
+    return fields
@@ -0,0 +1,146 @@
+"""
+维护空气质量日/月汇总表 (AQIDailyRollup / AQIMonthlyRollup)
+入库时只更新受影响的 (站点, 日期/月份, 污染物) 桶；重建时直接在数据库中从原始记录聚合。
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from data_pipeline.models import AQIRecord, AQIDailyRollup, AQIMonthlyRollup
+
+# 汇总的污染物 -> AQIRecord 中的数值列
+ROLLUP_POLLUTANTS = {
+    'aqi': 'aqi',
+    'co': 'co_value',
+    'no2': 'no2_value',
+    'o3': 'o3_value',
+    'pm10': 'pm10_value',
+    'pm25': 'pm25_value',
+    'so2': 'so2_value',
+}
+
+
+def _upsert_sql(model, bucket_field):
+    table = model._meta.db_table
+    return (
+        f"INSERT INTO {table} (station_id, {bucket_field}, pollutant, sample_count, value_sum, value_min, "
+        f"value_max, value_mean) VALUES (%s, %s, %s, %s, %s, %s, %s, %s) "
+        f"ON CONFLICT (station_id, {bucket_field}, pollutant) DO UPDATE SET "
+        f"sample_count = {table}.sample_count + EXCLUDED.sample_count, "
+        f"value_sum = {table}.value_sum + EXCLUDED.value_sum, "
+        f"value_min = LEAST({table}.value_min, EXCLUDED.value_min), "
+        f"value_max = GREATEST({table}.value_max, EXCLUDED.value_max), "
+        f"value_mean = ({table}.value_sum + EXCLUDED.value_sum) / ({table}.sample_count + EXCLUDED.sample_count)"
+    )
+
+
+def _local_date(timestamp):
+    """按项目时区划分日期，与重建时的 AT TIME ZONE 一致"""
+    if settings.USE_TZ and timezone.is_aware(timestamp):
+        timestamp = timezone.localtime(timestamp)
+    return timestamp.date()
+
+
+def _local_midnight(date):
+    midnight = datetime.combine(date, time.min)
+    return timezone.make_aware(midnight) if settings.USE_TZ else midnight
+
+
+def _accumulate(buckets, key, value):
+    stats = buckets.get(key)
+    if stats is None:
+        buckets[key] = [1, value, value, value]
+    else:
+        stats[0] += 1
+        stats[1] += value
+        stats[2] = min(stats[2], value)
+        stats[3] = max(stats[3], value)
+
+
+def update_rollups(records):
+    """
+    把刚插入的 AQIRecord 累加到日汇总和月汇总中，只触及这些记录所在的桶。
+    应在与 bulk_create 相同的事务中调用；同一条记录不能重复累加。
+    """
+    daily, monthly = {}, {}
+    for record in records:
+        day = _local_date(record.timestamp)
+        month = day.replace(day=1)
+        for pollutant, column in ROLLUP_POLLUTANTS.items():
+            value = getattr(record, column)
+            if value is None:
+                continue
+            _accumulate(daily, (record.station_id, day, pollutant), value)
+            _accumulate(monthly, (record.station_id, month, pollutant), value)
+
+    with connection.cursor() as cursor:
+        for model, bucket_field, buckets in ((AQIDailyRollup, 'day', daily), (AQIMonthlyRollup, 'month', monthly)):
+            if buckets:
+                cursor.executemany(_upsert_sql(model, bucket_field), [
+                    list(key) + [count, total, low, high, total / count]
+                    for key, (count, total, low, high) in buckets.items()
+                ])
+    return len(daily), len(monthly)
+
+
+def rebuild_rollups(start_date=None, end_date=None):
+    """
+    删除 [start_date, end_date] 内的汇总并从原始记录重新聚合(日期按项目时区)。
+    日汇总由原始记录聚合，月汇总由日汇总聚合；指定区间时按整月处理，保证月汇总完整。
+    """
+    if start_date is not None:
+        start_date = start_date.replace(day=1)
+    if end_date is not None:
+        end_date = (end_date.replace(day=28) + timedelta(days=4)).replace(day=1)  # 下个月 1 日
+
+    tz_name = settings.TIME_ZONE
+    record_table = AQIRecord._meta.db_table
+    daily_table = AQIDailyRollup._meta.db_table
+    monthly_table = AQIMonthlyRollup._meta.db_table
+
+    day_filter, month_filter, params = [], [], []
+    if start_date is not None:
+        day_filter.append("day >= %s")
+        month_filter.append("month >= %s")
+        params.append(start_date)
+    if end_date is not None:
+        day_filter.append("day < %s")
+        month_filter.append("month < %s")
+        params.append(end_date)
+    day_where = f"WHERE {' AND '.join(day_filter)}" if day_filter else ""
+    month_where = f"WHERE {' AND '.join(month_filter)}" if month_filter else ""
+
+    local_day = "(timestamp AT TIME ZONE %s)::date"
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {daily_table} {day_where}", params)
+        cursor.execute(f"DELETE FROM {monthly_table} {month_where}", params)
+
+        for pollutant, column in ROLLUP_POLLUTANTS.items():
+            record_filter = [f"{column} IS NOT NULL"]
+            record_params = [tz_name, pollutant]
+            # 用时间戳区间过滤，可以走 timestamp 索引
+            if start_date is not None:
+                record_filter.append("timestamp >= %s")
+                record_params.append(_local_midnight(start_date))
+            if end_date is not None:
+                record_filter.append("timestamp < %s")
+                record_params.append(_local_midnight(end_date))
+            cursor.execute(
+                f"INSERT INTO {daily_table} (station_id, day, pollutant, sample_count, value_sum, value_min, "
+                f"value_max, value_mean) "
+                f"SELECT station_id, {local_day}, %s, COUNT({column}), SUM({column}), MIN({column}), "
+                f"MAX({column}), AVG({column}) "
+                f"FROM {record_table} WHERE {' AND '.join(record_filter)} GROUP BY 1, 2",
+                record_params
+            )
+
+        cursor.execute(
+            f"INSERT INTO {monthly_table} (station_id, month, pollutant, sample_count, value_sum, value_min, "
+            f"value_max, value_mean) "
+            f"SELECT station_id, date_trunc('month', day)::date, pollutant, SUM(sample_count), SUM(value_sum), "
+            f"MIN(value_min), MAX(value_max), SUM(value_sum) / SUM(sample_count) "
+            f"FROM {daily_table} {day_where} GROUP BY 1, 2, 3",
+            params
+        )
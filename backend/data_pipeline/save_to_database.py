@@ -11,6 +11,10 @@ sys.path.append(BASE_DIR)
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 django.setup()
 from data_pipeline.models import BirdObservation, BirdSpeciesRecord, AQIStation, AQIRecord
+from data_pipeline.latest_records import update_station_latest
+from data_pipeline.rollups import update_rollups
+from data_pipeline.partitions import ensure_partitions_for
+from data_pipeline.pollutants import parse_pollutant_fields
 
 
 def consumer(queue):
@@ -69,7 +73,10 @@ def process_remaining_data(buffers, station_cache):
             print(f"插入最后一批鸟类物种数据，共{len(buffers['bird_species'])}条")
         # 处理剩余的AQI数据
         if buffers["aqi"]:
+            ensure_partitions_for([record.timestamp for record in buffers["aqi"]])
             AQIRecord.objects.bulk_create(buffers["aqi"])
+            update_station_latest(buffers["aqi"])
+            update_rollups(buffers["aqi"])
             print(f"插入最后一批AQI数据，共{len(buffers['aqi'])}条")
 
 
@@ -140,7 +147,11 @@ def process_aqi_data(raw_data, buffers, station_cache):
             pm10=raw_data['PM10'],
             pm25=raw_data['PM2.5'],
             so2=raw_data['SO2'],
-            raw_data=raw_data
+            raw_data=raw_data,
+            **parse_pollutant_fields({
+                'co': raw_data['CO'], 'no2': raw_data['NO2'], 'o3': raw_data['O3'],
+                'pm10': raw_data['PM10'], 'pm25': raw_data['PM2.5'], 'so2': raw_data['SO2'],
+            })
         )
         buffers["aqi"].append(aqi_record)
 
@@ -165,6 +176,9 @@ def check_batch_insert(buffers, batch_size, station_cache):
 
         # 处理AQI数据
         if len(buffers["aqi"]) >= batch_size:
+            ensure_partitions_for([record.timestamp for record in buffers["aqi"]])
             AQIRecord.objects.bulk_create(buffers["aqi"])
+            update_station_latest(buffers["aqi"])
+            update_rollups(buffers["aqi"])
             print(f"批量插入AQI数据，共{len(buffers['aqi'])}条")
             buffers["aqi"] = []
\ No newline at end of file
@@ -13,6 +13,10 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 django.setup()
 from data_pipeline.models import AQIStation, AQIRecord
+from data_pipeline.latest_records import update_station_latest
+from data_pipeline.rollups import update_rollups
+from data_pipeline.partitions import ensure_partitions_for, is_partitioned, drop_partitions_before
+from data_pipeline.pollutants import POLLUTANTS, parse_pollutant_fields
 
 class UpDateAQI:
     def __init__(self):
@@ -181,13 +185,19 @@ class UpDateAQI:
                     pm10=data['pm10'],
                     pm25=data['pm25'],
                     so2=data['so2'],
-                    raw_data=data['raw_data']
+                    raw_data=data['raw_data'],
+                    **parse_pollutant_fields({p: data[p] for p in POLLUTANTS})
                 ))
 
-            # 批量插入
+            # 批量插入(分区表先确保记录所在月份的分区存在)
+            ensure_partitions_for([record.timestamp for record in records_to_create])
             AQIRecord.objects.bulk_create(records_to_create)
             print(f"批量插入{len(records_to_create)}条记录")
 
+            # 同一事务中更新各站点的最新记录
+            update_station_latest(records_to_create)
+            update_rollups(records_to_create)
+
             # 清空缓冲区
             self.batch_buffer = []
 
@@ -199,6 +209,11 @@ class UpDateAQI:
         """清理超过30天的旧数据"""
         try:
             thirty_days_ago = timezone.now() - timedelta(days=5*365)
+            if is_partitioned():
+                # 分区表直接删除整月过期的分区，不逐行删除
+                dropped = drop_partitions_before(thirty_days_ago)
+                print(f"已删除{len(dropped)}个过期的月度分区: {', '.join(dropped) or '无'}")
+                return
             deleted_count, _ = AQIRecord.objects.filter(
                 timestamp__lt=thirty_days_ago
             ).delete()
@@ -1,9 +1,16 @@
 import arcpy
 import math
 import os
+import sys
 import time
 import traceback
 from collections import defaultdict
+import numpy as np
+
+# 与 Django 无关的纯 NumPy/SciPy 模块，可在 ArcGIS Pro 环境中直接导入
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from aqi_api import grid_weights
+from backend.settings import AQI_GRID_WEIGHTS_PATH  # settings.py 只定义常量，无需配置 Django
 
 
 
@@ -42,31 +49,37 @@ def create_analysis_grid(output_grid_fc, template_fc, grid_cell_size):
 
 
 def process_aqi_data(grid_fc, start_date, end_date, db_connection_sde, pollutants_list, aqi_record_table,
-                     aqi_station_table, grid_cell_size, target_projected_crs):
-    # 视图名称
-    view_name = "public.v_station_daily_averages"
-
-    avg_expressions = ", ".join(["AVG({}) AS avg_{}".format(p, p) for p in pollutants_list])
+                     aqi_station_table, grid_cell_size, target_projected_crs,
+                     aqi_daily_rollup_table="public.data_pipeline_aqidailyrollup", weights_cache_path=None):
+    # 直接读取入库时维护的日汇总表，对各站点的日均值取平均，不扫描原始小时记录
+    avg_expressions = ", ".join(
+        ["AVG(CASE WHEN r.pollutant = '{p}' THEN r.value_mean END) AS avg_{p}".format(p=p) for p in pollutants_list])
+    pollutant_filter = ", ".join(["'{}'".format(p) for p in pollutants_list])
 
     # SQL查询
     query_sql = """
         SELECT
-            station_id,
-            station_name,
-            location,
+            s.id AS station_id,
+            s.id AS source_station_id,
+            s.name AS station_name,
+            s.location,
             {avg_expr}
         FROM
-            {view}
+            {rollup} r
+            JOIN {station} s ON s.id = r.station_id
         WHERE
-            record_date >= '{s_date}'::date AND
-            record_date <= '{e_date}'::date
+            r.day >= '{s_date}'::date AND
+            r.day <= '{e_date}'::date AND
+            r.pollutant IN ({pollutants})
         GROUP BY
-            station_id, station_name, location
+            s.id, s.name, s.location
         """.format(
         avg_expr=avg_expressions,
-        view=view_name,
+        rollup=aqi_daily_rollup_table,
+        station=aqi_station_table,
         s_date=start_date,
-        e_date=end_date
+        e_date=end_date,
+        pollutants=pollutant_filter
     )
 
     # 使用无路径的临时图层名
@@ -103,68 +116,52 @@ def process_aqi_data(grid_fc, start_date, end_date, db_connection_sde, pollutant
     station_points_projected = os.path.join(workspace, "temp_aqi_stations_projected")
     arcpy.Project_management(station_points_gcs, station_points_projected, target_projected_crs)
 
-    arcpy.AddMessage("  正在为环境设置创建模板栅格...")
-    template_raster = os.path.join(workspace, "template_snap_raster")
-    if arcpy.Exists(template_raster):
-        arcpy.Delete_management(template_raster)
-
-    arcpy.conversion.PolygonToRaster(
-        in_features=grid_fc,
-        value_field="Grid_ID",
-        out_rasterdataset=template_raster,
-        cellsize=grid_cell_size
-    )
-    arcpy.AddMessage("  模板栅格创建成功。")
-
-    for pollutant in pollutants_list:
-        field_name = "avg_{}".format(pollutant)
-        valid_points_query = "{} IS NOT NULL".format(field_name)
-
-        valid_count = 0
-        with arcpy.da.SearchCursor(station_points_projected, [field_name], where_clause=valid_points_query) as cursor:
-            for row in cursor:
-                if row[0] is not None:
-                    valid_count += 1
-
+    # 读取网格范围和投影后的站点，网格均值由固定的 站点→网格 权重矩阵一次算出，
+    # 不再对每个污染物做 IDW 栅格化和分区统计
+    grid_ids, cell_bounds = [], []
+    with arcpy.da.SearchCursor(grid_fc, ["Grid_ID", "SHAPE@"]) as cursor:
+        for grid_id, shape in cursor:
+            extent = shape.extent
+            grid_ids.append(grid_id)
+            cell_bounds.append((extent.XMin, extent.YMin, extent.XMax, extent.YMax))
+
+    avg_fields = ["avg_{}".format(p) for p in pollutants_list]
+    station_ids, station_xy, station_values = [], [], []
+    with arcpy.da.SearchCursor(station_points_projected, ["source_station_id", "SHAPE@XY"] + avg_fields) as cursor:
+        for row in cursor:
+            station_ids.append(row[0])
+            station_xy.append(row[1])
+            station_values.append([np.nan if v is None else v for v in row[2:]])
+    station_values = np.array(station_values, dtype=float)
+
+    # 只保留一个缓存文件，网格或站点变化时按指纹判断并覆盖
+    cache_path = weights_cache_path or AQI_GRID_WEIGHTS_PATH
+    weights = grid_weights.get_station_grid_weights(cache_path, grid_ids, cell_bounds, station_ids, station_xy)
+    arcpy.AddMessage("  站点→网格权重矩阵已就绪: {}".format(cache_path))
+
+    grid_means = grid_weights.grid_means(weights, station_values)
+    valid_counts = (~np.isnan(station_values)).sum(axis=0)
+    for pollutant, valid_count in zip(pollutants_list, valid_counts):
         if valid_count < 3:
-            arcpy.addWarning("    警告: 污染物 {} 的有效数据点不足3个 ({})，跳过插值。".format(pollutant, valid_count))
-            if not arcpy.ListFields(grid_fc, field_name):
-                arcpy.AddField_management(grid_fc, field_name, "DOUBLE", field_is_nullable=True)
-            continue
-
-        arcpy.AddMessage("\n  处理污染物: {}...".format(pollutant.upper()))
-
-        raster_path = os.path.join(workspace, "temp_raster_{}".format(pollutant))
-        stats_table = os.path.join(workspace, "temp_stats_table_{}".format(pollutant))
-
-        if arcpy.Exists(raster_path): arcpy.Delete_management(raster_path)
-        if arcpy.Exists(stats_table): arcpy.Delete_management(stats_table)
-
-        with arcpy.EnvManager(
-                extent=grid_fc,
-                snapRaster=template_raster,
-                cellSize=grid_cell_size
-        ):
-            raster_out = arcpy.sa.Idw(station_points_projected, field_name, float(grid_cell_size) / 10)
-            raster_out.save(raster_path)
-
-        arcpy.sa.ZonalStatisticsAsTable(grid_fc, "Grid_ID", raster_path, stats_table, "DATA", "MEAN")
-        arcpy.JoinField_management(grid_fc, "Grid_ID", stats_table, "Grid_ID", ["MEAN"])
+            arcpy.AddWarning("    警告: 污染物 {} 的有效数据点不足3个 ({})，跳过插值。".format(pollutant, valid_count))
 
+    for field_name in avg_fields:
         if not arcpy.ListFields(grid_fc, field_name):
-            arcpy.AddField_management(grid_fc, field_name, "DOUBLE")
-
-        expression = "float(!MEAN!) if !MEAN! is not None else 0"
-        arcpy.CalculateField_management(grid_fc, field_name, expression, "PYTHON3")
-        arcpy.DeleteField_management(grid_fc, ["MEAN"])
+            arcpy.AddField_management(grid_fc, field_name, "DOUBLE", field_is_nullable=True)
 
-        arcpy.Delete_management(raster_path)
-        arcpy.Delete_management(stats_table)
-        arcpy.AddMessage("    {} 处理完成。".format(pollutant.upper()))
+    positions = {grid_id: i for i, grid_id in enumerate(weights['grid_ids'])}
+    with arcpy.da.UpdateCursor(grid_fc, ["Grid_ID"] + avg_fields) as cursor:
+        for row in cursor:
+            i = positions[row[0]]
+            for j in range(len(avg_fields)):
+                if valid_counts[j] < 3:
+                    row[j + 1] = None
+                else:
+                    value = grid_means[i, j]
+                    row[j + 1] = 0.0 if np.isnan(value) else float(value)
+            cursor.updateRow(row)
 
     arcpy.AddMessage("  正在清理临时文件...")
-    if arcpy.Exists(template_raster):
-        arcpy.Delete_management(template_raster)
     arcpy.Delete_management(station_points_gcs)
     arcpy.Delete_management(station_points_projected)
     arcpy.AddMessage("\n  AQI处理完成，临时文件已清理。")
@@ -413,6 +410,7 @@ def main():
         db_schema = "public"
         aqi_station_table = '{}.data_pipeline_aqistation'.format(db_schema)
         aqi_record_table = '{}.data_pipeline_aqirecord'.format(db_schema)
+        aqi_daily_rollup_table = '{}.data_pipeline_aqidailyrollup'.format(db_schema)
         bird_observation_table = '{}.data_pipeline_birdobservation'.format(db_schema)
         bird_species_table = '{}.data_pipeline_birdspeciesrecord'.format(db_schema)
         input_boundary_url = r"https://product.geoscene.cn/server/rest/services/Hosted/beijing_shp/FeatureServer/0"
@@ -435,7 +433,8 @@ def main():
 
         arcpy.AddMessage("\n--- 步骤二: 处理空气质量数据 ---")
         process_aqi_data(temp_analysis_grid_fc, start_date_sql, end_date_sql, db_connection_sde_file, pollutants_list,
-                         aqi_record_table, aqi_station_table, grid_cell_size, target_projected_crs)
+                         aqi_record_table, aqi_station_table, grid_cell_size, target_projected_crs,
+                         aqi_daily_rollup_table)
 
         arcpy.AddMessage("\n--- 步骤三: 计算鸟类多样性指数 (GP服务兼容版) ---")
         calculate_bird_diversity_optimized(temp_analysis_grid_fc, start_date_sql, end_date_sql, db_connection_sde_file,
@@ -66,6 +66,8 @@ MODEL_EXTRA_FIELDS = {
 FINAL_COLUMNS_ORDER = [
     'timestamp', 'aqi', 'quality', 'description', 'measure', 'timestr',
     'co', 'no2', 'o3', 'pm10', 'pm25', 'so2', 'raw_data', 'created_at', 'station_id',
+    # 数值型小时浓度，对应 AQIRecord 的 <污染物>_value 字段
+    'co_value', 'no2_value', 'o3_value', 'pm10_value', 'pm25_value', 'so2_value',
 ]
 
 
@@ -178,6 +180,10 @@ def process_daily_data(current_date):
         if field not in merged_df.columns:
             merged_df[field] = default_value
 
+    for col_csv_val in POLLUTANT_MAP.values():
+        if col_csv_val in merged_df.columns and col_csv_val != 'aqi':
+            merged_df[f'{col_csv_val}_value'] = pd.to_numeric(merged_df[col_csv_val], errors='coerce')
+
     for col_csv_val in POLLUTANT_MAP.values():
         if col_csv_val in merged_df.columns:
             merged_df[col_csv_val] = pd.to_numeric(merged_df[col_csv_val], errors='coerce')